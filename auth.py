@@ -5,6 +5,11 @@ USER_CREDENTIALS = {
     "admin": "admin123",
     "user": "user123"
 }
+# Users who can open the Metrics page.
+ADMIN_USERS = {"admin"}
+
+def is_admin():
+    return st.session_state.get("username") in ADMIN_USERS
 
 # --- Login Page ---
 def login_page():
@@ -16,6 +21,7 @@ def login_page():
         if login:
             if USER_CREDENTIALS.get(username) == password:
                 st.session_state.logged_in = True
+                st.session_state.username = username
                 st.session_state.page = "Home"
                 st.rerun() # Rerun the app to navigate to the home page
             else:
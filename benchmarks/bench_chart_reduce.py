@@ -0,0 +1,119 @@
+"""
+Benchmarks the CSV Analyzer chart reducers against plotting every row.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chart_reduce --max-rows 100000000 --json chart_bench.json
+
+Each chart kind is timed for synthetic frames of 1e4 rows up to ``--max-rows``
+(1e8 needs roughly 3 GB of RAM). Unreduced plotting is only timed up to
+``--raw-max-rows`` because it quickly takes minutes.
+"""
+import argparse
+import json
+import time
+from io import BytesIO
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from chart_reduce import (  # noqa: E402
+    bin_histogram,
+    bin_scatter,
+    box_stats,
+    numeric_axis,
+    reduce_area,
+    reduce_line,
+)
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "t": np.arange(rows, dtype=np.int64),
+        "price": np.cumsum(rng.standard_normal(rows)).astype(np.float32),
+        "volume": rng.exponential(1.0, rows).astype(np.float32),
+    })
+
+
+def reduced_plot(kind, df, ax):
+    if kind == "line":
+        reduced = reduce_line(df, "t", "price")
+        reduced.plot(x="t", y="price", ax=ax)
+        return len(reduced)
+    if kind == "area":
+        reduced = reduce_area(df, ["t", "volume"], ["volume"])
+        reduced.plot.area(ax=ax)
+        return len(reduced)
+    if kind == "scatter":
+        counts, x_edges, y_edges = bin_scatter(numeric_axis(df["price"]), df["volume"].to_numpy(dtype=float))
+        ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0))
+        return int(np.count_nonzero(counts))
+    if kind == "histogram":
+        counts, edges = bin_histogram(df["volume"].to_numpy(dtype=float))
+        ax.stairs(counts, edges, fill=True)
+        return len(counts)
+    stats = box_stats(df["volume"].to_numpy(dtype=float), "volume")
+    ax.bxp([stats])
+    return 5 + len(stats["fliers"])
+
+
+def raw_plot(kind, df, ax):
+    if kind == "line":
+        df.plot(x="t", y="price", ax=ax)
+    elif kind == "area":
+        df[["t", "volume"]].plot.area(ax=ax)
+    elif kind == "scatter":
+        ax.scatter(df["price"], df["volume"], s=2)
+    elif kind == "histogram":
+        df[["volume"]].plot.hist(ax=ax)
+    else:
+        df[["volume"]].plot.box(ax=ax)
+    return len(df)
+
+
+def timed_render(plot, kind, df):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    start = time.perf_counter()
+    drawn = plot(kind, df, ax)
+    fig.savefig(BytesIO(), format="png")
+    elapsed = time.perf_counter() - start
+    plt.close(fig)
+    return drawn, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-rows", type=float, default=1e7)
+    parser.add_argument("--raw-max-rows", type=float, default=1e6)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    rows = 10_000
+    while rows <= args.max_rows:
+        df = make_frame(rows)
+        for kind in ["line", "area", "scatter", "histogram", "box"]:
+            drawn, reduced_time = timed_render(reduced_plot, kind, df)
+            raw_time = timed_render(raw_plot, kind, df)[1] if rows <= args.raw_max_rows else None
+            results.append({
+                "rows": rows, "chart": kind, "points_drawn": drawn,
+                "reduced_seconds": round(reduced_time, 4),
+                "raw_seconds": round(raw_time, 4) if raw_time is not None else None,
+            })
+            raw = f"{raw_time:8.3f}s" if raw_time is not None else "       -"
+            print(f"{rows:>11,} {kind:<10} drawn={drawn:>7,} reduced={reduced_time:7.3f}s raw={raw}")
+        del df
+        rows *= 10
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmarks loading the pickled docstore vs. the memory-mapped chunk store.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_docstore --copies 100 --lookups 200
+
+Chunks of every PDF in ``data/`` are repeated ``--copies`` times (about 600
+chunks per copy) and written in both formats. Each format is then opened in a
+fresh interpreter, which reports load time and the private (anonymous) memory
+added by the load and by ``--lookups`` random chunk lookups. Memory-mapped
+file pages are counted separately: they live in the shared page cache and the
+kernel maps a few neighbouring cached pages on each fault.
+"""
+import argparse
+import glob
+import json
+import os
+import pickle
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from chunk_store import load_docstore, write_chunk_store
+from ingest import iter_chunks, iter_pages
+from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+
+def _memory_mb():
+    # (anonymous, file-backed) RSS from /proc where available, else the peak RSS as anonymous.
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["RssAnon"].split()[0]) / 1024, int(fields["RssFile"].split()[0]) / 1024
+    except (OSError, KeyError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+
+
+def child(fmt, directory, lookups):
+    before = _memory_mb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        with open(os.path.join(directory, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    else:
+        docstore, index_to_docstore_id = load_docstore(directory)
+    load_time = time.perf_counter() - start
+    loaded = _memory_mb()
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(lookups):
+        docstore.search(index_to_docstore_id[rng.randrange(len(index_to_docstore_id))])
+    lookup_time = time.perf_counter() - start
+    after = _memory_mb()
+    print(json.dumps({
+        "load_seconds": round(load_time, 4), "load_private_mb": round(loaded[0] - before[0], 1),
+        "private_after_lookups_mb": round(after[0] - before[0], 1),
+        "mapped_after_lookups_mb": round(after[1] - before[1], 1),
+        "lookup_us": round(lookup_time / max(lookups, 1) * 1e6, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], args.lookups)
+        return
+
+    docs = []
+    for path in sorted(glob.glob(args.data)):
+        docs.extend(iter_chunks(iter_pages(path), path, CHUNK_SIZE, CHUNK_OVERLAP))
+    # Each copy gets distinct text and metadata objects, as separate filings would.
+    docs = [Document(page_content=f"{doc.page_content} [{copy}]", metadata=dict(doc.metadata))
+            for copy in range(args.copies) for doc in docs]
+    results = {"chunks": len(docs)}
+    with tempfile.TemporaryDirectory() as directory:
+        ids = [str(i) for i in range(len(docs))]
+        with open(os.path.join(directory, "index.pkl"), "wb") as f:
+            pickle.dump((InMemoryDocstore(dict(zip(ids, docs))), dict(enumerate(ids))), f)
+        write_chunk_store(directory, docs)
+        for fmt, name in (("pickle", "index.pkl"), ("chunk_store", "chunks.bin")):
+            run = subprocess.run([sys.executable, "-m", "benchmarks.bench_docstore", "--child", fmt, directory,
+                                  "--lookups", str(args.lookups)], capture_output=True, text=True, check=True)
+            results[fmt] = {**json.loads(run.stdout.strip().splitlines()[-1]),
+                            "file_mb": round(os.path.getsize(os.path.join(directory, name)) / 2 ** 20, 1)}
+            r = results[fmt]
+            print(f"{fmt:<12} {len(docs):,} chunks  file={r['file_mb']}MB  load={r['load_seconds'] * 1000:8.1f}ms  "
+                  f"private +{r['load_private_mb']}MB (+{r['private_after_lookups_mb']}MB after {args.lookups} lookups, "
+                  f"{r['mapped_after_lookups_mb']}MB mapped)  lookup={r['lookup_us']}us")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
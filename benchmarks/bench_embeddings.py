@@ -0,0 +1,69 @@
+"""
+Benchmarks embedding throughput of the Gemini and local backends.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_embeddings --backends gemini local --chunks 500 --json embed_bench.json
+
+Chunks are taken from a bundled PDF with the app's splitter settings and
+embedded with the uncached backend, so the numbers reflect the model and not
+the embedding cache. The Gemini backend is skipped when GEMINI_API_KEY is unset.
+"""
+import argparse
+import json
+import os
+import time
+
+from embeddings import BACKENDS, embedding_backend_id, get_base_embeddings
+from ingest import iter_chunks, iter_pages
+from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+DEFAULT_PDF = os.path.join("data", "goog-10-q-q3-2024.pdf")
+
+
+def load_chunks(path, limit):
+    texts = []
+    for doc in iter_chunks(iter_pages(path, workers=1), path, CHUNK_SIZE, CHUNK_OVERLAP):
+        texts.append(doc.page_content)
+        if len(texts) >= limit:
+            break
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    texts = load_chunks(args.pdf, args.chunks)
+    print(f"{len(texts)} chunks from {args.pdf}")
+
+    results = []
+    for backend in args.backends:
+        if backend == "gemini" and not os.getenv("GEMINI_API_KEY"):
+            print("gemini     skipped (GEMINI_API_KEY not set)")
+            continue
+        start = time.perf_counter()
+        embeddings = get_base_embeddings(backend)
+        load_time = time.perf_counter() - start
+        start = time.perf_counter()
+        vectors = embeddings.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "backend": embedding_backend_id(backend), "chunks": len(texts), "dimensions": len(vectors[0]),
+            "load_seconds": round(load_time, 3), "embed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(texts) / elapsed, 1),
+        })
+        print(f"{backend:<10} dims={len(vectors[0]):>4} load={load_time:6.2f}s "
+              f"embed={elapsed:7.2f}s {len(texts) / elapsed:8.1f} chunks/s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
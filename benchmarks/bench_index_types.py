@@ -0,0 +1,103 @@
+"""
+Benchmarks recall, query latency and memory of the FAISS index types.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_index_types --backend local --scale 20 --json index_bench.json
+
+Every PDF in ``data/`` is chunked with the app's splitter settings and embedded
+with the chosen backend (through the embedding cache, so reruns are fast).
+``--scale`` grows the corpus to library size by adding noisy copies of each
+vector; ``--synthetic`` skips embedding and uses random vectors instead. Queries
+are perturbed corpus vectors, and recall@k is measured against exact (flat) search.
+"""
+import argparse
+import glob
+import json
+import time
+
+import numpy as np
+
+from index_types import INDEX_TYPES, build_index, index_memory_bytes
+from ingest import iter_chunks, iter_pages
+from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+
+def embed_reports(pattern, backend):
+    from embeddings import get_embeddings
+
+    texts = []
+    for path in sorted(glob.glob(pattern)):
+        texts.extend(doc.page_content for doc in iter_chunks(iter_pages(path), path, CHUNK_SIZE, CHUNK_OVERLAP))
+    print(f"embedding {len(texts)} chunks from {pattern}")
+    return np.asarray(get_embeddings(backend).embed_documents(texts), dtype=np.float32)
+
+
+def scale_corpus(vectors, scale, rng):
+    if scale <= 1:
+        return vectors
+    noise = vectors.std() * 0.1
+    copies = [vectors] + [vectors + rng.normal(0, noise, vectors.shape).astype(np.float32) for _ in range(scale - 1)]
+    return np.concatenate(copies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--backend", help="Embedding backend (defaults to FINSIGHT_EMBEDDING_BACKEND)")
+    parser.add_argument("--synthetic", type=int, metavar="DIM", help="Use random vectors of this dimension")
+    parser.add_argument("--vectors", type=int, default=50_000, help="Corpus size for --synthetic")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the corpus with noisy copies")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        corpus = rng.standard_normal((args.vectors, args.synthetic)).astype(np.float32)
+    else:
+        corpus = scale_corpus(embed_reports(args.data, args.backend), args.scale, rng)
+    picks = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = corpus[picks] + rng.normal(0, corpus.std() * 0.05, (len(picks), corpus.shape[1])).astype(np.float32)
+    print(f"{len(corpus):,} vectors of dimension {corpus.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    truth = None
+    results = []
+    for index_type in ["flat"] + [t for t in args.types if t != "flat"]:
+        start = time.perf_counter()
+        index = build_index(corpus, index_type)
+        build_time = time.perf_counter() - start
+
+        # One query at a time, as the app searches.
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], args.k)
+            latencies.append(time.perf_counter() - start)
+            found.append(ids[0])
+        found = np.asarray(found)
+        if truth is None:
+            truth = found
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+
+        memory = index_memory_bytes(index)
+        results.append({
+            "index_type": index_type, "vectors": len(corpus), "build_seconds": round(build_time, 3),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+            "recall_at_k": round(float(recall), 4), "memory_mb": round(memory / (1024 * 1024), 2),
+        })
+        r = results[-1]
+        print(f"{index_type:<9} build={build_time:7.2f}s p50={r['p50_ms']:7.3f}ms p95={r['p95_ms']:7.3f}ms "
+              f"recall@{args.k}={recall:.3f} memory={r['memory_mb']:8.2f}MB")
+        del index
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
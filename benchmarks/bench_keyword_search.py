@@ -0,0 +1,72 @@
+"""
+Benchmarks BM25 keyword index build time and query latency.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_keyword_search --copies 40
+
+Chunks of every PDF in ``data/`` are repeated ``--copies`` times to reach
+library-sized corpora (the bundled reports give about 600 chunks per copy).
+"""
+import argparse
+import glob
+import json
+import time
+
+import numpy as np
+
+from ingest import iter_chunks, iter_pages
+from keyword_index import KeywordIndex
+from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+QUERIES = [
+    "operating income",
+    "AWS segment net sales",
+    "free cash flow",
+    "Google Cloud revenue",
+    "share repurchases",
+    "effective tax rate",
+    "1,234",
+    "risk factors foreign exchange",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--k", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    texts = []
+    for path in sorted(glob.glob(args.data)):
+        texts.extend(doc.page_content for doc in iter_chunks(iter_pages(path), path, CHUNK_SIZE, CHUNK_OVERLAP))
+    texts = texts * args.copies
+
+    start = time.perf_counter()
+    index = KeywordIndex(range(len(texts)), texts)
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - start)
+    result = {
+        "chunks": len(texts), "terms": len(index.vocab), "build_seconds": round(build_time, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+    print(f"{result['chunks']:,} chunks, {result['terms']:,} terms: build={build_time:.2f}s "
+          f"p50={result['p50_ms']:.3f}ms p95={result['p95_ms']:.3f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
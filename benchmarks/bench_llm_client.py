@@ -0,0 +1,97 @@
+"""
+Benchmarks the shared LLM client against one ChatGroq per call, on a local fake Groq endpoint.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_llm_client --requests 120 --users 16 --quota 20
+
+``--users`` threads send ``--requests`` calls in total, a ``--duplicates``
+fraction of them identical (as when several people click "Summarize" on the
+same filing). The fake endpoint accepts ``--quota`` requests per second and
+answers the rest with 429. Each strategy runs against a fresh endpoint; the
+async fan-out path is measured as well.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+from langchain_groq import ChatGroq
+
+from benchmarks.fake_groq import FakeGroqServer
+from llm_client import LLMClient
+
+
+def make_prompts(count, duplicates):
+    shared = int(count * duplicates)
+    return [[HumanMessage(content="Summarize the 10-Q.")] for _ in range(shared)] + [
+        [HumanMessage(content=f"Question {i} about operating income?")] for i in range(count - shared)
+    ]
+
+
+def run_threads(call, prompts, users):
+    def safe(messages):
+        try:
+            call(messages)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        ok = sum(executor.map(safe, prompts))
+    return ok, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--duplicates", type=float, default=0.25)
+    parser.add_argument("--quota", type=int, default=20, help="Requests per second the endpoint accepts")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    logging.getLogger("llm_client").setLevel(logging.ERROR)
+    prompts = make_prompts(args.requests, args.duplicates)
+    results = {}
+
+    def record(name, server, ok, seconds):
+        results[name] = {"seconds": round(seconds, 3), "succeeded": ok, "failed": len(prompts) - ok,
+                         "server_requests": server.stats["requests"], "http_429": server.stats["rate_limited"]}
+        server.stop()
+        print(f"{name:<22} {seconds:7.2f}s  {ok}/{len(prompts)} ok  "
+              f"{server.stats['requests']} requests to the endpoint, {server.stats['rate_limited']} x 429")
+
+    # One ChatGroq per call, as the pages used to do: new connections, SDK retries only.
+    server = FakeGroqServer(latency=args.latency, rate=args.quota, period=1.0).start()
+    ok, seconds = run_threads(
+        lambda messages: ChatGroq(groq_api_key="fake", model_name="naive", base_url=server.url).invoke(messages),
+        prompts, args.users,
+    )
+    record("chatgroq_per_call", server, ok, seconds)
+
+    server = FakeGroqServer(latency=args.latency, rate=args.quota, period=1.0).start()
+    client = LLMClient("shared", "fake", base_url=server.url, requests_per_minute=args.quota,
+                       tokens_per_minute=10 ** 9, period=1.0)
+    ok, seconds = run_threads(client.invoke, prompts, args.users)
+    record("shared_client", server, ok, seconds)
+
+    server = FakeGroqServer(latency=args.latency, rate=args.quota, period=1.0).start()
+    client = LLMClient("shared-async", "fake", base_url=server.url, requests_per_minute=args.quota,
+                       tokens_per_minute=10 ** 9, period=1.0)
+    start = time.perf_counter()
+    responses = asyncio.run(client.abatch(prompts, concurrency=args.users, return_exceptions=True))
+    ok = sum(not isinstance(response, Exception) for response in responses)
+    record("shared_client_async", server, ok, time.perf_counter() - start)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
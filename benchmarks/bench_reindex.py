@@ -0,0 +1,104 @@
+"""
+Benchmarks refreshing a PDF's index after an amendment: full rebuild vs. page-level update.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_reindex --pages 300 --changed 3 --embed-ms 20
+
+A report of ``--pages`` pages is assembled from the PDFs in ``data/`` (at least
+two) and indexed into a temporary cache. ``--changed`` of its pages are then
+replaced with pages from the last filing and the file is indexed again, once
+from scratch and once as an update of the cached index. Fake embeddings sleep
+``--embed-ms`` per embedding call to stand in for the embedding API.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from pypdf import PdfReader, PdfWriter
+
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    delay: float = 0.0
+    chunks: int = 0
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        self.chunks += len(texts)
+        return super().embed_documents(texts)
+
+
+def write_pdf(path, pages):
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(page)
+    writer.write(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--changed", type=int, default=3)
+    parser.add_argument("--embed-ms", type=float, default=20, help="Simulated latency per embedding call")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    # Cache settings are read at import time.
+    os.environ["FINSIGHT_INDEX_CACHE_DIR"] = cache_dir
+    from index_cache import SOURCES_FILE
+    from utils import load_or_build_pdf_vectorstore, pdf_index_key
+
+    readers = [PdfReader(path) for path in sorted(glob.glob(args.data))]
+    # The report repeats every filing but the last, whose pages replace pages spread through it.
+    source = [page for reader in readers[:-1] for page in reader.pages]
+    pages = [source[i % len(source)] for i in range(args.pages)]
+    replacements = readers[-1].pages
+    amended = list(pages)
+    for n in range(args.changed):
+        amended[(n + 1) * len(pages) // (args.changed + 1)] = replacements[n % len(replacements)]
+
+    embeddings = SlowFakeEmbeddings(size=256, delay=args.embed_ms / 1000)
+    results = {"pages": len(pages), "changed": args.changed}
+    try:
+        path = os.path.join(cache_dir, "report.pdf")
+        write_pdf(path, pages)
+        start = time.perf_counter()
+        load_or_build_pdf_vectorstore(path, embeddings, pdf_index_key(path))
+        results["initial_build"] = {"seconds": round(time.perf_counter() - start, 2), "chunks_embedded": embeddings.chunks}
+
+        write_pdf(path, amended)
+        key = pdf_index_key(path)
+        sources = os.path.join(cache_dir, SOURCES_FILE)
+        # Without the source manifest there is no previous version to update from.
+        os.rename(sources, sources + ".bak")
+        embeddings.chunks = 0
+        start = time.perf_counter()
+        load_or_build_pdf_vectorstore(path, embeddings, key)
+        results["full_rebuild"] = {"seconds": round(time.perf_counter() - start, 2), "chunks_embedded": embeddings.chunks}
+
+        shutil.rmtree(os.path.join(cache_dir, key))
+        os.replace(sources + ".bak", sources)
+        embeddings.chunks = 0
+        start = time.perf_counter()
+        load_or_build_pdf_vectorstore(path, embeddings, key)
+        results["update"] = {"seconds": round(time.perf_counter() - start, 2), "chunks_embedded": embeddings.chunks}
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    for name in ("initial_build", "full_rebuild", "update"):
+        r = results[name]
+        print(f"{name:<14} {r['seconds']:8.2f}s  {r['chunks_embedded']:>6} chunks embedded")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmarks cross-encoder reranking latency and the prompt size it saves.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rerank --candidates 20 50 100 --k 4
+
+Candidates come from BM25 over every PDF in ``data/`` (no API key needed).
+For each candidate count it times one cold batched scoring pass and a repeat
+served from the score cache, and compares the context tokens of the reranked
+top ``--k`` with simply sending the top ``--wide-k`` retrieval hits. Needs
+sentence-transformers; the model is downloaded on first run.
+"""
+import argparse
+import glob
+import json
+import time
+
+import numpy as np
+
+from context import estimate_tokens
+from ingest import iter_chunks, iter_pages
+from keyword_index import KeywordIndex
+from rerank import RERANK_MODEL, CrossEncoderReranker
+from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+QUERIES = [
+    "What was operating income and how did it change?",
+    "How did AWS segment net sales grow?",
+    "What was free cash flow for the period?",
+    "How much revenue did Google Cloud generate?",
+    "How many shares were repurchased?",
+    "What was the effective tax rate?",
+    "What foreign exchange risks are disclosed?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--model", default=RERANK_MODEL)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--k", type=int, default=4, help="Chunks kept after reranking")
+    parser.add_argument("--wide-k", type=int, default=8, help="Chunks sent without reranking, for comparison")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    docs = []
+    for path in sorted(glob.glob(args.data)):
+        docs.extend(iter_chunks(iter_pages(path), path, CHUNK_SIZE, CHUNK_OVERLAP))
+    index = KeywordIndex(range(len(docs)), [doc.page_content for doc in docs])
+
+    start = time.perf_counter()
+    reranker = CrossEncoderReranker(args.model, budget=0)
+    reranker.rerank("warm-up", docs[:2], 1)
+    print(f"{len(docs):,} chunks; {args.model} loaded in {time.perf_counter() - start:.2f}s")
+
+    results = []
+    for candidates in args.candidates:
+        cold, cached, tokens = [], [], []
+        for query in QUERIES:
+            hits = [docs[doc_id] for doc_id, _ in index.search(query, candidates)]
+            start = time.perf_counter()
+            reranker.rerank(query, hits, args.k)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            top = reranker.rerank(query, hits, args.k)
+            cached.append(time.perf_counter() - start)
+            tokens.append(sum(estimate_tokens(doc.page_content) for doc in top))
+        wide = [sum(estimate_tokens(docs[doc_id].page_content) for doc_id, _ in index.search(query, args.wide_k))
+                for query in QUERIES]
+        result = {
+            "candidates": candidates,
+            "cold_p50_ms": round(float(np.percentile(cold, 50)) * 1000, 1),
+            "cold_p95_ms": round(float(np.percentile(cold, 95)) * 1000, 1),
+            "cached_p50_ms": round(float(np.percentile(cached, 50)) * 1000, 3),
+            "context_tokens": round(float(np.mean(tokens))),
+            f"context_tokens_top{args.wide_k}": round(float(np.mean(wide))),
+        }
+        results.append(result)
+        print(f"candidates={candidates:>4} cold p50={result['cold_p50_ms']:7.1f}ms p95={result['cold_p95_ms']:7.1f}ms "
+              f"cached p50={result['cached_p50_ms']:.3f}ms  context {result['context_tokens']} tokens "
+              f"(top {args.wide_k} without rerank: {result[f'context_tokens_top{args.wide_k}']})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmarks cold start: time to the first rendered login page and per-module import cost.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5 --json startup_bench.json
+
+Every measurement runs in a fresh interpreter, as a new worker process or
+replica would. The login page is rendered with Streamlit's ``AppTest``
+harness. "eager" imports every page module first, which is what app.py did
+before pages were loaded lazily.
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+MODULES = ["auth", "jobs", "page_loader", "home", "pdf_insights", "csv_analyzer", "news_insights"]
+
+RENDER_SNIPPET = """
+import time
+started = time.perf_counter()
+{eager}
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+assert not at.exception, at.exception
+print(time.perf_counter() - started)
+"""
+
+
+def _python(code, *flags):
+    result = subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return result
+
+
+def time_login_render(eager):
+    imports = "\n".join(f"import {module}" for module in MODULES) if eager else ""
+    return float(_python(RENDER_SNIPPET.format(eager=imports)).stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(module, top=8):
+    """
+    Returns the module's own import time and its slowest top-level dependencies,
+    from ``python -X importtime`` (streamlit is imported first and excluded).
+    """
+    stderr = _python(f"import streamlit\nimport {module}", "-X", "importtime").stderr
+    packages = {}
+    total = 0.0
+    seen_streamlit = False
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)) / 1e6, (len(match.group(3)) + 1) // 2, match.group(4)
+        if not seen_streamlit:
+            seen_streamlit = depth == 1 and name == "streamlit"
+        elif depth == 1:
+            total += cumulative
+        elif depth == 2:
+            # Direct imports of the module, grouped by top-level package.
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + cumulative
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return total, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {"login_render": {}, "imports": {}}
+    for mode in ("lazy", "eager"):
+        try:
+            times = [time_login_render(mode == "eager") for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"login render ({mode}): failed: {e}")
+            continue
+        results["login_render"][mode] = {"median_seconds": round(statistics.median(times), 3),
+                                         "runs": [round(t, 3) for t in times]}
+        print(f"login render ({mode:<5}) median={statistics.median(times):6.2f}s runs={len(times)}")
+
+    for module in MODULES:
+        try:
+            total, slowest = import_breakdown(module)
+        except RuntimeError as e:
+            print(f"import {module:<14} failed: {e}")
+            continue
+        results["imports"][module] = {"seconds": round(total, 3),
+                                      "slowest": {name: round(seconds, 3) for name, seconds in slowest}}
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in slowest)
+        print(f"import {module:<14} {total:6.2f}s  ({breakdown})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Runs the offline performance suite and checks it against regression thresholds.
+
+Run from the repository root, first on the base commit and then on the change,
+on the same machine:
+
+    python -m benchmarks.bench_suite --json base.json
+    python -m benchmarks.bench_suite --json new.json --baseline base.json --check benchmarks/thresholds.json
+
+The baseline comparison is the regression gate: timings depend on the hardware,
+so they are only compared with a run on the same machine. The absolute limits
+in ``thresholds.json`` are deliberately generous and only catch order-of-magnitude
+regressions (and memory growth) on any machine.
+
+Three groups are measured, each in a fresh interpreter so that its peak RSS is
+its own:
+
+- ``pdf``: parse, split, embed and index-build throughput for every PDF in
+  ``data/``, plus the end-to-end ingest pipeline
+- ``retrieval``: dense, BM25 and hybrid search latency at several k, and a
+  full question round trip
+- ``csv``: load, describe and plot time for synthetic frames of growing size
+
+Embeddings come from a deterministic fake embedder and answers from a stubbed
+chat model, so the suite needs no network or API keys and its numbers only
+move when the code does. Results are one flat ``{metric: value}`` map; metrics
+ending in ``_per_second`` are better when higher, all others when lower.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+
+GROUPS = ("pdf", "retrieval", "csv")
+QUERIES = [
+    "operating income",
+    "AWS segment net sales",
+    "free cash flow",
+    "Google Cloud revenue",
+    "share repurchases",
+    "effective tax rate",
+    "risk factors foreign exchange",
+    "How did advertising revenue change year over year?",
+]
+# Gemini embedding-001 vectors have 768 dimensions.
+DEFAULT_DIM = 768
+# Differences below these are timer and allocator noise, not regressions.
+NOISE_FLOOR = {"_seconds": 0.1, "_ms": 1.0, "_mb": 10}
+# Tail percentiles come from a few hundred samples and swing too much between runs
+# to compare; they are reported, and only held to the absolute thresholds.
+TAIL_SUFFIXES = (".p95_ms", ".p99_ms")
+
+
+def _fake_embeddings(dim):
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=dim)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _percentiles(latencies, prefix):
+    return {
+        f"{prefix}.p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+        f"{prefix}.p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 4),
+    }
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_pdf(args):
+    from langchain_community.vectorstores import FAISS
+
+    from index_types import build_index
+    from ingest import build_vectorstore_for_pdf, iter_chunks, iter_pages
+    from keyword_index import KeywordIndex
+    from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+    embeddings = _fake_embeddings(args.dim)
+    results = {}
+    for path in sorted(glob.glob(args.data)):
+        name = os.path.splitext(os.path.basename(path))[0]
+        pages, parse_time = _timed(lambda: list(iter_pages(path)))
+        chunks, split_time = _timed(lambda: list(iter_chunks(pages, path, CHUNK_SIZE, CHUNK_OVERLAP)))
+        texts = [doc.page_content for doc in chunks]
+        vectors, embed_time = _timed(lambda: embeddings.embed_documents(texts))
+        _, faiss_time = _timed(lambda: FAISS.from_embeddings(
+            list(zip(texts, vectors)), embeddings, metadatas=[doc.metadata for doc in chunks]
+        ))
+        matrix = np.asarray(vectors, dtype=np.float32)
+        _, index_time = _timed(lambda: build_index(matrix, args.index_type))
+        _, keyword_time = _timed(lambda: KeywordIndex(range(len(texts)), texts))
+        _, ingest_time = _timed(lambda: build_vectorstore_for_pdf(path, embeddings, CHUNK_SIZE, CHUNK_OVERLAP))
+        results.update({
+            f"pdf.{name}.pages": len(pages),
+            f"pdf.{name}.chunks": len(chunks),
+            f"pdf.{name}.parse_pages_per_second": round(len(pages) / parse_time, 2),
+            f"pdf.{name}.split_chunks_per_second": round(len(chunks) / split_time, 2),
+            f"pdf.{name}.embed_chunks_per_second": round(len(chunks) / embed_time, 2),
+            f"pdf.{name}.faiss_build_chunks_per_second": round(len(chunks) / faiss_time, 2),
+            f"pdf.{name}.{args.index_type}_index_build_seconds": round(index_time, 4),
+            f"pdf.{name}.keyword_build_seconds": round(keyword_time, 4),
+            f"pdf.{name}.ingest_pages_per_second": round(len(pages) / ingest_time, 2),
+        })
+        print(f"{name}: {len(pages)} pages, {len(chunks)} chunks; parse {parse_time:.2f}s, split {split_time:.2f}s, "
+              f"embed {embed_time:.2f}s, faiss {faiss_time:.2f}s, ingest pipeline {ingest_time:.2f}s", file=sys.stderr)
+    return results
+
+
+def bench_retrieval(args):
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.language_models import FakeListChatModel
+
+    from index_cache import optimize_vectorstore
+    from ingest import iter_chunks, iter_pages
+    from keyword_index import get_keyword_index
+    from qa import stream_answer
+    from retrieval import MultiIndexRetriever, hybrid_search, keyword_search, search_vectorstores
+    from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+    embeddings = _fake_embeddings(args.dim)
+    chunks = []
+    for path in sorted(glob.glob(args.data)):
+        chunks.extend(iter_chunks(iter_pages(path), path, CHUNK_SIZE, CHUNK_OVERLAP))
+    # Copies reach library-sized corpora; the fake embedder gives equal texts equal vectors.
+    texts = [doc.page_content for doc in chunks] * args.copies
+    metadatas = [doc.metadata for doc in chunks] * args.copies
+    vectors = embeddings.embed_documents([doc.page_content for doc in chunks]) * args.copies
+    vectorstore = optimize_vectorstore(
+        FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas),
+        index_type=args.index_type,
+    )
+    get_keyword_index(vectorstore)
+    print(f"retrieval corpus: {len(texts):,} chunks ({args.index_type})", file=sys.stderr)
+
+    results = {"retrieval.chunks": len(texts)}
+    searches = {"dense": search_vectorstores, "keyword": keyword_search, "hybrid": hybrid_search}
+    for k in args.k:
+        for mode, search in searches.items():
+            search([vectorstore], QUERIES[0], k)  # warm-up
+            latencies = []
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    search([vectorstore], query, k)
+                    latencies.append(time.perf_counter() - start)
+            results.update(_percentiles(latencies, f"retrieval.{mode}.k{k}"))
+
+    llm = FakeListChatModel(responses=["- Revenue grew 11% year over year."])
+    # Reranking is measured by bench_rerank; it needs the cross-encoder model.
+    retriever = MultiIndexRetriever(vectorstores=[vectorstore], k=4, rerank=False)
+    latencies = []
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            "".join(stream_answer(llm, retriever, query))
+            latencies.append(time.perf_counter() - start)
+    results.update(_percentiles(latencies, "retrieval.qa_round_trip"))
+    return results
+
+
+def bench_csv(args):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    from chart_reduce import reduce_line
+    from csv_cache import ParsedCsv
+
+    results = {}
+    rng = np.random.default_rng(0)
+    for rows in args.csv_rows:
+        frame = pd.DataFrame({
+            "date": pd.date_range("2000-01-01", periods=rows, freq="min").astype(str),
+            "ticker": rng.choice(["AMZN", "GOOG", "MSFT", "AAPL"], rows),
+            "price": np.round(100 + np.cumsum(rng.standard_normal(rows)), 4),
+            "volume": rng.integers(100, 1_000_000, rows),
+        })
+        data = frame.to_csv(index=False).encode("latin1")
+        del frame
+
+        # The CSV Analyzer's small-file path: parse, summarize, plot a reduced line and export PNG.
+        df, load_time = _timed(lambda: pd.read_csv(BytesIO(data), encoding="latin1"))
+        parsed = ParsedCsv(df)
+        _, describe_time = _timed(lambda: (parsed.head, parsed.describe, parsed.info, parsed.corr))
+
+        def plot():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            x = pd.RangeIndex(len(df)).to_series(name="row")
+            reduced = reduce_line(pd.concat([x, df["price"]], axis=1), "row", "price")
+            reduced.plot(x="row", y="price", ax=ax, kind="line")
+            fig.savefig(BytesIO(), format="png")
+            plt.close(fig)
+
+        _, plot_time = _timed(plot)
+        label = f"rows_{rows:.0e}".replace("+0", "").replace("+", "")
+        results.update({
+            f"csv.{label}.load_seconds": round(load_time, 4),
+            f"csv.{label}.describe_seconds": round(describe_time, 4),
+            f"csv.{label}.plot_seconds": round(plot_time, 4),
+        })
+        print(f"csv {rows:,} rows ({len(data) / 1e6:.1f} MB): load {load_time:.2f}s, "
+              f"describe {describe_time:.2f}s, plot {plot_time:.2f}s", file=sys.stderr)
+    return results
+
+
+BENCHES = {"pdf": bench_pdf, "retrieval": bench_retrieval, "csv": bench_csv}
+
+
+def run_group(group, argv):
+    """
+    Runs one group in a child interpreter and returns its metrics, including ``<group>.peak_rss_mb``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_suite", "--child", group, *argv],
+        stdout=subprocess.PIPE, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"benchmark group {group!r} failed with exit code {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_second")
+
+
+def check_thresholds(results, thresholds, groups=GROUPS):
+    """
+    Compares results with ``{metric: {"min": x} or {"max": y}}`` limits, skipping groups that were not run.
+
+    Returns:
+        list: One dict per checked metric with ``metric``, ``value``, ``limit`` and ``ok``
+    """
+    checks = []
+    for metric, limit in sorted(thresholds.items()):
+        if metric.split(".")[0] not in groups:
+            continue
+        value = results.get(metric)
+        if value is None:
+            checks.append({"metric": metric, "value": None, "limit": limit, "ok": False})
+            continue
+        ok = value >= limit["min"] if "min" in limit else value <= limit["max"]
+        checks.append({"metric": metric, "value": value, "limit": limit, "ok": ok})
+    return checks
+
+
+def compare_baseline(results, baseline, tolerance):
+    """
+    Flags metrics that got worse than the baseline run by more than ``tolerance`` (a fraction).
+    """
+    checks = []
+    for metric, old in sorted(baseline.items()):
+        new = results.get(metric)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old == 0:
+            continue
+        if metric.endswith((".pages", ".chunks") + TAIL_SUFFIXES):
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better(metric) else change
+        floor = next((value for suffix, value in NOISE_FLOOR.items() if metric.endswith(suffix)), 0)
+        if abs(new - old) < floor:
+            worse = 0.0
+        checks.append({"metric": metric, "value": new, "baseline": old, "change": round(change, 4),
+                       "ok": worse <= tolerance})
+    return checks
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--data", default="data/*.pdf")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Fake embedding dimension")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type built and searched")
+    parser.add_argument("--copies", type=int, default=4, help="Corpus copies for the retrieval group")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the query set")
+    parser.add_argument("--csv-rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--check", help="Thresholds file; exit with status 1 if any is exceeded")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression against --baseline (default 25%%)")
+    parser.add_argument("--child", choices=GROUPS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        results = BENCHES[args.child](args)
+        results[f"{args.child}.peak_rss_mb"] = _peak_rss_mb()
+        print(json.dumps(results))
+        return 0
+
+    forwarded = ["--data", args.data, "--dim", str(args.dim), "--index-type", args.index_type,
+                 "--copies", str(args.copies), "--repeat", str(args.repeat),
+                 "--k", *map(str, args.k), "--csv-rows", *map(str, args.csv_rows)]
+    results = {}
+    for group in args.groups:
+        print(f"== {group}", file=sys.stderr)
+        results.update(run_group(group, forwarded))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("json", "check", "baseline", "child")},
+        "results": results,
+    }
+    failed = []
+    if args.check:
+        with open(args.check) as f:
+            report["threshold_checks"] = check_thresholds(results, json.load(f), args.groups)
+        failed += [check for check in report["threshold_checks"] if not check["ok"]]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get("platform"), baseline.get("cpus")) != (report["platform"], report["cpus"]):
+            print(f"warning: the baseline was run on {baseline.get('platform')} with {baseline.get('cpus')} CPUs; "
+                  f"timings are only comparable on the same machine", file=sys.stderr)
+        report["baseline_checks"] = compare_baseline(results, baseline["results"], args.tolerance)
+        failed += [check for check in report["baseline_checks"] if not check["ok"]]
+
+    for metric, value in results.items():
+        print(f"{metric:<60} {value}")
+    for check in failed:
+        print(f"REGRESSION {check['metric']}: {check['value']} "
+              f"(limit {check.get('limit', check.get('baseline'))})", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
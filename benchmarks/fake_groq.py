@@ -0,0 +1,166 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+
+Run it on its own and point the app at it:
+
+    python -m benchmarks.fake_groq --port 8765 --rate 30 --latency 0.3
+    FINSIGHT_GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake streamlit run app.py
+
+or start it in-process with ``FakeGroqServer``. It answers every request with
+a short canned completion (streamed as server-sent events when asked), enforces
+a requests-per-period quota with 429 + ``Retry-After`` the way the real API
+does, and can fail a fraction of requests with 503.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "- Revenue grew year over year.\n- Operating margin improved.\n- No content available beyond the filing."
+
+
+class FakeGroqServer:
+    """
+    Threaded fake chat completions server.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one)
+        latency (float): Seconds each successful request takes
+        rate (int): Requests accepted per ``period``; further requests get 429 (0 = unlimited)
+        period (float): Quota window in seconds
+        failure_rate (float): Fraction of requests answered with 503
+    """
+
+    def __init__(self, port=0, latency=0.05, rate=0, period=60.0, failure_rate=0.0):
+        self.latency = latency
+        self.rate = rate
+        self.period = period
+        self.failure_rate = failure_rate
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "failed": 0}
+        self._window = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-groq", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self):
+        # Returns None to serve the request, or (status, retry_after) to reject it.
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.rate:
+                self._window = [t for t in self._window if now - t < self.period]
+                if len(self._window) >= self.rate:
+                    self.stats["rate_limited"] += 1
+                    return 429, self.period - (now - self._window[0])
+                self._window.append(now)
+            if random.random() < self.failure_rate:
+                self.stats["failed"] += 1
+                return 503, None
+            self.stats["ok"] += 1
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status, body, headers=()):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                rejected = server._admit()
+                if rejected:
+                    status, retry_after = rejected
+                    headers = [("Retry-After", f"{retry_after:.2f}")] if retry_after is not None else []
+                    message = "Rate limit reached" if status == 429 else "Service unavailable"
+                    self._send_json(status, {"error": {"message": message, "type": "fake"}}, headers)
+                    return
+                time.sleep(server.latency)
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4 + 1
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(ANSWER) // 4 + 1,
+                         "total_tokens": prompt_tokens + len(ANSWER) // 4 + 1}
+                base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()),
+                        "model": request.get("model", "fake")}
+                if request.get("stream"):
+                    self._stream(base, usage)
+                    return
+                self._send_json(200, {
+                    **base, "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _stream(self, base, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [{"role": "assistant", "content": ""}] + [{"content": line + "\n"} for line in ANSWER.split("\n")]
+                for i, delta in enumerate(pieces):
+                    last = i == len(pieces) - 1
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if last else None}]}
+                    if last:
+                        chunk["x_groq"] = {"usage": usage}
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per request")
+    parser.add_argument("--rate", type=int, default=30, help="Requests per --period before 429s (0 = unlimited)")
+    parser.add_argument("--period", type=float, default=60.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests failing with 503")
+    args = parser.parse_args()
+    server = FakeGroqServer(args.port, args.latency, args.rate, args.period, args.failure_rate).start()
+    print(f"fake Groq endpoint on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
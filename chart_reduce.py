@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+# A 10 x 6 inch figure at 100 dpi is 1000 pixels wide; two points per pixel
+# column is enough to draw every visible peak and trough.
+TARGET_POINTS = 2000
+HIST_BINS = 50
+GRID_BINS = 200
+MAX_BARS = 200
+MAX_FLIERS = 1000
+
+
+def is_binnable(values):
+    """
+    Returns True if ``values`` are numeric or datetimes, i.e. can be binned on a numeric axis.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def numeric_axis(values):
+    """
+    Converts x-axis values to float64 for the decimation math.
+
+    Datetimes become nanosecond timestamps; anything non-numeric falls back to
+    the row position, which is what pandas plots against for such columns.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype=np.float64)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.arange(len(series), dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out=TARGET_POINTS):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``n_out - 2`` equal-size
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket.
+
+    Args:
+        x (ndarray): Monotonic x values (float64)
+        y (ndarray): y values (float64, no NaNs)
+        n_out (int): Number of points to keep
+
+    Returns:
+        ndarray: Sorted row positions of the kept points
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x) * (y[start:end] - py) - (px - x[start:end]) * (next_y - py))
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+def minmax_indices(y, n_buckets=TARGET_POINTS // 2):
+    """
+    Min/max-per-bucket decimation: keeps the lowest and highest point of each of
+    ``n_buckets`` equal-size row buckets, so no spike is lost.
+
+    Returns:
+        ndarray: Sorted, unique row positions of the kept points
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = n // n_buckets
+    body = y[:size * n_buckets].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    # NaNs are skipped by filling them with values that never win.
+    lows = np.argmin(np.where(np.isnan(body), np.inf, body), axis=1) + offsets
+    highs = np.argmax(np.where(np.isnan(body), -np.inf, body), axis=1) + offsets
+    kept = [lows, highs, [0, n - 1]]
+    if n > size * n_buckets:
+        tail = y[size * n_buckets:]
+        if not np.all(np.isnan(tail)):
+            kept.append([size * n_buckets + np.nanargmin(tail), size * n_buckets + np.nanargmax(tail)])
+    return np.unique(np.concatenate(kept))
+
+
+def reduce_line(df, x_col, y_col, n_out=TARGET_POINTS):
+    """
+    Returns the rows of ``df`` to draw for a line chart of ``y_col`` against ``x_col``.
+    """
+    subset = df[[x_col, y_col]].dropna()
+    if len(subset) <= n_out:
+        return subset
+    y = subset[y_col].to_numpy(dtype=np.float64)
+    return subset.iloc[lttb_indices(numeric_axis(subset[x_col]), y, n_out)]
+
+
+def reduce_area(df, columns, y_cols, n_buckets=TARGET_POINTS // 2):
+    """
+    Returns the rows of ``df`` to draw for a stacked area chart.
+
+    The union of every series' min/max rows is kept so that all series share
+    the same x positions, which stacking requires.
+    """
+    subset = df[columns]
+    if len(subset) <= 2 * n_buckets:
+        return subset
+    rows = np.unique(np.concatenate([
+        minmax_indices(subset[y].to_numpy(dtype=np.float64, na_value=np.nan), n_buckets) for y in y_cols
+    ]))
+    return subset.iloc[rows]
+
+
+def reduce_bar(df, x_col, y_col, max_bars=MAX_BARS):
+    """
+    Aggregates rows into at most ``max_bars`` bars.
+
+    Repeated x values are averaged per value; otherwise consecutive rows are
+    averaged in equal-size groups labelled by their first x value. Aggregated
+    frames name the y column after the aggregation (e.g. ``"price (mean per
+    ticker)"``) so the chart says what it shows; smaller inputs are returned as is.
+    """
+    subset = df[[x_col, y_col]]
+    if len(subset) <= max_bars:
+        return subset
+    if subset[x_col].nunique() <= max_bars:
+        means = subset.groupby(x_col, sort=False, observed=True)[y_col].mean()
+        return means.rename(f"{y_col} (mean per {x_col})").reset_index()
+    groups = np.arange(len(subset)) * max_bars // len(subset)
+    grouped = subset.groupby(groups)
+    return pd.DataFrame({
+        x_col: grouped[x_col].first().to_numpy(),
+        f"{y_col} (mean of ~{-(-len(subset) // max_bars):,} rows per bar)": grouped[y_col].mean().to_numpy(),
+    })
+
+
+def bin_scatter(x, y, bins=GRID_BINS):
+    """
+    Bins points into a 2D histogram for plotting as a density grid.
+
+    Returns:
+        tuple: (counts, x_edges, y_edges) as returned by ``np.histogram2d``
+    """
+    mask = ~(np.isnan(x) | np.isnan(y))
+    return np.histogram2d(x[mask], y[mask], bins=bins)
+
+
+def bin_histogram(values, bins=HIST_BINS):
+    """
+    Returns (counts, edges) of the non-NaN values.
+    """
+    values = values[~np.isnan(values)]
+    return np.histogram(values, bins=bins)
+
+
+def box_stats(values, label, max_fliers=MAX_FLIERS):
+    """
+    Computes the statistics ``Axes.bxp`` needs, keeping at most ``max_fliers`` outliers.
+    """
+    values = values[~np.isnan(values)]
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= low) & (values <= high)]
+    fliers = values[(values < low) | (values > high)]
+    if len(fliers) > max_fliers:
+        # Keep the extremes and an even spread of the rest.
+        order = np.sort(fliers)
+        fliers = order[np.linspace(0, len(order) - 1, max_fliers).astype(np.int64)]
+    return {
+        "label": label,
+        "med": median,
+        "q1": q1,
+        "q3": q3,
+        "whislo": inside.min() if len(inside) else q1,
+        "whishi": inside.max() if len(inside) else q3,
+        "fliers": fliers,
+    }
@@ -0,0 +1,195 @@
+import mmap
+import os
+import uuid
+from collections.abc import Mapping
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+TEXT_FILE = "chunks.bin"
+META_FILE = "chunks.arrow"
+MAGIC = b"FSCHUNK1"
+HEADER_BYTES = 16
+# Column holding the original docstore IDs when they are kept (e.g. for the news index).
+ID_COLUMN = "__id__"
+# Placeholder column giving the table its row count when no chunk has metadata.
+ROWS_COLUMN = "__rows__"
+
+
+def has_chunk_store(directory):
+    return os.path.exists(os.path.join(directory, TEXT_FILE)) and os.path.exists(os.path.join(directory, META_FILE))
+
+
+def _replace(directory, name, write):
+    # Written beside the target and renamed over it, so readers that still map the old file keep a valid copy.
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_chunk_store(directory, docs, ids=None):
+    """
+    Writes chunk texts and metadata in the memory-mappable layout read by ``MappedDocstore``.
+
+    ``chunks.bin`` holds a header, an int64 offsets array and the UTF-8 texts
+    back to back; ``chunks.arrow`` holds the metadata as an Arrow IPC table
+    with one column per metadata key (strings dictionary-encoded).
+
+    Args:
+        directory (str): Directory to write into
+        docs (list): Documents in index order
+        ids (list, optional): Docstore ID of each Document, kept when IDs are referenced elsewhere
+
+    Raises:
+        pyarrow.ArrowInvalid: If a metadata key holds values of incompatible types
+    """
+    metadatas = [doc.metadata for doc in docs]
+    table = pa.Table.from_pylist(metadatas) if any(metadatas) else pa.table({ROWS_COLUMN: pa.nulls(len(docs))})
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+    if ids is not None:
+        table = table.append_column(ID_COLUMN, pa.array([str(doc_id) for doc_id in ids], pa.string()))
+
+    texts = [doc.page_content.encode("utf-8") for doc in docs]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+
+    def write_texts(path):
+        with open(path, "wb") as f:
+            f.write(MAGIC + np.uint64(len(texts)).tobytes())
+            f.write(offsets.tobytes())
+            for text in texts:
+                f.write(text)
+
+    def write_meta(path):
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _replace(directory, META_FILE, write_meta)
+    _replace(directory, TEXT_FILE, write_texts)
+
+
+def _single_array(column):
+    # The writer produces one record batch, so this is normally a zero-copy view of the mapped file.
+    return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+
+
+class RowIds(Mapping):
+    """
+    ``index_to_docstore_id`` for a chunk store without kept IDs: row ``i`` has ID ``i``.
+    """
+
+    def __init__(self, count):
+        self._count = count
+
+    def __getitem__(self, i):
+        i = int(i)
+        if not 0 <= i < self._count:
+            raise KeyError(i)
+        return i
+
+    def __iter__(self):
+        return iter(range(self._count))
+
+    def __len__(self):
+        return self._count
+
+
+class MappedDocstore(Docstore):
+    """
+    Read-only docstore over a chunk store written by ``write_chunk_store``.
+
+    Both files are memory-mapped, so opening one is near-instant whatever its
+    size, and only the pages holding the texts actually looked up are read
+    into memory. Lookups slice the mapping and decode just that chunk.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, TEXT_FILE), "rb") as f:
+            self._texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_RANDOM"):
+            # Lookups are scattered; without this every one also reads ahead pages nobody asked for.
+            self._texts.madvise(mmap.MADV_RANDOM)
+        if self._texts[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{directory} does not hold a chunk store.")
+        count = int(np.frombuffer(self._texts, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+        self._offsets = np.frombuffer(self._texts, dtype=np.int64, count=count + 1, offset=HEADER_BYTES)
+        self._base = HEADER_BYTES + 8 * (count + 1)
+        self._meta = pa.ipc.open_file(pa.memory_map(os.path.join(directory, META_FILE))).read_all()
+        if self._meta.num_rows != count:
+            raise ValueError(f"{directory} holds {count} chunk texts but {self._meta.num_rows} metadata rows.")
+        # Indexing one contiguous array is several times faster than indexing a ChunkedArray.
+        self._columns = {
+            name: _single_array(self._meta.column(name))
+            for name in self._meta.column_names if name not in (ID_COLUMN, ROWS_COLUMN)
+        }
+        self.ids = self._meta.column(ID_COLUMN).to_pylist() if ID_COLUMN in self._meta.column_names else None
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)} if self.ids is not None else None
+
+    def __len__(self):
+        return self._meta.num_rows
+
+    def row(self, i):
+        """
+        Returns the Document stored in row ``i``.
+        """
+        start, end = self._offsets[i], self._offsets[i + 1]
+        text = self._texts[self._base + start:self._base + end].decode("utf-8")
+        metadata = {}
+        for name, column in self._columns.items():
+            value = column[i].as_py()
+            if value is not None:
+                metadata[name] = value
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, search):
+        row = self._rows.get(search) if self._rows is not None else search
+        if not isinstance(row, (int, np.integer)) or not 0 <= row < len(self):
+            return f"ID {search} not found."
+        return self.row(int(row))
+
+    def index_to_docstore_id(self):
+        """
+        Returns the ``index_to_docstore_id`` mapping for a FAISS index stored in row order.
+        """
+        if self.ids is None:
+            return RowIds(len(self))
+        return dict(enumerate(self.ids))
+
+
+def save_docstore(directory, vectorstore, keep_ids=False):
+    """
+    Writes a FAISS vectorstore's documents, in index order, as a chunk store.
+
+    Args:
+        directory (str): Directory to write into
+        vectorstore (FAISS): Vectorstore whose docstore is written
+        keep_ids (bool): Keep the docstore IDs instead of numbering rows
+    """
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+    write_chunk_store(directory, [vectorstore.docstore.search(doc_id) for doc_id in ids], ids if keep_ids else None)
+
+
+def load_docstore(directory, writable=False):
+    """
+    Opens a chunk store as ``(docstore, index_to_docstore_id)`` for the FAISS wrapper.
+
+    With ``writable`` every chunk is read into an ``InMemoryDocstore`` that can be added to or deleted from.
+    """
+    docstore = MappedDocstore(directory)
+    index_to_docstore_id = docstore.index_to_docstore_id()
+    if not writable:
+        return docstore, index_to_docstore_id
+    ids = [str(index_to_docstore_id[i]) for i in range(len(docstore))]
+    return InMemoryDocstore({doc_id: docstore.row(i) for i, doc_id in enumerate(ids)}), dict(enumerate(ids))
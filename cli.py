@@ -0,0 +1,300 @@
+"""
+Headless FinSight: bulk PDF ingestion and batch Q&A from the command line.
+
+Run from the repository root:
+
+    python cli.py ingest data/ filings/2024Q4/ --workers 4
+    python cli.py ask --docs data/ --questions questions.txt --out answers.jsonl
+
+``ingest`` writes the same on-disk indexes the Streamlit app loads, so large
+document drops can be indexed offline and open instantly in the UI. ``ask``
+answers every question of a file against the chosen documents with concurrent
+LLM calls and writes one JSON object per question.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from dotenv import load_dotenv
+
+# Before any FinSight module is imported, so .env settings reach their constants.
+load_dotenv()
+
+# Documents indexed at once; each one also parses pages in its own process pool.
+CLI_INGEST_WORKERS = int(os.getenv("FINSIGHT_CLI_INGEST_WORKERS", "4"))
+# Questions answered at once; calls are also held to the provider's requests-per-minute limit.
+CLI_QA_CONCURRENCY = int(os.getenv("FINSIGHT_CLI_QA_CONCURRENCY", "4"))
+DEFAULT_MODEL = "llama3-8b-8192"
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def expand_pdf_paths(paths):
+    """
+    Expands directories to the PDFs below them, keeping the given order and dropping duplicates.
+
+    Raises:
+        FileNotFoundError: If a path does not exist
+    """
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)
+            found += glob.glob(os.path.join(path, "**", "*.PDF"), recursive=True)
+            expanded.extend(sorted(found))
+        elif os.path.exists(path):
+            expanded.append(path)
+        else:
+            raise FileNotFoundError(f"File not found: {path}")
+    return list(dict.fromkeys(expanded))
+
+
+def read_questions(path):
+    """
+    Reads a question file: JSONL objects with ``question`` (and optionally ``id``),
+    or plain text with one question per line. Blank lines and ``#`` comments are skipped.
+
+    Returns:
+        list: ``{"id", "question"}`` dicts
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                questions.append({"id": record.get("id", number), "question": record["question"]})
+            else:
+                questions.append({"id": number, "question": line})
+    return questions
+
+
+def open_output(path):
+    return open(path, "w", encoding="utf-8") if path and path != "-" else nullcontext(sys.stdout)
+
+
+def write_record(out, record):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def load_pdf_indexes(paths, embeddings, workers, on_result=None, keep=True):
+    """
+    Loads each PDF's index from the on-disk cache, building and caching missing ones in parallel.
+
+    Args:
+        paths (list): PDF paths
+        embeddings (Embeddings): Embedding function of the configured backend
+        workers (int): Number of documents indexed at once
+        on_result (callable, optional): Called with each path's report as it finishes
+        keep (bool): Return the loaded indexes; when False they are dropped once saved to disk
+
+    Returns:
+        dict: Path -> (FAISS or None, report dict)
+    """
+    from index_cache import load_cached_vectorstore
+    from utils import load_or_build_pdf_vectorstore, pdf_index_key
+
+    def load(path):
+        started = time.perf_counter()
+        report = {"path": path}
+        try:
+            key = pdf_index_key(path)
+            vectorstore = load_cached_vectorstore(key, embeddings)
+            report["status"] = "cached"
+            if vectorstore is None:
+                vectorstore = load_or_build_pdf_vectorstore(path, embeddings, key)
+                report["status"] = "indexed" if vectorstore is not None else "empty"
+            report["chunks"] = vectorstore.index.ntotal if vectorstore is not None else 0
+        except Exception as e:
+            vectorstore = None
+            report.update(status="failed", error=str(e) or type(e).__name__)
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return (vectorstore if keep else None), report
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(load, path): path for path in paths}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result:
+                on_result(results[futures[future]][1])
+    return results
+
+
+def _get_embeddings():
+    from embeddings import get_embeddings
+
+    try:
+        return get_embeddings()
+    except ValueError as e:
+        log(f"error: {e}")
+        sys.exit(2)
+
+
+def ingest_command(args):
+    paths = expand_pdf_paths(args.paths)
+    if not paths:
+        log("error: no PDF files found.")
+        return 2
+    embeddings = _get_embeddings()
+    log(f"Indexing {len(paths)} PDF(s) with {args.workers} worker(s)...")
+
+    started = time.perf_counter()
+    done = 0
+    with open_output(args.out) as out:
+        def on_result(report):
+            nonlocal done
+            done += 1
+            detail = report.get("error") or f"{report.get('chunks', 0)} chunks"
+            log(f"[{done}/{len(paths)}] {os.path.basename(report['path'])}: {report['status']} "
+                f"({detail}, {report['seconds']:.1f}s)")
+            if args.out:
+                write_record(out, report)
+
+        # Indexes are only needed on disk here, so none are held in memory past their build.
+        results = load_pdf_indexes(paths, embeddings, args.workers, on_result, keep=False)
+        reports = [report for _, report in results.values()]
+
+    counts = {}
+    for report in reports:
+        counts[report["status"]] = counts.get(report["status"], 0) + 1
+    stats = embeddings.stats()
+    log(f"Done in {time.perf_counter() - started:.1f}s: "
+        + ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        + f". Embedding cache: {stats['hits']} hits, {stats['misses']} misses.")
+    return 1 if counts.get("failed") else 0
+
+
+def _sources(docs):
+    sources = []
+    for doc in docs:
+        source = {"source": os.path.basename(doc.metadata.get("source", "unknown")), "page": doc.metadata.get("page")}
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+def ask_command(args):
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        log("error: GROQ_API_KEY not set in environment.")
+        return 2
+    paths = expand_pdf_paths(args.docs)
+    questions = read_questions(args.questions)
+    if not paths or not questions:
+        log("error: need at least one PDF and one question.")
+        return 2
+
+    from llm_client import get_llm_client
+    from qa import PDF_QUESTION_TEMPLATE, stream_answer
+    from response_cache import get_response_cache
+    from retrieval import COMBINE_AFTER_QUERIES, MultiIndexRetriever, build_combined_vectorstore
+
+    embeddings = _get_embeddings()
+    log(f"Loading {len(paths)} PDF index(es)...")
+    loaded = load_pdf_indexes(paths, embeddings, args.workers)
+    vectorstores = []
+    for path in paths:
+        vectorstore, report = loaded[path]
+        if vectorstore is None:
+            log(f"warning: skipping {path}: {report.get('error') or 'no text found'}")
+        else:
+            vectorstores.append(vectorstore)
+    if not vectorstores:
+        log("error: No valid PDF content found.")
+        return 1
+
+    combined = None
+    if len(vectorstores) > 1 and len(questions) >= COMBINE_AFTER_QUERIES:
+        combined = build_combined_vectorstore(vectorstores)
+    # Batch answers favour relevance over latency, so wait for the reranker instead of falling back.
+    retriever = MultiIndexRetriever(vectorstores=vectorstores, k=args.k, combined_vectorstore=combined,
+                                    rerank=not args.no_rerank, rerank_budget=0)
+    # Shares the Groq quota with summaries running in the same process.
+    options = {"requests_per_minute": args.rpm} if args.rpm else {}
+    llm = get_llm_client(args.model, groq_api_key, **options)
+    cache = None if args.no_cache else get_response_cache()
+    cache_scope = "pdf-chat:" + ",".join(sorted(paths))
+
+    def answer(item):
+        record = {"id": item["id"], "question": item["question"]}
+        try:
+            streaming = stream_answer(
+                llm, retriever, PDF_QUESTION_TEMPLATE.format(question=item["question"]),
+                search_query=item["question"], cache=cache, cache_scope=cache_scope, embeddings=embeddings,
+            )
+            record["answer"] = "".join(streaming) or "No answer found."
+            record["sources"] = _sources(streaming.docs)
+            record["timings"] = streaming.timings()
+        except Exception as e:
+            record["error"] = str(e) or type(e).__name__
+        return record
+
+    log(f"Answering {len(questions)} question(s) over {len(vectorstores)} document(s) "
+        f"with {args.concurrency} concurrent call(s)...")
+    started = time.perf_counter()
+    failed = cached = 0
+    with open_output(args.out) as out, ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        # Results are written in question order as soon as each is ready.
+        for number, record in enumerate(executor.map(answer, questions), start=1):
+            write_record(out, record)
+            failed += "error" in record
+            cached += bool(record.get("timings", {}).get("cached"))
+            if out is not sys.stdout:
+                log(f"[{number}/{len(questions)}] {'failed' if 'error' in record else 'answered'}: {record['question'][:60]}")
+    log(f"Done in {time.perf_counter() - started:.1f}s: {len(questions) - failed} answered "
+        f"({cached} from cache), {failed} failed.")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log pipeline timings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Index PDFs into the on-disk cache used by the app")
+    ingest.add_argument("paths", nargs="+", help="PDF files or directories (searched recursively)")
+    ingest.add_argument("--workers", type=int, default=CLI_INGEST_WORKERS, help="Documents indexed at once")
+    ingest.add_argument("--out", help="Write a JSONL report line per document to this file")
+    ingest.set_defaults(handler=ingest_command)
+
+    ask = commands.add_parser("ask", help="Answer a file of questions against PDFs and write JSONL results")
+    ask.add_argument("--docs", nargs="+", required=True, help="PDF files or directories; missing indexes are built")
+    ask.add_argument("--questions", required=True,
+                     help="Text file with one question per line, or JSONL with 'question' (and 'id')")
+    ask.add_argument("--out", default="-", help="Output JSONL file (default: stdout)")
+    ask.add_argument("--model", default=DEFAULT_MODEL, help="Groq model name")
+    ask.add_argument("--k", type=int, default=4, help="Chunks retrieved per question")
+    ask.add_argument("--concurrency", type=int, default=CLI_QA_CONCURRENCY, help="Questions answered at once")
+    ask.add_argument("--rpm", type=int, help="LLM requests per minute (default: FINSIGHT_LLM_RPM)")
+    ask.add_argument("--workers", type=int, default=CLI_INGEST_WORKERS, help="Documents indexed at once")
+    ask.add_argument("--no-cache", action="store_true", help="Always call the LLM instead of reusing cached answers")
+    ask.add_argument("--no-rerank", action="store_true", help="Keep the retrieval order instead of cross-encoder reranking")
+    ask.set_defaults(handler=ask_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        return args.handler(args)
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        log(f"error: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import logging
+import os
+import re
+
+from langchain_core.documents import Document
+
+from metrics import get_metrics, span
+
+logger = logging.getLogger(__name__)
+
+# Rough English average; avoids a tokenizer dependency for budgeting and cost estimates.
+CHARS_PER_TOKEN = 4
+
+CONTEXT_PACKING = os.getenv("FINSIGHT_CONTEXT_PACKING", "1") != "0"
+# Context tokens per question, capped by what the model's window leaves after the prompt and answer.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("FINSIGHT_CONTEXT_TOKENS", "3000"))
+ANSWER_RESERVE_TOKENS = int(os.getenv("FINSIGHT_ANSWER_RESERVE_TOKENS", "1024"))
+# Chunks whose word shingles overlap an earlier chunk's this much are dropped.
+DUPLICATE_THRESHOLD = float(os.getenv("FINSIGHT_CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+SENTENCE_EXTRACTION = os.getenv("FINSIGHT_CONTEXT_EXTRACT", "0") == "1"
+DEFAULT_CONTEXT_WINDOW = 8192
+# Longest splitter overlap looked for between chunks of the same page (the splitter uses 100 characters).
+MAX_OVERLAP_CHARS = 300
+MIN_OVERLAP_CHARS = 20
+SHINGLE_SIZE = 5
+MIN_TRUNCATED_TOKENS = 50
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9.,%$']*")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how in is it its of on or "
+    "the this that to was were what when which who why will with".split()
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def context_window(model):
+    """
+    Returns the context window of a Groq model, read from its name (``llama3-8b-8192``) when possible.
+    """
+    match = re.search(r"-(\d{4,6})$", model or "")
+    return int(match.group(1)) if match else DEFAULT_CONTEXT_WINDOW
+
+
+def context_budget(model, prompt=""):
+    """
+    Returns the context tokens available for ``prompt`` on ``model``.
+    """
+    room = context_window(model) - ANSWER_RESERVE_TOKENS - estimate_tokens(prompt)
+    return max(0, min(CONTEXT_TOKEN_BUDGET, room))
+
+
+def _overlap(left, right):
+    # Length of the longest suffix of ``left`` that starts ``right``.
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _shingles(text):
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+
+def _terms(text):
+    return {word.strip(".,'") for word in _WORD.findall(text.lower())} - STOPWORDS - {""}
+
+
+def _positions(doc):
+    first = doc.metadata.get("chunk")
+    return first, doc.metadata.get("chunk_end", first)
+
+
+def _join(first, second):
+    # Returns the merged Document if the chunks are consecutive on a page, else None.
+    if (first.metadata.get("source"), first.metadata.get("page")) != (second.metadata.get("source"), second.metadata.get("page")):
+        return None
+    (first_start, first_end), (second_start, second_end) = _positions(first), _positions(second)
+    if first_start is not None and second_start is not None:
+        if second_start == first_end + 1:
+            before, after = first, second
+        elif first_start == second_end + 1:
+            before, after = second, first
+        else:
+            return None
+        size = _overlap(before.page_content, after.page_content)
+        text = before.page_content + (after.page_content[size:] if size else "\n" + after.page_content)
+        metadata = {**first.metadata, "chunk": _positions(before)[0], "chunk_end": _positions(after)[1]}
+        return Document(page_content=text, metadata=metadata)
+    # Chunks indexed before positions were recorded are only joined when their text overlaps.
+    for before, after in ((first, second), (second, first)):
+        size = _overlap(before.page_content, after.page_content)
+        if size:
+            return Document(page_content=before.page_content + after.page_content[size:], metadata=first.metadata)
+    return None
+
+
+def merge_adjacent(docs):
+    """
+    Joins consecutive chunks of the same page, keeping the splitter's overlap once.
+
+    A merged chunk takes the place of the better-ranked of the two and records
+    the positions it covers in ``chunk`` and ``chunk_end``.
+
+    Returns:
+        tuple: (Documents, number of merges)
+    """
+    docs = list(docs)
+    merges = 0
+    i = 0
+    while i < len(docs):
+        for j in range(i + 1, len(docs)):
+            merged = _join(docs[i], docs[j])
+            if merged is not None:
+                docs[i] = merged
+                del docs[j]
+                merges += 1
+                break
+        else:
+            i += 1
+    return docs, merges
+
+
+def drop_duplicates(docs, threshold=DUPLICATE_THRESHOLD):
+    """
+    Drops chunks contained in, or sharing most of their word shingles with, a better-ranked chunk.
+
+    Returns:
+        tuple: (Documents, number dropped)
+    """
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(doc.page_content in other.page_content for other in kept) or any(
+            len(shingles & other) / len(shingles | other) >= threshold for other in kept_shingles
+        ):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept, len(docs) - len(kept)
+
+
+def extract_sentences(doc, query):
+    """
+    Keeps the sentences of a chunk that share a term with the query, in their original order.
+
+    Chunks with no matching sentence are returned unchanged.
+    """
+    terms = _terms(query)
+    sentences = [s for s in _SENTENCE_END.split(doc.page_content) if s.strip()]
+    relevant = [s for s in sentences if terms & _terms(s)]
+    if not relevant or len(relevant) == len(sentences):
+        return doc
+    return Document(page_content=" ".join(relevant), metadata=doc.metadata)
+
+
+def pack_context(docs, query, budget, extract=SENTENCE_EXTRACTION):
+    """
+    Fits retrieved chunks into a token budget without paying for repeated text.
+
+    Overlapping chunks of the same page are merged, near-duplicates dropped
+    and, with ``extract``, each chunk cut down to its query-relevant sentences.
+    Chunks are then taken in rank order until ``budget`` is reached; the chunk
+    that crosses it is truncated when enough room is left.
+
+    Args:
+        docs (list): Retrieved Documents, best first
+        query (str): Search query used to pick relevant sentences
+        budget (int): Context tokens allowed
+        extract (bool): Keep only query-relevant sentences
+
+    Returns:
+        tuple: (packed Documents, stats dict with ``tokens_before``, ``tokens_after``, ``merged``, ``duplicates``)
+    """
+    tokens_before = sum(estimate_tokens(doc.page_content) for doc in docs)
+    packed, merged = merge_adjacent(docs)
+    packed, duplicates = drop_duplicates(packed)
+    if extract:
+        packed = [extract_sentences(doc, query) for doc in packed]
+    fitted, used = [], 0
+    for doc in packed:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens > budget:
+            room = budget - used
+            if room >= MIN_TRUNCATED_TOKENS:
+                fitted.append(Document(page_content=doc.page_content[:room * CHARS_PER_TOKEN], metadata=doc.metadata))
+                used += room
+            break
+        fitted.append(doc)
+        used += tokens
+    stats = {"tokens_before": tokens_before, "tokens_after": used, "merged": merged, "duplicates": duplicates}
+    return fitted, stats
+
+
+def pack_for_model(docs, query, model, prompt="", stage="qa"):
+    """
+    Packs ``docs`` into the context budget of ``model``, logging and counting the tokens saved.
+
+    Returns ``docs`` unchanged when context packing is disabled.
+    """
+    if not CONTEXT_PACKING or not docs:
+        return docs
+    with span(f"{stage}.pack", docs=len(docs)):
+        packed, stats = pack_context(docs, query, context_budget(model, prompt))
+    saved = stats["tokens_before"] - stats["tokens_after"]
+    logger.info(
+        "context packed: docs=%d->%d tokens=%d->%d saved=%d merged=%d duplicates=%d",
+        len(docs), len(packed), stats["tokens_before"], stats["tokens_after"], saved,
+        stats["merged"], stats["duplicates"],
+    )
+    metrics = get_metrics()
+    metrics.increment("finsight_context_tokens_total", stats["tokens_before"], stage=stage, kind="retrieved")
+    metrics.increment("finsight_context_tokens_total", stats["tokens_after"], stage=stage, kind="sent")
+    return packed
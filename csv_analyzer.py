@@ -1,9 +1,174 @@
 # csv_analyzer.py
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from io import StringIO, BytesIO
+from io import BytesIO
+from chart_reduce import (
+    HIST_BINS,
+    bin_histogram,
+    bin_scatter,
+    box_stats,
+    is_binnable,
+    numeric_axis,
+    reduce_area,
+    reduce_bar,
+    reduce_line,
+)
+from csv_cache import ParsedCsv, get_csv_cache
+from csv_store import LARGE_CSV_THRESHOLD_MB, content_hash, convert_csv
+
+CHART_TYPES = ["Line", "Bar", "Scatter", "Area", "Box", "Histogram", "Heatmap"]
+# Rows materialized for a chart in large-file mode; larger files are strided
+# before the chart reducers in chart_reduce run.
+PLOT_MAX_ROWS = 1_000_000
+# Scatter, box and histogram charts are drawn point by point up to this size.
+REDUCE_ABOVE_ROWS = 10_000
+DENSITY_CMAPS = ["Blues", "Oranges", "Greens", "Reds", "Purples"]
+
+def render_info(info_str):
+    info_lines = info_str.strip().split('\n')
+    info_clean = []
+    for line in info_lines:
+        if ':' in line:
+            parts = line.split(':', 1)
+            info_clean.append(f"**{parts[0].strip()}**: {parts[1].strip()}")
+        else:
+            info_clean.append(line)
+    for line in info_clean:
+        st.markdown(f"- {line}")
+
+def render_overview(head, describe, info_str):
+    st.subheader("📄 File Overview")
+    st.write(head)
+
+    st.subheader("📊 Statistical Summary (.describe())")
+    st.write(describe)
+
+    st.subheader("ℹ Dataset Info (.info())")
+    render_info(info_str)
+
+def render_graph_generator(columns, load_frame, load_corr, row_count):
+    """
+    Renders the chart controls and plots the selected columns.
+
+    Large inputs are reduced before plotting (LTTB for lines, min/max buckets for
+    areas, aggregated bars, binned scatter/histograms and precomputed box stats),
+    so drawing time depends on the figure size rather than the row count.
+
+    Args:
+        columns (list): Column names offered in the selectors
+        load_frame (callable): Returns a DataFrame holding the given columns
+        load_corr (callable): Returns the correlation matrix for the heatmap
+        row_count (int): Number of rows in the source data
+    """
+    st.subheader("📉 Dynamic Graph Generator")
+    chart_type = st.selectbox("Select Chart Type", CHART_TYPES, key="chart_type")
+    x_cols = st.multiselect("Select X-axis column(s)", columns, key="x_cols")
+    y_cols = st.multiselect("Select Y-axis column(s)", columns, key="y_cols")
+
+    if st.button("Generate Graph", key="generate_graph_button"):
+        if not x_cols or not y_cols:
+            st.warning("Please select at least one column for both X and Y axes.")
+        else:
+            fig, ax = plt.subplots(figsize=(10, 6))
+            try:
+                drawn = 0
+                if chart_type == "Line":
+                    df = load_frame(x_cols[:1] + y_cols)
+                    for y in y_cols:
+                        reduced = reduce_line(df, x_cols[0], y)
+                        reduced.plot(x=x_cols[0], y=y, ax=ax, kind='line')
+                        drawn += len(reduced)
+                elif chart_type == "Bar":
+                    df = load_frame(x_cols[:1] + y_cols)
+                    for y in y_cols:
+                        reduced = reduce_bar(df, x_cols[0], y)
+                        # Aggregated bars carry a label such as "price (mean per ticker)".
+                        label = reduced.columns[1]
+                        reduced.plot(x=x_cols[0], y=label, ax=ax, kind='bar')
+                        if label != y:
+                            ax.set_ylabel(label)
+                        drawn += len(reduced)
+                elif chart_type == "Scatter":
+                    df = load_frame(x_cols[:1] + y_cols)
+                    binned = len(df) > REDUCE_ABOVE_ROWS
+                    if binned and not all(is_binnable(df[c]) for c in x_cols[:1] + y_cols):
+                        # Text and categorical columns have no numeric axis to bin on.
+                        df = df.sample(REDUCE_ABOVE_ROWS, random_state=0)
+                        binned = False
+                        st.info(f"Non-numeric columns can't be binned; plotting a random sample of "
+                                f"{REDUCE_ABOVE_ROWS:,} rows.")
+                    for i, y in enumerate(y_cols):
+                        if not binned:
+                            sns.scatterplot(x=df[x_cols[0]], y=df[y], ax=ax)
+                            drawn += len(df)
+                        else:
+                            counts, x_edges, y_edges = bin_scatter(numeric_axis(df[x_cols[0]]), numeric_axis(df[y]))
+                            ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0),
+                                          cmap=DENSITY_CMAPS[i % len(DENSITY_CMAPS)], alpha=0.7)
+                            drawn += int(np.count_nonzero(counts))
+                elif chart_type == "Area":
+                    reduced = reduce_area(load_frame(x_cols + y_cols), x_cols + y_cols, y_cols)
+                    reduced.plot.area(ax=ax)
+                    drawn += len(reduced) * len(reduced.columns)
+                elif chart_type == "Box":
+                    df = load_frame(y_cols)
+                    if len(df) <= REDUCE_ABOVE_ROWS:
+                        df[y_cols].plot.box(ax=ax)
+                        drawn += len(df) * len(y_cols)
+                    else:
+                        stats = [box_stats(df[y].to_numpy(dtype=float, na_value=np.nan), y) for y in y_cols]
+                        ax.bxp(stats)
+                        drawn += sum(5 + len(stat["fliers"]) for stat in stats)
+                elif chart_type == "Histogram":
+                    df = load_frame(y_cols)
+                    if len(df) <= REDUCE_ABOVE_ROWS:
+                        df[y_cols].plot.hist(ax=ax, alpha=0.7)
+                    else:
+                        for y in y_cols:
+                            counts, edges = bin_histogram(df[y].to_numpy(dtype=float, na_value=np.nan))
+                            ax.stairs(counts, edges, fill=True, alpha=0.7, label=y)
+                        ax.legend()
+                    drawn += HIST_BINS * len(y_cols)
+                elif chart_type == "Heatmap":
+                    corr = load_corr()
+                    sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
+                    drawn += corr.size
+
+                ax.set_title(f"{chart_type} Chart")
+                st.pyplot(fig)
+                st.caption(f"Drew {drawn:,} points from {row_count:,} source rows.")
+
+                buf = BytesIO()
+                fig.savefig(buf, format="png")
+                st.download_button("📥 Download Graph", data=buf.getvalue(), file_name="generated_graph.png", mime="image/png")
+            except Exception as e:
+                st.error(f"Error while plotting graph: {e}")
+
+def upload_content_hash(uploaded_file):
+    # Hash each upload once; reruns reuse the digest stored for its file_id.
+    memo = st.session_state.setdefault("csv_upload_hashes", {})
+    if uploaded_file.file_id not in memo:
+        memo.clear()
+        memo[uploaded_file.file_id] = content_hash(uploaded_file)
+    return memo[uploaded_file.file_id]
+
+def render_dataframe(parsed):
+    render_overview(parsed.head, parsed.describe, parsed.info)
+    render_graph_generator(parsed.df.columns, lambda cols: parsed.df, lambda: parsed.corr, len(parsed.df))
+
+def render_large_dataset(dataset):
+    st.caption(f"🗄️ Large-file mode: {dataset.num_rows:,} rows kept on disk as Parquet; "
+               "quantiles and correlations are estimated from a uniform row sample.")
+    render_overview(dataset.head(), dataset.describe(), dataset.info())
+    render_graph_generator(
+        dataset.columns,
+        lambda cols: dataset.read_columns(cols, max_rows=PLOT_MAX_ROWS),
+        dataset.corr,
+        dataset.num_rows,
+    )
 
 def csv_analyzer_page():
     st.markdown("""
@@ -13,135 +178,47 @@ def csv_analyzer_page():
     </div>
     """, unsafe_allow_html=True)
 
+    if "csv_dataset" not in st.session_state:
+        st.session_state.csv_dataset = None
+
     uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"], key="csv_upload")
 
     if uploaded_file is not None:
+        large_mode = st.toggle(
+            "🗄️ Large-file mode (stream to on-disk Parquet)",
+            value=uploaded_file.size >= LARGE_CSV_THRESHOLD_MB * 1024 * 1024,
+            key="csv_large_mode",
+        )
         try:
-            df = pd.read_csv(uploaded_file, encoding ='latin1')
-            st.session_state.csv_df = df  # Store DataFrame in session state
+            key = upload_content_hash(uploaded_file)
+            st.session_state.csv_key = key
+            if large_mode:
+                with st.spinner("🔄 Streaming CSV to Parquet and computing statistics..."):
+                    st.session_state.csv_dataset = get_csv_cache().get_or_create(
+                        ("parquet", key), lambda: convert_csv(uploaded_file, key=key)
+                    )
+                st.session_state.csv_df = None
+            else:
+                # Parsed once per distinct file; widget reruns hit the cache.
+                parsed = get_csv_cache().get_or_create(
+                    ("frame", key), lambda: ParsedCsv(pd.read_csv(uploaded_file, encoding='latin1'))
+                )
+                st.session_state.csv_df = parsed.df  # Store DataFrame in session state
+                st.session_state.csv_dataset = None
             st.success("✅ CSV File Uploaded Successfully!")
-
-            st.subheader("📄 File Overview")
-            st.write(st.session_state.csv_df.head())
-
-            st.subheader("📊 Statistical Summary (.describe())")
-            st.write(st.session_state.csv_df.describe())
-
-            st.subheader("ℹ Dataset Info (.info())")
-            buffer = StringIO()
-            st.session_state.csv_df.info(buf=buffer)
-            info_str = buffer.getvalue()
-            info_lines = info_str.strip().split('\n')
-            info_clean = []
-            for line in info_lines:
-                if ':' in line:
-                    parts = line.split(':', 1)
-                    info_clean.append(f"**{parts[0].strip()}**: {parts[1].strip()}")
-                else:
-                    info_clean.append(line)
-            for line in info_clean:
-                st.markdown(f"- {line}")
-
-            st.subheader("📉 Dynamic Graph Generator")
-            chart_type = st.selectbox("Select Chart Type", ["Line", "Bar", "Scatter", "Area", "Box", "Histogram", "Heatmap"], key="chart_type")
-            x_cols = st.multiselect("Select X-axis column(s)", st.session_state.csv_df.columns, key="x_cols")
-            y_cols = st.multiselect("Select Y-axis column(s)", st.session_state.csv_df.columns, key="y_cols")
-
-            if st.button("Generate Graph", key="generate_graph_button"):
-                if not x_cols or not y_cols:
-                    st.warning("Please select at least one column for both X and Y axes.")
-                else:
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    try:
-                        if chart_type == "Line":
-                            for y in y_cols:
-                                st.session_state.csv_df.plot(x=x_cols[0], y=y, ax=ax, kind='line')
-                        elif chart_type == "Bar":
-                            for y in y_cols:
-                                st.session_state.csv_df.plot(x=x_cols[0], y=y, ax=ax, kind='bar')
-                        elif chart_type == "Scatter":
-                            for y in y_cols:
-                                sns.scatterplot(x=st.session_state.csv_df[x_cols[0]], y=st.session_state.csv_df[y], ax=ax)
-                        elif chart_type == "Area":
-                            st.session_state.csv_df[x_cols + y_cols].plot.area(ax=ax)
-                        elif chart_type == "Box":
-                            st.session_state.csv_df[y_cols].plot.box(ax=ax)
-                        elif chart_type == "Histogram":
-                            st.session_state.csv_df[y_cols].plot.hist(ax=ax, alpha=0.7)
-                        elif chart_type == "Heatmap":
-                            corr = st.session_state.csv_df.corr(numeric_only=True)
-                            sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-
-                        ax.set_title(f"{chart_type} Chart")
-                        st.pyplot(fig)
-
-                        buf = BytesIO()
-                        fig.savefig(buf, format="png")
-                        st.download_button("📥 Download Graph", data=buf.getvalue(), file_name="generated_graph.png", mime="image/png")
-                    except Exception as e:
-                        st.error(f"Error while plotting graph: {e}")
-
         except pd.errors.EmptyDataError:
             st.error("❌ Uploaded file is empty.")
+            return
         except Exception as e:
             st.error(f"❌ Error reading CSV file: {e}")
+            return
+
+    if st.session_state.csv_dataset is not None:
+        render_large_dataset(st.session_state.csv_dataset)
     elif "csv_df" in st.session_state and st.session_state.csv_df is not None:
-        st.subheader("📄 File Overview")
-        st.write(st.session_state.csv_df.head())
-
-        st.subheader("📊 Statistical Summary (.describe())")
-        st.write(st.session_state.csv_df.describe())
-
-        st.subheader("ℹ Dataset Info (.info())")
-        buffer = StringIO()
-        st.session_state.csv_df.info(buf=buffer)
-        info_str = buffer.getvalue()
-        info_lines = info_str.strip().split('\n')
-        info_clean = []
-        for line in info_lines:
-            if ':' in line:
-                parts = line.split(':', 1)
-                info_clean.append(f"**{parts[0].strip()}**: {parts[1].strip()}")
-            else:
-                info_clean.append(line)
-        for line in info_clean:
-            st.markdown(f"- {line}")
-
-        st.subheader("📉 Dynamic Graph Generator")
-        chart_type = st.selectbox("Select Chart Type", ["Line", "Bar", "Scatter", "Area", "Box", "Histogram", "Heatmap"], key="chart_type")
-        x_cols = st.multiselect("Select X-axis column(s)", st.session_state.csv_df.columns, key="x_cols")
-        y_cols = st.multiselect("Select Y-axis column(s)", st.session_state.csv_df.columns, key="y_cols")
-
-        if st.button("Generate Graph", key="generate_graph_button"):
-            if not x_cols or not y_cols:
-                st.warning("Please select at least one column for both X and Y axes.")
-            else:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                try:
-                    if chart_type == "Line":
-                        for y in y_cols:
-                            st.session_state.csv_df.plot(x=x_cols[0], y=y, ax=ax, kind='line')
-                    elif chart_type == "Bar":
-                        for y in y_cols:
-                            st.session_state.csv_df.plot(x=x_cols[0], y=y, ax=ax, kind='bar')
-                    elif chart_type == "Scatter":
-                        for y in y_cols:
-                            sns.scatterplot(x=st.session_state.csv_df[x_cols[0]], y=st.session_state.csv_df[y], ax=ax)
-                    elif chart_type == "Area":
-                        st.session_state.csv_df[x_cols + y_cols].plot.area(ax=ax)
-                    elif chart_type == "Box":
-                        st.session_state.csv_df[y_cols].plot.box(ax=ax)
-                    elif chart_type == "Histogram":
-                        st.session_state.csv_df[y_cols].plot.hist(ax=ax, alpha=0.7)
-                    elif chart_type == "Heatmap":
-                        corr = st.session_state.csv_df.corr(numeric_only=True)
-                        sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-
-                    ax.set_title(f"{chart_type} Chart")
-                    st.pyplot(fig)
-
-                    buf = BytesIO()
-                    fig.savefig(buf, format="png")
-                    st.download_button("📥 Download Graph", data=buf.getvalue(), file_name="generated_graph.png", mime="image/png")
-                except Exception as e:
-                    st.error(f"Error while plotting graph: {e}")
\ No newline at end of file
+        key = ("frame", st.session_state.get("csv_key"))
+        parsed = get_csv_cache().get(key)
+        if parsed is None or parsed.df is not st.session_state.csv_df:
+            parsed = ParsedCsv(st.session_state.csv_df)
+            get_csv_cache().put(key, parsed)
+        render_dataframe(parsed)
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from io import StringIO
+
+CSV_CACHE_MAX_MB = int(os.getenv("FINSIGHT_CSV_CACHE_MAX_MB", "1024"))
+
+
+class ParsedCsv:
+    """
+    A parsed CSV together with its derived summaries, each computed at most once.
+    """
+
+    def __init__(self, df):
+        self.df = df
+
+    @cached_property
+    def head(self):
+        return self.df.head()
+
+    @cached_property
+    def describe(self):
+        return self.df.describe()
+
+    @cached_property
+    def info(self):
+        buffer = StringIO()
+        self.df.info(buf=buffer)
+        return buffer.getvalue()
+
+    @cached_property
+    def corr(self):
+        return self.df.corr(numeric_only=True)
+
+    @cached_property
+    def nbytes(self):
+        return int(self.df.memory_usage(index=True, deep=True).sum())
+
+
+class ParsedCsvCache:
+    """
+    Process-wide LRU cache of parsed CSVs keyed by content hash, bounded by memory.
+
+    Entries report their size through an ``nbytes`` attribute; least recently
+    used entries are dropped once the total exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=CSV_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= getattr(self._entries.pop(key), "nbytes", 0)
+            self._entries[key] = entry
+            self.total_bytes += getattr(entry, "nbytes", 0)
+            # Always keep the newest entry, even if it alone exceeds the cap.
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= getattr(evicted, "nbytes", 0)
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the cached entry for ``key``, creating it with ``factory()`` on a miss.
+        """
+        entry = self.get(key)
+        if entry is None:
+            entry = factory()
+            self.put(key, entry)
+        return entry
+
+
+_cache = ParsedCsvCache()
+
+
+def get_csv_cache():
+    """
+    Returns the process-wide ParsedCsvCache.
+    """
+    return _cache
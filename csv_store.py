@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+CSV_STORE_DIR = os.getenv("FINSIGHT_CSV_STORE_DIR", "csv_store")
+LARGE_CSV_THRESHOLD_MB = int(os.getenv("FINSIGHT_LARGE_CSV_MB", "100"))
+SAMPLE_ROWS = 100_000
+CATEGORY_LIMIT = 1_000
+READ_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def content_hash(uploaded_file):
+    """
+    Returns the SHA-256 digest of an uploaded file's bytes.
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(1024 * 1024), b""):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+class _ColumnStats:
+    """
+    Running count/mean/std/min/max of a numeric column, merged batch by batch.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if not n:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        batch_min, batch_max = float(values.min()), float(values.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float("nan")
+
+
+def _optimized_type(field, stats, distinct):
+    """
+    Picks the narrowest Arrow type that holds every value seen in the column.
+    """
+    if pa.types.is_integer(field.type) and stats.count:
+        for candidate, info in ((pa.int8(), np.iinfo(np.int8)), (pa.int16(), np.iinfo(np.int16)),
+                                (pa.int32(), np.iinfo(np.int32))):
+            if info.min <= stats.min and stats.max <= info.max:
+                return candidate
+        return field.type
+    if pa.types.is_floating(field.type):
+        return pa.float32()
+    if pa.types.is_string(field.type) and distinct is not None:
+        return pa.dictionary(pa.int32(), pa.string())
+    return field.type
+
+
+def _open_reader(source, all_strings=False):
+    source.seek(0)
+    read_options = pacsv.ReadOptions(encoding="latin1", block_size=READ_BLOCK_SIZE)
+    if not all_strings:
+        return pacsv.open_csv(source, read_options=read_options)
+    # Inference from the first block failed on a later block; read everything as text.
+    header = pacsv.open_csv(source, read_options=read_options).schema.names
+    source.seek(0)
+    convert_options = pacsv.ConvertOptions(column_types={name: pa.string() for name in header})
+    return pacsv.open_csv(source, read_options=read_options, convert_options=convert_options)
+
+
+def _convert(source, parquet_path, all_strings):
+    reader = _open_reader(source, all_strings)
+    schema = reader.schema
+    numeric = [f.name for f in schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
+    stats = {name: _ColumnStats() for name in numeric}
+    non_null = {f.name: 0 for f in schema}
+    distinct = {f.name: set() for f in schema if pa.types.is_string(f.type)}
+    sample, sample_keys = None, None
+    rng = np.random.default_rng(0)
+    num_rows = 0
+
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            num_rows += batch.num_rows
+            for name in schema.names:
+                column = batch.column(name)
+                non_null[name] += len(column) - column.null_count
+                if name in stats:
+                    stats[name].update(column.to_numpy(zero_copy_only=False).astype(np.float64))
+                elif distinct.get(name) is not None:
+                    distinct[name].update(pc.unique(column).to_pylist())
+                    if len(distinct[name]) > CATEGORY_LIMIT:
+                        distinct[name] = None
+
+            # Bottom-k sampling keeps a uniform row sample of bounded size.
+            keys = rng.random(batch.num_rows)
+            table = pa.Table.from_batches([batch])
+            if sample is not None:
+                table = pa.concat_tables([sample, table])
+                keys = np.concatenate([sample_keys, keys])
+            if len(keys) > SAMPLE_ROWS:
+                keep = np.sort(np.argpartition(keys, SAMPLE_ROWS)[:SAMPLE_ROWS])
+                table, keys = table.take(pa.array(keep)), keys[keep]
+            sample, sample_keys = table, keys
+
+    if sample is None:
+        sample = schema.empty_table()
+    return schema, num_rows, stats, non_null, distinct, sample
+
+
+def convert_csv(uploaded_file, store_dir=CSV_STORE_DIR, key=None):
+    """
+    Streams a CSV into an on-disk Parquet file in one pass, collecting statistics on the way.
+
+    The CSV is read block by block with pyarrow, so memory use does not depend on
+    file size. Alongside the Parquet file a JSON sidecar records exact count, mean,
+    std, min and max per numeric column, quantiles and correlations estimated from
+    a uniform row sample, and the downcast/categorical types used when reading.
+
+    Args:
+        uploaded_file (file-like): Binary CSV stream (e.g. a Streamlit UploadedFile)
+        store_dir (str): Directory holding converted datasets
+        key (str, optional): Precomputed ``content_hash`` of the upload
+
+    Returns:
+        LargeCsvDataset: Memory-mapped view over the converted file
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    key = key or content_hash(uploaded_file)
+    parquet_path = os.path.join(store_dir, f"{key}.parquet")
+    meta_path = os.path.join(store_dir, f"{key}.json")
+    if os.path.exists(parquet_path) and os.path.exists(meta_path):
+        return LargeCsvDataset(parquet_path, meta_path)
+
+    # Sessions converting the same upload at once each write their own file; the last rename wins.
+    tmp_path = f"{parquet_path}.{uuid.uuid4().hex}.tmp"
+    all_strings = False
+    try:
+        try:
+            schema, num_rows, stats, non_null, distinct, sample = _convert(uploaded_file, tmp_path, all_strings)
+        except pa.ArrowInvalid:
+            all_strings = True
+            schema, num_rows, stats, non_null, distinct, sample = _convert(uploaded_file, tmp_path, all_strings)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    optimized = pa.schema([pa.field(f.name, _optimized_type(f, stats.get(f.name), distinct.get(f.name)))
+                           for f in schema])
+    sample_df = sample.to_pandas()
+    numeric = list(stats)
+    describe = pd.DataFrame(
+        {name: [stats[name].count, stats[name].mean, stats[name].std, stats[name].min]
+         + list(sample_df[name].quantile([0.25, 0.5, 0.75]))
+         + [stats[name].max] for name in numeric},
+        index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+    )
+    meta = {
+        "num_rows": num_rows,
+        "columns": schema.names,
+        "dtypes": {f.name: str(f.type) for f in schema},
+        "optimized_types": {f.name: str(f.type) for f in optimized},
+        "non_null": non_null,
+        "describe": describe.to_dict(),
+        "corr": sample_df[numeric].corr().to_dict() if numeric else {},
+        "all_strings": all_strings,
+        "size_bytes": os.path.getsize(tmp_path),
+    }
+    os.replace(tmp_path, parquet_path)
+    meta_tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+    with open(meta_tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_tmp_path, meta_path)
+    return LargeCsvDataset(parquet_path, meta_path)
+
+
+class LargeCsvDataset:
+    """
+    Read-only view over a converted CSV kept on disk as Parquet.
+
+    The file is memory-mapped and only the requested columns and rows are
+    materialized, with integers downcast, floats stored as float32 and
+    low-cardinality text as pandas categoricals.
+    """
+
+    def __init__(self, parquet_path, meta_path):
+        self.parquet_path = parquet_path
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        self.file = pq.ParquetFile(parquet_path, memory_map=True)
+        self.schema = self.file.schema_arrow
+        self.optimized_schema = pa.schema([
+            pa.field(f.name, self._optimized_field_type(f)) for f in self.schema
+        ])
+
+    def _optimized_field_type(self, field):
+        type_name = self.meta["optimized_types"][field.name]
+        if type_name.startswith("dictionary"):
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.type_for_alias(type_name) if type_name in ("int8", "int16", "int32", "float") else field.type
+
+    @property
+    def columns(self):
+        return self.meta["columns"]
+
+    @property
+    def num_rows(self):
+        return self.meta["num_rows"]
+
+    def _to_pandas(self, table):
+        schema = pa.schema([self.optimized_schema.field(name) for name in table.schema.names])
+        return table.cast(schema).to_pandas()
+
+    def head(self, n=5):
+        """
+        Returns the first ``n`` rows without reading the rest of the file.
+        """
+        batches = self.file.iter_batches(batch_size=n)
+        batch = next(batches, None)
+        if batch is None:
+            return pd.DataFrame(columns=self.columns)
+        return self._to_pandas(pa.Table.from_batches([batch]))
+
+    def read_columns(self, columns, max_rows=None):
+        """
+        Reads the given columns, keeping every ``k``-th row when ``max_rows`` is set
+        so that at most ``max_rows`` rows are materialized.
+        """
+        columns = list(dict.fromkeys(columns))
+        if max_rows is None or self.num_rows <= max_rows:
+            return self._to_pandas(self.file.read(columns=columns))
+        stride = -(-self.num_rows // max_rows)
+        parts, offset = [], 0
+        for batch in self.file.iter_batches(columns=columns):
+            start = (-offset) % stride
+            parts.append(batch.take(pa.array(np.arange(start, batch.num_rows, stride))))
+            offset += batch.num_rows
+        return self._to_pandas(pa.Table.from_batches(parts))
+
+    def describe(self):
+        """
+        Returns a ``DataFrame.describe()``-style table computed during conversion.
+        """
+        return pd.DataFrame(self.meta["describe"])
+
+    def corr(self):
+        """
+        Returns the correlation matrix of numeric columns, estimated from the row sample.
+        """
+        return pd.DataFrame(self.meta["corr"])
+
+    def info(self):
+        """
+        Returns ``DataFrame.info()``-style text built from the stored metadata.
+        """
+        dtypes = self._to_pandas(self.optimized_schema.empty_table()).dtypes
+        lines = [
+            f"<class '{type(self).__name__}'>",
+            f"RangeIndex: {self.num_rows} entries",
+            f"Data columns (total {len(self.columns)} columns):",
+        ]
+        for i, name in enumerate(self.columns):
+            lines.append(f" {i}  {name}  {self.meta['non_null'][name]} non-null  {dtypes[name]}")
+        counts = dtypes.astype(str).value_counts()
+        lines.append("dtypes: " + ", ".join(f"{dtype}({count})" for dtype, count in counts.items()))
+        size_mb = self.meta["size_bytes"] / (1024 * 1024)
+        lines.append(f"storage: Parquet on disk, {size_mb:.1f} MB, memory-mapped")
+        return "\n".join(lines)
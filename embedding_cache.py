@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import record_cache, span
+
+EMBEDDING_CACHE_PATH = os.getenv("FINSIGHT_EMBEDDING_CACHE_PATH", os.path.join("index_cache", "embeddings.sqlite3"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("FINSIGHT_EMBEDDING_BATCH_SIZE", "64"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Collapses whitespace so that chunks differing only in layout share a cache entry.
+    """
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def text_hash(text):
+    """
+    Returns the SHA-256 hex digest of the normalized text.
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    SQLite-backed store of float32 embedding vectors keyed by (model, text hash).
+
+    A single connection is shared between threads and guarded by a lock; SQLite's
+    WAL mode lets several processes read and write the same file.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model, hashes):
+        """
+        Looks up vectors for the given hashes.
+
+        Returns:
+            dict: Mapping of text hash to vector (list of floats) for the hashes found
+        """
+        found = {}
+        hashes = list(hashes)
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model, items):
+        """
+        Stores vectors for the given (text hash, vector) pairs.
+        """
+        rows = [(model, digest, np.asarray(vector, dtype=np.float32).tobytes()) for digest, vector in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters accumulated by this process
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(path=EMBEDDING_CACHE_PATH):
+    """
+    Returns the process-wide EmbeddingStore for ``path``, opening it on first use.
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EmbeddingStore(path)
+        return _stores[path]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object so that document chunks are only embedded once.
+
+    Chunks are deduplicated by normalized content, looked up in the store, and only
+    the misses are sent to the underlying embedder in batches of ``batch_size``.
+    Query embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings, model, store=None, batch_size=EMBEDDING_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model = model
+        self.store = store or get_embedding_store()
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.store.get_many(self.model, set(hashes))
+
+        pending = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in vectors and digest not in pending:
+                pending[digest] = text
+
+        hits = len(texts) - len(pending)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(pending)
+        self.store.record(hits, len(pending))
+        record_cache("embedding", True, hits)
+        record_cache("embedding", False, len(pending))
+
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), self.batch_size):
+            batch = pending_items[start:start + self.batch_size]
+            with span("embed.documents", chunks=len(batch), model=self.model):
+                embedded = self.embeddings.embed_documents([text for _, text in batch])
+            new_vectors = [
+                (digest, np.asarray(vector, dtype=np.float32).tolist())
+                for (digest, _), vector in zip(batch, embedded)
+            ]
+            self.store.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+
+        return [list(vectors[digest]) for digest in hashes]
+
+    def embed_query(self, text):
+        with span("embed.query", model=self.model):
+            return self.embeddings.embed_query(text)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters for this wrapper
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,74 @@
+import os
+import threading
+
+from embedding_cache import CachedEmbeddings
+
+EMBEDDING_BACKEND = os.getenv("FINSIGHT_EMBEDDING_BACKEND", "gemini")
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+LOCAL_EMBEDDING_MODEL = os.getenv("FINSIGHT_LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_THREADS = int(os.getenv("FINSIGHT_LOCAL_EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("FINSIGHT_LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+
+BACKENDS = ("gemini", "local")
+
+_local_models = {}
+_local_models_lock = threading.Lock()
+
+
+def embedding_backend_id(backend=None):
+    """
+    Returns the identifier recorded with every index, e.g. ``"gemini:models/embedding-001"``.
+
+    Indexes and cached vectors are only ever combined when their identifiers match.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "gemini":
+        return f"gemini:{GEMINI_EMBEDDING_MODEL}"
+    if backend == "local":
+        return f"local:{LOCAL_EMBEDDING_MODEL}"
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}.")
+
+
+def _local_embeddings():
+    with _local_models_lock:
+        if LOCAL_EMBEDDING_MODEL not in _local_models:
+            import torch
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+
+            torch.set_num_threads(LOCAL_EMBEDDING_THREADS)
+            _local_models[LOCAL_EMBEDDING_MODEL] = HuggingFaceEmbeddings(
+                model_name=LOCAL_EMBEDDING_MODEL,
+                model_kwargs={"device": "cpu"},
+                encode_kwargs={"batch_size": LOCAL_EMBEDDING_BATCH_SIZE, "normalize_embeddings": True},
+            )
+        return _local_models[LOCAL_EMBEDDING_MODEL]
+
+
+def get_base_embeddings(backend=None):
+    """
+    Returns the uncached Embeddings object for a backend.
+
+    The local backend runs a sentence-transformers model on the CPU; it is loaded
+    once per process and shared.
+
+    Raises:
+        ValueError: If the backend is unknown or the Gemini API key is missing
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "gemini":
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not set in environment.")
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return GoogleGenerativeAIEmbeddings(model=GEMINI_EMBEDDING_MODEL, google_api_key=api_key)
+    if backend == "local":
+        return _local_embeddings()
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}.")
+
+
+def get_embeddings(backend=None):
+    """
+    Returns the configured embedding backend wrapped in the chunk embedding cache.
+    """
+    return CachedEmbeddings(get_base_embeddings(backend), embedding_backend_id(backend))
@@ -0,0 +1,463 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import weakref
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from chunk_store import has_chunk_store, load_docstore, save_docstore
+from index_types import (
+    EXACT_INDEX_TYPES,
+    INDEX_TRAIN_THRESHOLD,
+    INDEX_TYPE,
+    apply_search_params,
+    build_index,
+    index_type_of,
+)
+from keyword_index import peek_keyword_index, set_keyword_index
+
+INDEX_CACHE_DIR = os.getenv("FINSIGHT_INDEX_CACHE_DIR", "index_cache")
+INDEX_CACHE_MAX_BYTES = int(os.getenv("FINSIGHT_INDEX_CACHE_MAX_MB", "2048")) * 1024 * 1024
+INDEX_CACHE_MMAP = os.getenv("FINSIGHT_INDEX_CACHE_MMAP", "1") != "0"
+
+INDEX_FILE = "index.faiss"
+# Pickled docstore of entries written before the memory-mapped chunk store; still read.
+DOCSTORE_FILE = "index.pkl"
+META_FILE = "meta.json"
+KEYWORD_FILE = "keywords.pkl"
+# Per-page content fingerprints and text hashes, used to update the index of a changed PDF.
+PAGES_FILE = "pages.json"
+# Latest index key of each indexed file, by real path.
+SOURCES_FILE = "sources.json"
+
+# Vectorstores that must not be modified: memory-mapped from the cache or shared
+# between sessions through the index registry.
+_READ_ONLY = weakref.WeakSet()
+# Embedding backend identifier of each loaded or built vectorstore.
+_BACKENDS = weakref.WeakKeyDictionary()
+_sources_lock = threading.Lock()
+
+
+def file_content_hash(path, block_size=1024 * 1024):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        path (str): Path to the file
+        block_size (int): Number of bytes read per iteration
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash, **params):
+    """
+    Builds a cache key from a content hash and the parameters that shaped the index.
+
+    Args:
+        content_hash (str): Digest of the source document
+        **params: Splitter and embedding parameters (chunk size, overlap, model, ...)
+
+    Returns:
+        str: Hex digest identifying the index
+    """
+    payload = json.dumps({"content": content_hash, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_dir(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def load_cached_vectorstore(key, embeddings, cache_dir=INDEX_CACHE_DIR, mmap=INDEX_CACHE_MMAP):
+    """
+    Loads a FAISS vectorstore from the on-disk cache.
+
+    When ``mmap`` is enabled the index vectors and chunk texts are memory-mapped
+    rather than read into memory, so the returned vectorstore is read-only. Use
+    ``ensure_writable`` before adding texts to it.
+
+    Args:
+        key (str): Cache key from ``make_cache_key``
+        embeddings (Embeddings): Embedding function used for queries
+        cache_dir (str): Root directory of the cache
+        mmap (bool): Memory-map the index file instead of loading it
+
+    Returns:
+        FAISS or None: The cached vectorstore, or None on a cache miss
+    """
+    entry = _entry_dir(key, cache_dir)
+    index_path = os.path.join(entry, INDEX_FILE)
+    docstore_path = os.path.join(entry, DOCSTORE_FILE)
+    if not (os.path.exists(index_path) and (has_chunk_store(entry) or os.path.exists(docstore_path))):
+        return None
+
+    try:
+        if mmap:
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(index_path, flags)
+        else:
+            index = faiss.read_index(index_path)
+        if has_chunk_store(entry):
+            docstore, index_to_docstore_id = load_docstore(entry, writable=not mmap)
+        else:
+            with open(docstore_path, "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+        index = apply_search_params(index)
+    except Exception:
+        # A partially written or corrupt entry is treated as a miss and rebuilt.
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+
+    meta_path = os.path.join(entry, META_FILE)
+    _touch(meta_path)
+    vectorstore = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    if mmap:
+        _READ_ONLY.add(vectorstore)
+    try:
+        with open(meta_path) as f:
+            backend = json.load(f).get("embedding_backend")
+    except (OSError, ValueError):
+        backend = None
+    if backend:
+        set_index_backend(vectorstore, backend)
+    keyword_path = os.path.join(entry, KEYWORD_FILE)
+    if os.path.exists(keyword_path):
+        try:
+            with open(keyword_path, "rb") as f:
+                keyword_index = pickle.load(f)
+            # The index was built in FAISS order, so its documents map onto the loaded docstore IDs.
+            if len(keyword_index) == len(index_to_docstore_id):
+                keyword_index.doc_ids = [index_to_docstore_id[i] for i in range(len(keyword_index))]
+                set_keyword_index(vectorstore, keyword_index)
+        except Exception:
+            # Rebuilt from the docstore on first keyword search.
+            pass
+    return vectorstore
+
+
+def save_vectorstore_to_cache(key, vectorstore, meta=None, pages=None, cache_dir=INDEX_CACHE_DIR,
+                              max_bytes=INDEX_CACHE_MAX_BYTES):
+    """
+    Writes a FAISS vectorstore to the on-disk cache and evicts old entries.
+
+    The entry is written to a temporary directory and renamed into place, so
+    concurrent processes never observe a half-written index.
+
+    Args:
+        key (str): Cache key from ``make_cache_key``
+        vectorstore (FAISS): Vectorstore to persist
+        meta (dict, optional): Extra information stored alongside the index
+        pages (dict, optional): Per-page hashes of the source document (see ``load_page_hashes``)
+        cache_dir (str): Root directory of the cache
+        max_bytes (int): Size cap for the whole cache directory
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = _entry_dir(key, cache_dir)
+    tmp_entry = os.path.join(cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+    os.makedirs(tmp_entry)
+    try:
+        faiss.write_index(vectorstore.index, os.path.join(tmp_entry, INDEX_FILE))
+        save_docstore(tmp_entry, vectorstore)
+        keyword_index = peek_keyword_index(vectorstore)
+        if keyword_index is not None:
+            with open(os.path.join(tmp_entry, KEYWORD_FILE), "wb") as f:
+                pickle.dump(keyword_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if pages is not None:
+            with open(os.path.join(tmp_entry, PAGES_FILE), "w") as f:
+                json.dump(pages, f)
+        with open(os.path.join(tmp_entry, META_FILE), "w") as f:
+            json.dump({**(meta or {}), "created_at": time.time()}, f)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Another process cached the same key first; keep its entry.
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        raise
+
+    evict_lru(max_bytes, cache_dir=cache_dir, keep={key})
+
+
+def load_page_hashes(key, cache_dir=INDEX_CACHE_DIR):
+    """
+    Returns the per-page hashes stored with a cache entry.
+
+    Returns:
+        dict or None: Index ``settings`` plus ``fingerprints`` and ``text_hashes`` lists
+        indexed by page, or None if the entry is missing or was written without them
+    """
+    try:
+        with open(os.path.join(_entry_dir(key, cache_dir), PAGES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_sources(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, SOURCES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def previous_source_key(path, cache_dir=INDEX_CACHE_DIR):
+    """
+    Returns the key of the index last built or loaded for the file at ``path``, if any.
+    """
+    return _read_sources(cache_dir).get(os.path.realpath(path))
+
+
+def record_source_key(path, key, cache_dir=INDEX_CACHE_DIR):
+    """
+    Remembers ``key`` as the current index of the file at ``path``, so the next
+    version of the file can be indexed as an update of this one.
+    """
+    path = os.path.realpath(path)
+    with _sources_lock:
+        sources = _read_sources(cache_dir)
+        if sources.get(path) == key:
+            return
+        sources[path] = key
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = os.path.join(cache_dir, f".{SOURCES_FILE}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(sources, f)
+            os.replace(tmp_path, os.path.join(cache_dir, SOURCES_FILE))
+        except OSError:
+            # Only costs a full rebuild the next time the file changes.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def evict_lru(max_bytes=INDEX_CACHE_MAX_BYTES, cache_dir=INDEX_CACHE_DIR, keep=()):
+    """
+    Removes least recently used cache entries until the cache fits under ``max_bytes``.
+
+    Args:
+        max_bytes (int): Size cap for the whole cache directory
+        cache_dir (str): Root directory of the cache
+        keep (Iterable[str]): Keys that must not be evicted
+
+    Returns:
+        list: Keys of the evicted entries
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        meta_path = os.path.join(path, META_FILE)
+        last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else os.path.getmtime(path)
+        entries.append((last_used, name, _dir_size(path)))
+
+    total = sum(size for _, _, size in entries)
+    evicted = []
+    for _, name, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name in keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        evicted.append(name)
+    return evicted
+
+
+def set_index_backend(vectorstore, backend_id):
+    """
+    Records which embedding backend produced a vectorstore's vectors.
+    """
+    _BACKENDS[vectorstore] = backend_id
+
+
+def get_index_backend(vectorstore):
+    """
+    Returns the embedding backend identifier recorded for a vectorstore, if any.
+    """
+    return _BACKENDS.get(vectorstore)
+
+
+def check_same_backend(*vectorstores):
+    """
+    Raises ValueError if the vectorstores were built with different embedding backends.
+    """
+    backends = {get_index_backend(vs) for vs in vectorstores} - {None}
+    if len(backends) > 1:
+        raise ValueError(
+            "Cannot combine indexes built with different embedding backends: " + ", ".join(sorted(backends))
+        )
+
+
+def mark_read_only(vectorstore):
+    """
+    Marks a vectorstore as shared, so ``ensure_writable`` copies it before any write.
+    """
+    _READ_ONLY.add(vectorstore)
+    return vectorstore
+
+
+def is_read_only(vectorstore):
+    """
+    Returns True if the vectorstore is memory-mapped from the cache or shared.
+    """
+    return vectorstore in _READ_ONLY
+
+
+def stored_vectors(vectorstore, rows, texts, embeddings=None):
+    """
+    Returns the embedding vectors of index ``rows`` of ``vectorstore``.
+
+    Exact index types give back the stored vectors. Quantized ones (sq8, ivf_pq)
+    only approximate them, and indexing those approximations again would
+    quantize twice and lose recall, so ``texts`` are embedded again instead; the
+    embedding cache serves them without calling the backend.
+
+    Args:
+        vectorstore (FAISS): Vectorstore holding the rows
+        rows (list): Index rows to return
+        texts (list): Text of each row
+        embeddings (Embeddings, optional): Embedding function; the vectorstore's own if omitted
+
+    Returns:
+        ndarray: float32 array of shape (len(rows), dimension)
+    """
+    if rows and index_type_of(vectorstore.index) in EXACT_INDEX_TYPES:
+        try:
+            return vectorstore.index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+        except RuntimeError:
+            # IVF indexes without a direct map cannot reconstruct.
+            pass
+    embeddings = embeddings or vectorstore.embedding_function
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32).reshape(len(texts), vectorstore.index.d)
+
+
+def copy_vectorstore_into(target, source):
+    """
+    Appends every vector and document of ``source`` to ``target``.
+
+    Unlike ``FAISS.merge_from`` this leaves ``source`` untouched, which is
+    required for memory-mapped indexes. Vectors come from ``stored_vectors``,
+    so a quantized source is re-embedded rather than quantized again.
+
+    Args:
+        target (FAISS): Writable vectorstore receiving the vectors
+        source (FAISS): Vectorstore to copy from
+    """
+    check_same_backend(target, source)
+    if get_index_backend(target) is None and get_index_backend(source) is not None:
+        set_index_backend(target, get_index_backend(source))
+    ntotal = source.index.ntotal
+    if not ntotal:
+        return
+    docs = [source.docstore.search(source.index_to_docstore_id[i]) for i in range(ntotal)]
+    vectors = stored_vectors(source, list(range(ntotal)), [doc.page_content for doc in docs])
+    target.add_embeddings(
+        zip([doc.page_content for doc in docs], vectors.tolist()),
+        metadatas=[doc.metadata for doc in docs],
+    )
+
+
+def copy_vectorstore(vectorstore):
+    """
+    Returns an in-memory copy of a vectorstore backed by a flat L2 index.
+
+    Args:
+        vectorstore (FAISS): Vectorstore to copy
+
+    Returns:
+        FAISS: Writable copy sharing no state with ``vectorstore``
+    """
+    copy = FAISS(
+        vectorstore.embedding_function,
+        faiss.IndexFlatL2(vectorstore.index.d),
+        InMemoryDocstore(),
+        {},
+    )
+    if get_index_backend(vectorstore) is not None:
+        set_index_backend(copy, get_index_backend(vectorstore))
+    copy_vectorstore_into(copy, vectorstore)
+    return copy
+
+
+def optimize_vectorstore(vectorstore, index_type=INDEX_TYPE, threshold=INDEX_TRAIN_THRESHOLD):
+    """
+    Rebuilds a flat vectorstore's index as ``index_type`` once it is large enough.
+
+    Vectors are reconstructed from the flat index, which stores them exactly, so
+    nothing is re-embedded. Indexes that are already of another type (possibly
+    quantized), or smaller than ``threshold``, are returned unchanged.
+
+    Args:
+        vectorstore (FAISS): Vectorstore to optimize
+        index_type (str): Target index type (see ``index_types.INDEX_TYPES``)
+        threshold (int): Minimum number of vectors before a trained index is used
+
+    Returns:
+        FAISS: ``vectorstore`` itself, or a new vectorstore sharing its docstore
+    """
+    index = vectorstore.index
+    if index_type == "flat" or index.ntotal < threshold or index_type_of(index) != "flat":
+        return vectorstore
+    optimized = FAISS(
+        vectorstore.embedding_function,
+        build_index(index.reconstruct_n(0, index.ntotal), index_type),
+        vectorstore.docstore,
+        vectorstore.index_to_docstore_id,
+    )
+    if get_index_backend(vectorstore) is not None:
+        set_index_backend(optimized, get_index_backend(vectorstore))
+    return optimized
+
+
+def ensure_writable(vectorstore):
+    """
+    Returns a vectorstore that can be added to, copying read-only ones into memory.
+
+    Args:
+        vectorstore (FAISS): Vectorstore that may be backed by the cache or shared
+
+    Returns:
+        FAISS: ``vectorstore`` itself, or an in-memory copy of it
+    """
+    if not is_read_only(vectorstore):
+        return vectorstore
+    return copy_vectorstore(vectorstore)
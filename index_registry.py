@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+# Seconds an index with no remaining users stays loaded before it is dropped.
+INDEX_IDLE_SECONDS = float(os.getenv("FINSIGHT_INDEX_IDLE_SECONDS", "1800"))
+
+
+class _Entry:
+    def __init__(self):
+        self.future = Future()
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+class IndexHandle:
+    """
+    A counted reference to an index held by the registry.
+
+    The index stays loaded while any handle to it is alive. Handles release
+    themselves when garbage collected (e.g. when a Streamlit session ends), or
+    explicitly through ``release()``.
+    """
+
+    def __init__(self, registry, key, vectorstore):
+        self.key = key
+        self.vectorstore = vectorstore
+        self._finalizer = weakref.finalize(self, registry._release, key)
+
+    def release(self):
+        self._finalizer()
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+
+class IndexRegistry:
+    """
+    Process-wide, thread-safe registry handing out shared references to loaded indexes.
+
+    Each key is loaded at most once: concurrent first requests for the same key
+    wait for a single build instead of starting their own. Entries are reference
+    counted and dropped once unused for ``idle_seconds``.
+    """
+
+    def __init__(self, idle_seconds=INDEX_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def acquire(self, key, loader):
+        """
+        Returns a handle to the index for ``key``, calling ``loader()`` if it is not loaded yet.
+
+        Args:
+            key (str): Identity of the index (e.g. its cache key)
+            loader (callable): Builds or loads the vectorstore; runs on the calling thread
+
+        Returns:
+            IndexHandle: Handle whose ``vectorstore`` must be treated as read-only
+        """
+        self.evict_idle()
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+                self.builds += 1
+            else:
+                self.hits += 1
+            entry.refs += 1
+
+        if owner:
+            try:
+                entry.future.set_result(loader())
+            except BaseException as e:
+                with self._lock:
+                    self._entries.pop(key, None)
+                entry.future.set_exception(e)
+        try:
+            vectorstore = entry.future.result()
+        except BaseException:
+            with self._lock:
+                entry.refs -= 1
+            raise
+        if vectorstore is None:
+            with self._lock:
+                entry.refs -= 1
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            return None
+        return IndexHandle(self, key, vectorstore)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+                entry.last_used = time.monotonic()
+
+    def evict_idle(self, now=None):
+        """
+        Drops entries that have had no users for at least ``idle_seconds``.
+
+        Returns:
+            list: Keys of the dropped entries
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                key for key, entry in self._entries.items()
+                if entry.refs <= 0 and entry.future.done() and now - entry.last_used >= self.idle_seconds
+            ]
+            for key in idle:
+                del self._entries[key]
+        return idle
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs > 0),
+                "builds": self.builds,
+                "hits": self.hits,
+            }
+
+
+_registry = IndexRegistry()
+
+
+def get_index_registry():
+    """
+    Returns the process-wide IndexRegistry.
+    """
+    return _registry
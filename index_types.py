@@ -0,0 +1,131 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8")
+# Types that store vectors losslessly, so ``reconstruct`` returns the embedded vectors.
+EXACT_INDEX_TYPES = ("flat", "ivf_flat", "hnsw")
+INDEX_TYPE = os.getenv("FINSIGHT_INDEX_TYPE", "flat")
+# Indexes stay exact (flat) until they hold this many vectors; below it a flat
+# scan is already fast and there is too little data to train centroids on. A
+# single filing gives roughly 1-2k chunks, so the default lets the configured
+# type apply to per-document indexes and not only to merged session indexes.
+INDEX_TRAIN_THRESHOLD = int(os.getenv("FINSIGHT_INDEX_TRAIN_THRESHOLD", "1000"))
+IVF_NPROBE = int(os.getenv("FINSIGHT_IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("FINSIGHT_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = int(os.getenv("FINSIGHT_HNSW_EF_SEARCH", "64"))
+PQ_BITS = 8
+# faiss wants at least this many training points per IVF centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+
+def ivf_nlist(n):
+    """
+    Returns the number of IVF lists for ``n`` vectors (about ``4 * sqrt(n)``).
+    """
+    return max(1, min(int(4 * math.sqrt(n)), n // MIN_POINTS_PER_CENTROID))
+
+
+def pq_subquantizers(d):
+    """
+    Returns the number of PQ sub-quantizers for dimension ``d``.
+
+    Each sub-quantizer encodes 8 dimensions in one byte where ``d`` allows it,
+    so a 768-d float32 vector (3 KB) becomes a 96-byte code.
+    """
+    for dims_per_code in (8, 4, 2, 1):
+        if d % dims_per_code == 0:
+            return d // dims_per_code
+    return d
+
+
+def create_index(index_type, d, n):
+    """
+    Creates an empty L2 FAISS index of the given type sized for ``n`` vectors.
+
+    Args:
+        index_type (str): One of ``INDEX_TYPES``
+        d (int): Vector dimension
+        n (int): Number of vectors the index will be trained on
+
+    Returns:
+        faiss.Index: Untrained index
+
+    Raises:
+        ValueError: If the index type is unknown
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatL2(d)
+    if index_type == "ivf_flat":
+        return faiss.IndexIVFFlat(faiss.IndexFlatL2(d), d, ivf_nlist(n))
+    if index_type == "ivf_pq":
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(d), d, ivf_nlist(n), pq_subquantizers(d), PQ_BITS)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    if index_type == "sq8":
+        return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+    raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}.")
+
+
+def index_type_of(index):
+    """
+    Returns the ``INDEX_TYPES`` name of a FAISS index, or None for other kinds.
+    """
+    index = faiss.downcast_index(index)
+    for index_type, cls in (("ivf_pq", faiss.IndexIVFPQ), ("ivf_flat", faiss.IndexIVFFlat),
+                            ("hnsw", faiss.IndexHNSWFlat), ("sq8", faiss.IndexScalarQuantizer),
+                            ("flat", faiss.IndexFlatL2)):
+        if isinstance(index, cls):
+            return index_type
+    return None
+
+
+def apply_search_params(index):
+    """
+    Sets the configured recall/latency knobs (``nprobe``, ``efSearch``) on an index.
+
+    Returns:
+        faiss.Index: The same index
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(IVF_NPROBE, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def build_index(vectors, index_type=INDEX_TYPE):
+    """
+    Trains and fills a FAISS index of the given type.
+
+    IVF indexes keep a direct map so that vectors can still be reconstructed when
+    indexes are copied or merged.
+
+    Args:
+        vectors (ndarray): float32 array of shape (n, d)
+        index_type (str): One of ``INDEX_TYPES``
+
+    Returns:
+        faiss.Index: Index holding ``vectors`` in order
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    index = create_index(index_type, d, n)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return apply_search_params(index)
+
+
+def index_memory_bytes(index):
+    """
+    Returns the serialized size of an index, a close proxy for its memory footprint.
+    """
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,236 @@
+import contextvars
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from metrics import span
+
+INGEST_WORKERS = int(os.getenv("FINSIGHT_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBED_CONCURRENCY = int(os.getenv("FINSIGHT_EMBED_CONCURRENCY", "4"))
+PAGES_PER_TASK = 16
+QUEUE_SIZE = 8
+
+
+def extract_page_range(path, start, end):
+    """
+    Extracts the text of pages ``start``..``end - 1`` of a PDF.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Returns:
+        list: (page index, text) pairs
+    """
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _page_ranges(pages, pages_per_task):
+    # Splits sorted page indexes into runs of consecutive pages, at most ``pages_per_task`` long.
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and ranges[-1][1] - ranges[-1][0] < pages_per_task:
+            ranges[-1][1] = page + 1
+        else:
+            ranges.append([page, page + 1])
+    return [tuple(r) for r in ranges]
+
+
+def iter_pages(path, workers=INGEST_WORKERS, pages_per_task=PAGES_PER_TASK, pages=None):
+    """
+    Yields (page index, text) pairs for a PDF in page order.
+
+    Page ranges are parsed in a process pool with at most ``2 * workers`` ranges in
+    flight, so memory stays bounded no matter how long the document is. With
+    ``pages`` only those page indexes are extracted.
+
+    Workers are started with forkserver rather than fork, since callers (the
+    Streamlit server, job workers, the CLI) are multi-threaded and a forked child
+    can inherit a lock held by another thread and deadlock.
+    """
+    if pages is None:
+        pages = range(len(PdfReader(path).pages))
+    ranges = _page_ranges(sorted(pages), pages_per_task)
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            with span("ingest.parse", pages=end - start):
+                pages = extract_page_range(path, start, end)
+            yield from pages
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver")) as executor:
+        pending = []
+        ranges = iter(ranges)
+        for start, end in ranges:
+            pending.append(executor.submit(extract_page_range, path, start, end))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            # Parsing overlaps with the rest of the pipeline; this is the time spent waiting for it.
+            with span("ingest.parse_wait"):
+                pages = pending.pop(0).result()
+            yield from pages
+            next_range = next(ranges, None)
+            if next_range:
+                pending.append(executor.submit(extract_page_range, path, *next_range))
+
+
+def page_fingerprints(path):
+    """
+    Returns a SHA-256 digest of each page's content stream, in page order.
+
+    The content stream holds everything a page draws, so pages of a replaced
+    PDF whose fingerprint was seen before are taken as unchanged. Hashing it is
+    far cheaper than extracting text, so a new version can be diffed without
+    parsing every page.
+    """
+    fingerprints = []
+    for page in PdfReader(path).pages:
+        contents = page.get_contents()
+        fingerprints.append(hashlib.sha256(contents.get_data() if contents is not None else b"").hexdigest())
+    return fingerprints
+
+
+def iter_chunks(pages, source, chunk_size, chunk_overlap):
+    """
+    Splits pages into chunk Documents carrying ``source``, ``page`` and ``chunk``
+    (position within the page) metadata.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page, text in pages:
+        with span("ingest.split", page=page):
+            chunks = splitter.split_text(text)
+        for position, chunk in enumerate(chunks):
+            yield Document(page_content=chunk, metadata={"source": source, "page": page, "chunk": position})
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_vectorstore_for_pdf(path, embeddings, chunk_size, chunk_overlap, batch_size=64,
+                              progress_callback=None, workers=INGEST_WORKERS,
+                              embed_concurrency=EMBED_CONCURRENCY, on_page=None):
+    """
+    Indexes a PDF with a staged pipeline: pages are parsed in a process pool, split
+    lazily into chunks, and embedded by concurrent threads as batches arrive.
+
+    Stages are connected by a bounded queue, so parsing, splitting and embedding
+    overlap and only a few batches of text are held in memory at a time. Batches
+    may finish embedding in any order but are added to the index in document
+    order, so rows and docstore ids follow page and chunk order.
+
+    Args:
+        path (str): Path to the PDF
+        embeddings (Embeddings): Embedding function
+        chunk_size (int): Splitter chunk size
+        chunk_overlap (int): Splitter chunk overlap
+        batch_size (int): Chunks per embedding call
+        progress_callback (callable, optional): Called as ``progress_callback(fraction, message)``
+        workers (int): Processes used for page extraction
+        embed_concurrency (int): Threads calling the embedder
+        on_page (callable, optional): Called as ``on_page(page index, text)`` for every parsed page
+
+    Returns:
+        FAISS or None: Vector store for the document, or None if it has no text
+    """
+    total_pages = max(len(PdfReader(path).pages), 1)
+    name = os.path.basename(path)
+    batches = queue.Queue(maxsize=QUEUE_SIZE)
+    lock = threading.Lock()
+    # Embedded batches waiting for an earlier one, by sequence number.
+    state = {"vectorstore": None, "pages": 0, "produced": 0, "embedded": 0, "error": None,
+             "next": 0, "ready": {}}
+
+    # Progress is only reported from the calling thread, since UI callbacks
+    # (e.g. Streamlit widgets) are generally not safe to call from workers.
+    def report():
+        if progress_callback:
+            produced = max(state["produced"], 1)
+            fraction = state["pages"] / total_pages * state["embedded"] / produced
+            progress_callback(
+                min(fraction, 1.0),
+                f"{name}: {state['pages']}/{total_pages} pages parsed, {state['embedded']} chunks embedded",
+            )
+
+    def add_ready():
+        # Adds embedded batches to the index in sequence order; called with the lock held.
+        while state["next"] in state["ready"]:
+            text_embeddings, metadatas = state["ready"].pop(state["next"])
+            with span("ingest.faiss_add", chunks=len(metadatas)):
+                if state["vectorstore"] is None:
+                    state["vectorstore"] = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+                else:
+                    state["vectorstore"].add_embeddings(text_embeddings, metadatas=metadatas)
+            state["embedded"] += len(metadatas)
+            state["next"] += 1
+
+    def embed_worker():
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if state["error"]:
+                continue
+            sequence, batch = item
+            try:
+                with span("ingest.embed_batch", chunks=len(batch)):
+                    vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+                text_embeddings = list(zip([doc.page_content for doc in batch], vectors))
+                metadatas = [doc.metadata for doc in batch]
+                with lock:
+                    state["ready"][sequence] = (text_embeddings, metadatas)
+                    add_ready()
+            except Exception as e:
+                state["error"] = e
+
+    # Workers run in copies of the caller's context so their spans join the caller's trace.
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(embed_worker,), daemon=True)
+               for _ in range(embed_concurrency)]
+    for thread in threads:
+        thread.start()
+
+    def counted_pages():
+        for page in iter_pages(path, workers=workers):
+            with lock:
+                state["pages"] = page[0] + 1
+            if on_page:
+                on_page(*page)
+            yield page
+
+    try:
+        batched = _batched(iter_chunks(counted_pages(), path, chunk_size, chunk_overlap), batch_size)
+        for sequence, batch in enumerate(batched):
+            if state["error"]:
+                break
+            with lock:
+                state["produced"] += len(batch)
+            batches.put((sequence, batch))
+            report()
+    finally:
+        for _ in threads:
+            batches.put(None)
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.25)
+                report()
+
+    if state["error"]:
+        raise state["error"]
+    if progress_callback:
+        progress_callback(1.0, f"{name}: {state['embedded']} chunks embedded")
+    return state["vectorstore"]
@@ -0,0 +1,334 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import STAGE_SECONDS, get_metrics, span
+
+JOB_DB_PATH = os.getenv("FINSIGHT_JOB_DB_PATH", os.path.join("index_cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("FINSIGHT_JOB_WORKERS", "2"))
+MAX_JOBS_PER_USER = int(os.getenv("FINSIGHT_MAX_JOBS_PER_USER", "2"))
+# Minimum seconds between progress writes for one job.
+PROGRESS_INTERVAL = 0.5
+# Running jobs have their ``updated_at`` refreshed this often by the process running them.
+HEARTBEAT_INTERVAL = 10
+# Running jobs whose heartbeat is older than this are taken to be orphaned and requeued.
+JOB_STALE_SECONDS = int(os.getenv("FINSIGHT_JOB_STALE_SECONDS", "60"))
+
+_COLUMNS = ("id", "user", "kind", "payload", "status", "progress", "message", "result", "error",
+            "created_at", "updated_at", "owner")
+
+
+def run_pdf_job(payload, progress):
+    """
+    Builds (or loads from the cache) the shared index of one PDF.
+    """
+    from embeddings import get_embeddings
+    from utils import load_shared_pdf_vectorstore
+
+    handle = load_shared_pdf_vectorstore(payload["path"], get_embeddings(), progress)
+    if handle is None:
+        raise ValueError(f"No text found in {os.path.basename(payload['path'])}.")
+    chunks = handle.vectorstore.index.ntotal
+    # Leave the index loaded (idle) in the registry for the session that asked for it.
+    handle.release()
+    return {"path": payload["path"], "chunks": chunks}
+
+
+_news_lock = threading.Lock()
+
+
+def run_news_job(payload, progress):
+    """
+    Syncs the persisted news index with a list of URLs.
+    """
+    from embeddings import embedding_backend_id, get_embeddings
+    from news_index import sync_news_index
+    from utils import CHUNK_OVERLAP, CHUNK_SIZE
+
+    embeddings = get_embeddings()
+    # All sessions share one news index directory, so syncs run one at a time.
+    with _news_lock:
+        _, report = sync_news_index(
+            payload["urls"],
+            embeddings,
+            payload["index_dir"],
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            backend_id=embedding_backend_id(),
+            progress_callback=progress,
+        )
+    return {"report": report, "embedding_cache": embeddings.stats()}
+
+
+HANDLERS = {"pdf": run_pdf_job, "news": run_news_job}
+
+
+class JobQueue:
+    """
+    Local worker pool running ingest jobs in the background, backed by a SQLite job table.
+
+    Jobs run on ``workers`` threads, with at most ``max_per_user`` running at once
+    for any one user; further jobs wait in the queue. Progress, results and errors
+    are written to the table so any session can poll them. Jobs that were queued
+    or running when the process stopped are resumed on startup.
+
+    Several processes (Streamlit workers, ``cli.py`` runs, replicas sharing the
+    cache directory) can use the same table. Each job is claimed in a write
+    transaction that only succeeds while it is still queued, and records its
+    owner (host, process and queue) while it runs. The owner refreshes
+    ``updated_at`` as a heartbeat. Running jobs are requeued only when their
+    owner's process has exited or the heartbeat is older than ``stale_seconds``.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, workers=JOB_WORKERS, max_per_user=MAX_JOBS_PER_USER, handlers=None,
+                 stale_seconds=JOB_STALE_SECONDS, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.max_per_user = max_per_user
+        self.handlers = HANDLERS if handlers is None else handlers
+        self.stale_seconds = stale_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit, so that write transactions can be opened with BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " user TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " progress REAL NOT NULL DEFAULT 0,"
+            " message TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finsight-job")
+        self._requeue_orphans()
+        self._dispatch()
+        threading.Thread(target=self._heartbeat, name="finsight-job-heartbeat", daemon=True).start()
+
+    @contextmanager
+    def _transaction(self):
+        # Takes the database write lock up front, so reads inside see no other process's changes.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _owner_alive(self, owner):
+        host, _, pid = owner.rpartition(":")[0].rpartition(":")
+        if host != socket.gethostname():
+            # Processes on other hosts can only be judged by their heartbeat.
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, ValueError):
+            pass
+        return True
+
+    def _requeue_orphans(self):
+        # Jobs whose owner died or stopped heartbeating start over, in whichever process notices first.
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, updated_at FROM jobs WHERE status = 'running' AND owner IS NOT ?", (self.owner,)
+            ).fetchall()
+            for job_id, owner, updated_at in rows:
+                if now - updated_at <= self.stale_seconds and owner is not None and self._owner_alive(owner):
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', progress = 0, owner = NULL, updated_at = ?"
+                    " WHERE id = ? AND status = 'running' AND owner IS ?",
+                    (now, job_id, owner),
+                )
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET updated_at = ? WHERE status = 'running' AND owner = ?",
+                        (time.time(), self.owner),
+                    )
+                self._requeue_orphans()
+                # Also starts jobs submitted by other processes.
+                self._dispatch()
+            except sqlite3.Error:
+                # Retried on the next beat; a missed beat or two is within ``stale_seconds``.
+                pass
+
+    def submit(self, user, kind, payload):
+        """
+        Queues a job and returns its ID.
+
+        Args:
+            user (str): Owner of the job
+            kind (str): Handler name (``"pdf"`` or ``"news"``)
+            payload (dict): JSON-serializable handler arguments
+
+        Returns:
+            str: Job ID
+
+        Raises:
+            ValueError: If there is no handler for ``kind``
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind!r}.")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, user, kind, payload, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, user, kind, json.dumps(payload), now, now),
+            )
+        self._dispatch()
+        return job_id
+
+    def _dispatch(self):
+        # Claim queued jobs in FIFO order while this process has free workers and
+        # their users are under the per-user limit (counted across all processes).
+        with self._transaction() as conn:
+            per_user = dict(conn.execute(
+                "SELECT user, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY user"
+            ).fetchall())
+            free = self.workers - conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND owner = ?", (self.owner,)
+            ).fetchone()[0]
+            started = []
+            for job_id, user in conn.execute(
+                "SELECT id, user FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall():
+                if free <= 0:
+                    break
+                if per_user.get(user, 0) >= self.max_per_user:
+                    continue
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (self.owner, time.time(), job_id),
+                ).rowcount
+                if claimed == 1:
+                    per_user[user] = per_user.get(user, 0) + 1
+                    free -= 1
+                    started.append(job_id)
+        for job_id in started:
+            self._executor.submit(self._run, job_id)
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            # A job requeued and claimed elsewhere (e.g. after a long stall) is no longer ours to write.
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?", (*fields.values(), job_id, self.owner)
+            )
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        get_metrics().observe(STAGE_SECONDS, time.time() - job["created_at"], stage=f"job.{job['kind']}.queued")
+        last_write = 0.0
+
+        def progress(fraction, message):
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write >= PROGRESS_INTERVAL:
+                last_write = now
+                self._update(job_id, progress=float(fraction), message=message)
+
+        try:
+            with span(f"job.{job['kind']}", job=job_id):
+                result = self.handlers[job["kind"]](job["payload"], progress)
+            self._update(job_id, status="done", progress=1.0, result=json.dumps(result))
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e) or type(e).__name__)
+        finally:
+            self._dispatch()
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(zip(_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict or None: The job's row, with ``payload`` and ``result`` decoded
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, user, limit=10):
+        """
+        Returns a user's most recent jobs, newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE user = ? ORDER BY created_at DESC LIMIT ?",
+                (user, limit),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def active_count(self, user):
+        """
+        Returns the number of a user's jobs that are queued or running.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user = ? AND status IN ('queued', 'running')", (user,)
+            ).fetchone()
+        return row[0]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Returns the process-wide JobQueue, starting it (and resuming unfinished jobs) on first use.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def peek_job_queue():
+    """
+    Returns the process-wide JobQueue if it has been started, without starting it.
+    """
+    with _queue_lock:
+        return _queue
@@ -0,0 +1,142 @@
+import math
+import re
+import threading
+import weakref
+
+import numpy as np
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words, tickers and numbers; "1,234.5" and "10-q" stay single tokens.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,\-][a-z0-9]+)*")
+
+# (keyword index, copy of index_to_docstore_id it was attached with) of each
+# vectorstore, built on first use or loaded from the index cache.
+_INDEXES = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase BM25 terms.
+
+    Numbers written with thousands separators are also indexed without them,
+    so "1,234" matches "1234".
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    extra = [token.replace(",", "") for token in tokens if "," in token]
+    return tokens + extra
+
+
+class KeywordIndex:
+    """
+    In-memory BM25 inverted index over a fixed list of documents.
+
+    Postings of all terms are stored in two flat arrays (document number and
+    precomputed BM25 term weight), so a query is a handful of vectorized
+    scatter-adds regardless of corpus size.
+
+    Args:
+        doc_ids (list): Identifier returned for each document (e.g. docstore IDs)
+        texts (Iterable[str]): Text of each document, in the same order
+    """
+
+    def __init__(self, doc_ids, texts, k1=BM25_K1, b=BM25_B):
+        self.doc_ids = list(doc_ids)
+        postings = {}
+        lengths = []
+        for number, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((number, count))
+
+        n = len(self.doc_ids)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        norm = k1 * (1 - b + b * lengths / (lengths.mean() if n and lengths.mean() else 1.0))
+        self.vocab = {}
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.idf = np.zeros(len(postings), dtype=np.float32)
+        docs, weights = [], []
+        for term_id, (term, entries) in enumerate(postings.items()):
+            self.vocab[term] = term_id
+            entry_docs = np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries))
+            tf = np.fromiter((count for _, count in entries), dtype=np.float32, count=len(entries))
+            docs.append(entry_docs)
+            weights.append(tf * (k1 + 1) / (tf + norm[entry_docs]))
+            self.offsets[term_id + 1] = self.offsets[term_id] + len(entries)
+            self.idf[term_id] = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+        self.docs = np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query, k):
+        """
+        Returns the ``k`` best BM25 matches for a query.
+
+        Returns:
+            list: (doc_id, score) pairs, best first; documents sharing no term are omitted
+        """
+        term_ids = [self.vocab[term] for term in set(tokenize(query)) if term in self.vocab]
+        if not term_ids or not self.doc_ids:
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A term lists each document at most once, so plain fancy indexing is safe.
+            scores[self.docs[start:end]] += self.idf[term_id] * self.weights[start:end]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """
+        Builds the index over every document of a FAISS vectorstore, in index order.
+        """
+        doc_ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        return cls(doc_ids, (vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids))
+
+
+def set_keyword_index(vectorstore, index):
+    """
+    Attaches a prebuilt keyword index to a vectorstore.
+    """
+    # Writes change index_to_docstore_id in place, so a copy shows whether the index still matches.
+    ids = vectorstore.index_to_docstore_id
+    snapshot = dict(ids) if isinstance(ids, dict) else None
+    with _INDEXES_LOCK:
+        _INDEXES[vectorstore] = (index, snapshot)
+
+
+def peek_keyword_index(vectorstore):
+    """
+    Returns the keyword index attached to a vectorstore, without building one.
+    """
+    with _INDEXES_LOCK:
+        entry = _INDEXES.get(vectorstore)
+    return entry[0] if entry is not None else None
+
+
+def get_keyword_index(vectorstore):
+    """
+    Returns the keyword index of a vectorstore, (re)building it if it is missing
+    or the vectorstore's documents changed since it was built.
+    """
+    with _INDEXES_LOCK:
+        index, snapshot = _INDEXES.get(vectorstore, (None, None))
+    ids = vectorstore.index_to_docstore_id
+    # A delete followed by as many adds keeps the count, so dict mappings are compared by
+    # their IDs; other mappings (e.g. ``RowIds`` of read-only chunk stores) never change.
+    stale = index is None or len(index) != len(ids) or (isinstance(ids, dict) and snapshot != ids)
+    if stale:
+        index = KeywordIndex.from_vectorstore(vectorstore)
+        set_keyword_index(vectorstore, index)
+    return index
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import groq
+import httpx
+from langchain_groq import ChatGroq
+
+from context import estimate_tokens
+from metrics import STAGE_SECONDS, get_metrics
+from rate_limit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Point at another OpenAI-compatible endpoint, e.g. benchmarks/fake_groq.py for offline testing.
+GROQ_BASE_URL = os.getenv("FINSIGHT_GROQ_BASE_URL") or None
+# Groq's free tier allows 30 requests and 30k tokens per minute per model; FINSIGHT_SUMMARY_RPM is the older name.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("FINSIGHT_LLM_RPM", os.getenv("FINSIGHT_SUMMARY_RPM", "30")))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("FINSIGHT_LLM_TPM", "30000"))
+LLM_MAX_RETRIES = int(os.getenv("FINSIGHT_LLM_MAX_RETRIES", "4"))
+LLM_MAX_CONNECTIONS = int(os.getenv("FINSIGHT_LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.getenv("FINSIGHT_LLM_TIMEOUT", "60"))
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_http_client = None
+_http_lock = threading.Lock()
+
+
+def _limits():
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+
+def get_http_client():
+    """
+    Returns the process-wide pooled HTTP client used for synchronous LLM calls.
+    """
+    global _http_client
+    with _http_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT)
+        return _http_client
+
+
+def request_key(model, messages):
+    """
+    Identifies a request by model and message contents, for coalescing identical calls.
+    """
+    payload = json.dumps([model, [(message.type, message.content) for message in messages]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def retry_delay(error, attempt):
+    """
+    Returns how long to wait before retrying after ``error``, or None if it is not retryable.
+
+    Exponential backoff with full jitter, so that clients throttled together do
+    not retry together, added to the server's ``Retry-After`` when it sends one.
+    """
+    retry_after = 0.0
+    if isinstance(error, groq.APIStatusError):
+        if error.status_code not in RETRYABLE_STATUS:
+            return None
+        try:
+            retry_after = float(error.response.headers.get("retry-after", 0))
+        except ValueError:
+            pass
+    elif not isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+        return None
+    return min(RETRY_MAX_SECONDS, retry_after + random.uniform(0, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+class LLMClient:
+    """
+    Shared, rate-limited client for one Groq model.
+
+    Every page, job and CLI run in the process uses the same client per model:
+    calls go through one pooled HTTP client, wait on process-wide request and
+    token buckets (``llm:<model>`` and ``llm-tokens:<model>``), and are retried
+    with jittered backoff on 429s, 5xx responses and connection errors.
+    Identical ``invoke``/``ainvoke`` calls in flight at the same time share one
+    request. ``invoke``, ``stream`` and ``model_name`` match the chat model
+    interface used by ``qa`` and ``summarize``.
+    """
+
+    def __init__(self, model_name, api_key=None, base_url=GROQ_BASE_URL,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES, period=60.0):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.requests = get_rate_limiter(f"llm:{model_name}", requests_per_minute, period)
+        self.tokens = get_rate_limiter(f"llm-tokens:{model_name}", tokens_per_minute, period)
+        # Retries are handled here, so the SDK's own retries are disabled.
+        self.model = self._make_model(http_client=get_http_client())
+        # httpx async connections belong to the event loop that opened them: loop -> (model, closer).
+        self._async_models = weakref.WeakKeyDictionary()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _make_model(self, **clients):
+        return ChatGroq(groq_api_key=self.api_key, model_name=self.model_name, base_url=self.base_url,
+                        max_retries=0, **clients)
+
+    async def _close_at_shutdown(self, loop_ref, client):
+        # Event loops close their live async generators on shutdown (``asyncio.run`` does this
+        # before closing the loop), which closes the loop's connection pool here. The loop is
+        # only referenced weakly, so this entry does not keep its own key alive.
+        try:
+            yield
+        finally:
+            with self._lock:
+                loop = loop_ref()
+                if loop is not None:
+                    self._async_models.pop(loop, None)
+            await client.aclose()
+
+    async def _async_model(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Loops closed without shutdown_asyncgens() never ran their closer; their
+            # connections cannot be closed without a running loop, so they are only
+            # dropped here for the garbage collector.
+            for closed in [other for other in self._async_models.keys() if other.is_closed()]:
+                del self._async_models[closed]
+            entry = self._async_models.get(loop)
+            if entry is None:
+                client = httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT)
+                entry = self._async_models[loop] = (self._make_model(http_async_client=client),
+                                                    self._close_at_shutdown(weakref.ref(loop), client))
+                started = False
+            else:
+                started = True
+        if not started:
+            await entry[1].__anext__()
+        return entry[0]
+
+    async def aclose(self):
+        """
+        Closes the HTTP client opened for the running event loop.
+
+        Code that runs its own event loop and closes it without
+        ``shutdown_asyncgens()`` should await this before closing the loop;
+        ``asyncio.run`` closes the client itself.
+        """
+        with self._lock:
+            entry = self._async_models.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[1].aclose()
+
+    def _count(self, outcome):
+        get_metrics().increment("finsight_llm_requests_total", model=self.model_name, outcome=outcome)
+
+    @staticmethod
+    def _prompt_tokens(messages):
+        return sum(estimate_tokens(str(message.content)) for message in messages)
+
+    def _charge_completion(self, message_or_text):
+        usage = getattr(message_or_text, "usage_metadata", None) or {}
+        text = message_or_text if isinstance(message_or_text, str) else str(message_or_text.content)
+        self.tokens.consume(usage.get("output_tokens") or estimate_tokens(text))
+
+    def _wait(self, messages):
+        waited = self.requests.acquire() + self.tokens.acquire(self._prompt_tokens(messages))
+        get_metrics().observe(STAGE_SECONDS, waited, stage="llm.rate_limit_wait")
+
+    async def _wait_async(self, messages):
+        waited = await self.requests.acquire_async() + await self.tokens.acquire_async(self._prompt_tokens(messages))
+        get_metrics().observe(STAGE_SECONDS, waited, stage="llm.rate_limit_wait")
+
+    def _retry_or_raise(self, error, attempt):
+        delay = retry_delay(error, attempt) if attempt < self.max_retries else None
+        if delay is None:
+            self._count("error")
+            raise error
+        self._count("retry")
+        logger.warning("LLM call to %s failed (%s); retry %d in %.1fs", self.model_name, error, attempt + 1, delay)
+        return delay
+
+    def _join(self, messages, kwargs):
+        # Returns (key, future, True) for the caller that must make the request and
+        # (key, future, False) for callers that wait for it. Calls with extra
+        # arguments are never coalesced.
+        key = None if kwargs else request_key(self.model_name, messages)
+        with self._lock:
+            future = self._inflight.get(key) if key else None
+            if future is not None:
+                self._count("coalesced")
+                return key, future, False
+            future = Future()
+            if key:
+                self._inflight[key] = future
+            return key, future, True
+
+    def _leave(self, key, future, result=None, error=None):
+        with self._lock:
+            if key and self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def invoke(self, messages, **kwargs):
+        """
+        Sends one chat request and returns the response message.
+        """
+        key, future, owner = self._join(messages, kwargs)
+        if not owner:
+            return future.result()
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait(messages)
+                try:
+                    result = self.model.invoke(messages, **kwargs)
+                    break
+                except Exception as e:
+                    time.sleep(self._retry_or_raise(e, attempt))
+            self._count("ok")
+            self._charge_completion(result)
+        except BaseException as e:
+            self._leave(key, future, error=e)
+            raise
+        self._leave(key, future, result)
+        return result
+
+    async def ainvoke(self, messages, **kwargs):
+        """
+        Async ``invoke``; waits on the rate limiters without blocking the event loop.
+        """
+        key, future, owner = self._join(messages, kwargs)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            model = await self._async_model()
+            for attempt in range(self.max_retries + 1):
+                await self._wait_async(messages)
+                try:
+                    result = await model.ainvoke(messages, **kwargs)
+                    break
+                except Exception as e:
+                    await asyncio.sleep(self._retry_or_raise(e, attempt))
+            self._count("ok")
+            self._charge_completion(result)
+        except BaseException as e:
+            self._leave(key, future, error=e)
+            raise
+        self._leave(key, future, result)
+        return result
+
+    async def abatch(self, message_lists, concurrency=None, return_exceptions=False):
+        """
+        Sends many requests concurrently and returns the responses in order.
+
+        Args:
+            message_lists (list): One message list per request
+            concurrency (int, optional): Maximum requests in flight; the rate limiters apply either way
+            return_exceptions (bool): Return failures in place of responses instead of raising the first
+
+        Returns:
+            list: Response messages (or exceptions)
+        """
+        semaphore = asyncio.Semaphore(concurrency or LLM_MAX_CONNECTIONS)
+
+        async def run(messages):
+            async with semaphore:
+                return await self.ainvoke(messages)
+
+        return await asyncio.gather(*[run(messages) for messages in message_lists], return_exceptions=return_exceptions)
+
+    def stream(self, messages, **kwargs):
+        """
+        Streams response chunks. Failures before the first chunk are retried; later ones are raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._wait(messages)
+            text = ""
+            try:
+                for chunk in self.model.stream(messages, **kwargs):
+                    text += str(chunk.content)
+                    yield chunk
+                break
+            except Exception as e:
+                if text:
+                    self._count("error")
+                    raise
+                time.sleep(self._retry_or_raise(e, attempt))
+        self._count("ok")
+        self._charge_completion(text)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(model_name, api_key=None, **options):
+    """
+    Returns the process-wide LLMClient for a model and API key, creating it on first use.
+
+    ``options`` (rate limits, retries) only apply when the client is created.
+    """
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    key = (model_name, api_key)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = LLMClient(model_name, api_key, **options)
+        return _clients[key]
@@ -0,0 +1,269 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Append every finished span as a JSON line to this file; empty disables the log.
+METRICS_LOG_PATH = os.getenv("FINSIGHT_METRICS_LOG", "")
+# Serve Prometheus text format on http://<host>:<port>/metrics; 0 disables the endpoint.
+METRICS_PORT = int(os.getenv("FINSIGHT_METRICS_PORT", "0"))
+# Most recent observations kept per series for the quantiles.
+METRICS_WINDOW = int(os.getenv("FINSIGHT_METRICS_WINDOW", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+STAGE_SECONDS = "finsight_stage_seconds"
+
+_current_span = contextvars.ContextVar("finsight_span", default=None)
+
+
+def _series_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    In-process registry of counters and latency summaries.
+
+    Summaries keep a count and sum of every observation plus the last ``window``
+    values, from which p50/p95/p99 are computed on demand, so memory stays
+    bounded and percentiles follow recent traffic. Spans time a pipeline stage,
+    record it under ``finsight_stage_seconds{stage=...}`` and, when a log path is
+    set, append a JSON line carrying the trace and parent span IDs so a single
+    request can be reconstructed.
+    """
+
+    def __init__(self, window=METRICS_WINDOW, log_path=METRICS_LOG_PATH):
+        self.window = window
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._summaries = {}
+        self._counters = {}
+        self.started_at = time.time()
+
+    def observe(self, name, value, **labels):
+        """
+        Adds an observation to the summary ``name`` with the given labels.
+        """
+        key = _series_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = {"count": 0, "sum": 0.0, "values": deque(maxlen=self.window)}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["values"].append(value)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Adds ``amount`` to the counter ``name`` with the given labels.
+        """
+        if not amount:
+            return
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """
+        Times the enclosed block as one pipeline stage.
+
+        Only ``stage`` becomes a metric label; ``attrs`` (file names, sizes, ...)
+        go to the span log, where cardinality does not matter. The yielded dict
+        may be updated inside the block to add attributes known only at the end.
+        """
+        parent = _current_span.get()
+        record = {
+            "trace": parent["trace"] if parent else uuid.uuid4().hex[:16],
+            "span": uuid.uuid4().hex[:16],
+            "parent": parent["span"] if parent else None,
+            "stage": stage,
+            "start": time.time(),
+        }
+        token = _current_span.set(record)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            seconds = time.perf_counter() - started
+            self.observe(STAGE_SECONDS, seconds, stage=stage)
+            if error:
+                self.increment("finsight_stage_errors_total", stage=stage)
+            if self.log_path:
+                # Attributes never overwrite the span's own fields, whatever they are called.
+                entry = {**record, **attrs}
+                entry.update(record, seconds=round(seconds, 6), error=error)
+                self._log(entry)
+
+    def _log(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        try:
+            with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: ``summaries`` (name, labels, count, sum and quantiles) and ``counters`` (name, labels, value)
+        """
+        # Imported here so that recording metrics on the login path does not load numpy.
+        import numpy as np
+
+        with self._lock:
+            summaries = [(key, summary["count"], summary["sum"], np.array(summary["values"]))
+                         for key, summary in self._summaries.items()]
+            counters = list(self._counters.items())
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "summaries": [
+                {
+                    "name": name, "labels": dict(labels), "count": count, "sum": total,
+                    "quantiles": {q: float(np.quantile(values, q)) if len(values) else 0.0 for q in QUANTILES},
+                }
+                for (name, labels), count, total, values in sorted(summaries, key=lambda item: item[0])
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters)
+            ],
+        }
+
+    def stage_table(self):
+        """
+        Returns one row per stage with call count, p50/p95/p99 and total seconds, slowest total first.
+        """
+        rows = [
+            {"stage": summary["labels"]["stage"], "count": summary["count"],
+             "p50": summary["quantiles"][0.5], "p95": summary["quantiles"][0.95],
+             "p99": summary["quantiles"][0.99], "total": summary["sum"]}
+            for summary in self.snapshot()["summaries"] if summary["name"] == STAGE_SECONDS
+        ]
+        return sorted(rows, key=lambda row: -row["total"])
+
+    def prometheus_text(self):
+        """
+        Renders every series in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+        for summary in snapshot["summaries"]:
+            name, labels = summary["name"], sorted(summary["labels"].items())
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} summary")
+            for q, value in summary["quantiles"].items():
+                lines.append(f"{name}{_format_labels(labels + [('quantile', q)])} {value:.6g}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {summary['sum']:.6g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {summary['count']}")
+        for counter in snapshot["counters"]:
+            name = counter["name"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(sorted(counter['labels'].items()))} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns the process-wide Metrics registry.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
+
+
+def span(stage, **attrs):
+    """
+    Shortcut for ``get_metrics().span(stage, **attrs)``.
+    """
+    return get_metrics().span(stage, **attrs)
+
+
+def record_cache(cache, hit, count=1):
+    """
+    Counts lookups of a cache (``embedding``, ``response``, ...) as hits or misses.
+    """
+    get_metrics().increment("finsight_cache_requests_total", count, cache=cache, result="hit" if hit else "miss")
+
+
+def record_tokens(stage, model, prompt_tokens, completion_tokens):
+    """
+    Counts LLM tokens by stage and model so cost can be attributed to each stage.
+    """
+    metrics = get_metrics()
+    metrics.increment("finsight_llm_tokens_total", prompt_tokens, stage=stage, model=model, kind="prompt")
+    metrics.increment("finsight_llm_tokens_total", completion_tokens, stage=stage, model=model, kind="completion")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """
+    Serves ``/metrics`` for Prometheus on a daemon thread, once per process.
+
+    Returns:
+        int or None: The port being served, or None if the endpoint is disabled or the port is taken
+    """
+    global _server
+    if not port:
+        return None
+    with _metrics_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None
+            threading.Thread(target=_server.serve_forever, name="finsight-metrics", daemon=True).start()
+        return _server.server_address[1]
@@ -0,0 +1,113 @@
+import json
+import streamlit as st
+import pandas as pd
+from auth import is_admin
+from index_registry import get_index_registry
+from metrics import METRICS_LOG_PATH, get_metrics, start_metrics_server
+from page_loader import import_times
+from utils import local_css
+
+def stage_frame(metrics):
+    rows = metrics.stage_table()
+    if not rows:
+        return None
+    df = pd.DataFrame(rows)
+    total = df["total"].sum()
+    df["share"] = df["total"] / total if total else 0.0
+    for column in ("p50", "p95", "p99"):
+        df[column] = df[column] * 1000
+    return df.rename(columns={
+        "count": "calls", "p50": "p50 (ms)", "p95": "p95 (ms)", "p99": "p99 (ms)", "total": "total (s)",
+    })
+
+def counter_totals(snapshot, name, *label_names):
+    totals = {}
+    for counter in snapshot["counters"]:
+        if counter["name"] == name:
+            key = tuple(counter["labels"].get(label) for label in label_names)
+            totals[key] = totals.get(key, 0) + counter["value"]
+    return totals
+
+def metrics_page():
+    local_css("style.css")
+    st.markdown("""
+        <div class="main-card">
+            <h2>📈 Metrics</h2>
+            <p>Where time and tokens go in this app process, by pipeline stage.</p>
+        </div>
+    """, unsafe_allow_html=True)
+    if not is_admin():
+        st.error("❌ The metrics page is only available to administrators.")
+        st.stop()
+
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    st.caption(f"Collected over the last {snapshot['uptime_seconds'] / 60:.1f} minutes in this process.")
+
+    # --- Stage latency ---
+    st.subheader("⏱ Stage latency")
+    df = stage_frame(metrics)
+    if df is None:
+        st.info("No stages recorded yet. Upload a PDF or ask a question to collect timings.")
+    else:
+        st.dataframe(
+            df, hide_index=True,
+            column_config={"share": st.column_config.ProgressColumn("share of time", format="%.0f%%", min_value=0, max_value=1)},
+        )
+        st.caption("Nested stages (e.g. `embed.documents` inside `ingest.embed_batch`) overlap, so shares add up to more than 100%.")
+
+    # --- Caches ---
+    st.subheader("💾 Caches")
+    caches = counter_totals(snapshot, "finsight_cache_requests_total", "cache", "result")
+    registry = get_index_registry().stats()
+    columns = st.columns(4)
+    for column, cache in zip(columns, ("embedding", "response", "rerank")):
+        hits, misses = caches.get((cache, "hit"), 0), caches.get((cache, "miss"), 0)
+        rate = hits / (hits + misses) if hits + misses else 0.0
+        column.metric(f"{cache.capitalize()} cache hit rate", f"{rate:.0%}", f"{hits} hits / {misses} misses", delta_color="off")
+    columns[3].metric("Shared PDF indexes", registry["loaded"], f"{registry['in_use']} in use, {registry['builds']} built", delta_color="off")
+    fallbacks = counter_totals(snapshot, "finsight_rerank_fallbacks_total", "reason")
+    if fallbacks:
+        st.caption("Reranker kept the retrieval order: " + ", ".join(f"{count} × {reason}" for (reason,), count in fallbacks.items()))
+
+    # --- Tokens ---
+    st.subheader("🔤 LLM tokens")
+    tokens = counter_totals(snapshot, "finsight_llm_tokens_total", "stage", "model", "kind")
+    if tokens:
+        rows = {}
+        for (stage, model, kind), value in tokens.items():
+            rows.setdefault((stage, model), {"stage": stage, "model": model, "prompt": 0, "completion": 0})[kind] = value
+        st.dataframe(pd.DataFrame(rows.values()), hide_index=True)
+        st.caption("Provider-reported counts where available, otherwise estimated at 4 characters per token.")
+        context = counter_totals(snapshot, "finsight_context_tokens_total", "kind")
+        retrieved, sent = context.get(("retrieved",), 0), context.get(("sent",), 0)
+        if retrieved:
+            st.caption(f"Context packing sent {sent:,.0f} of {retrieved:,.0f} retrieved context tokens "
+                       f"({1 - sent / retrieved:.0%} saved).")
+    else:
+        st.info("No LLM calls recorded yet.")
+
+    # --- Page imports ---
+    times = import_times()
+    if times:
+        with st.expander("📦 Page module import times"):
+            st.dataframe(
+                pd.DataFrame([{"module": name, "seconds": seconds} for name, seconds in times.items()]),
+                hide_index=True,
+            )
+
+    # --- Export ---
+    st.subheader("📤 Export")
+    port = start_metrics_server()
+    if port:
+        st.caption(f"Prometheus endpoint: `http://127.0.0.1:{port}/metrics`")
+    else:
+        st.caption("Set `FINSIGHT_METRICS_PORT` to serve these metrics to Prometheus.")
+    if METRICS_LOG_PATH:
+        st.caption(f"Every span is appended to `{METRICS_LOG_PATH}` as JSON lines.")
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("⬇ Prometheus text", metrics.prometheus_text(), "finsight_metrics.prom", "text/plain")
+    col2.download_button("⬇ JSON snapshot", json.dumps(snapshot, indent=2), "finsight_metrics.json", "application/json")
+    if col3.button("🗑 Reset metrics"):
+        metrics.reset()
+        st.rerun()
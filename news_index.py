@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import urllib.request
+import uuid
+
+import faiss
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from chunk_store import has_chunk_store, load_docstore, save_docstore
+from metrics import span
+
+FETCH_CONCURRENCY = int(os.getenv("FINSIGHT_FETCH_CONCURRENCY", "8"))
+FETCH_TIMEOUT = float(os.getenv("FINSIGHT_FETCH_TIMEOUT", "15"))
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+# Pickled docstore written by FAISS.save_local before the chunk store; read once and replaced on the next save.
+LEGACY_DOCSTORE_FILE = "index.pkl"
+# Each save writes a complete version into its own subdirectory and then points
+# this file at it, so readers never mix files from two saves.
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+# Files of indexes saved directly in the index directory, before versions.
+UNVERSIONED_FILES = (MANIFEST_FILE, INDEX_FILE, LEGACY_DOCSTORE_FILE, "chunks.bin", "chunks.arrow")
+USER_AGENT = "Mozilla/5.0 (compatible; FinSight/1.0)"
+
+
+def _sha256(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _download(url, timeout):
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        return response.read().decode(charset, errors="replace")
+
+
+def html_to_text(html):
+    """
+    Extracts article text from HTML the same way UnstructuredURLLoader does.
+    """
+    # unstructured is slow to import and only needed when articles change.
+    from unstructured.partition.html import partition_html
+
+    return "\n\n".join(str(element) for element in partition_html(text=html))
+
+
+async def fetch_url(url, semaphore, timeout=FETCH_TIMEOUT, known_raw_hash=None):
+    """
+    Downloads and parses one URL without blocking the event loop.
+
+    Parsing is skipped when the raw page is byte-identical to ``known_raw_hash``.
+
+    Returns:
+        dict: ``raw_hash`` and ``text`` (None if unchanged) on success, ``error`` on failure
+    """
+    async with semaphore:
+        try:
+            html = await asyncio.wait_for(asyncio.to_thread(_download, url, timeout), timeout)
+            raw_hash = _sha256(html)
+            if raw_hash == known_raw_hash:
+                return {"raw_hash": raw_hash, "text": None}
+            text = await asyncio.to_thread(html_to_text, html)
+            return {"raw_hash": raw_hash, "text": text}
+        except asyncio.TimeoutError:
+            return {"error": f"timed out after {timeout:g}s"}
+        except Exception as e:
+            return {"error": str(e)}
+
+
+async def fetch_all(urls, concurrency=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT, known_raw_hashes=None):
+    """
+    Fetches and parses URLs concurrently, with at most ``concurrency`` in flight.
+
+    Returns:
+        dict: Mapping of URL to the result of ``fetch_url``
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    known_raw_hashes = known_raw_hashes or {}
+    results = await asyncio.gather(*[
+        fetch_url(url, semaphore, timeout, known_raw_hashes.get(url)) for url in urls
+    ])
+    return dict(zip(urls, results))
+
+
+def current_version_dir(index_dir):
+    """
+    Returns the directory holding the current news index: the version named by
+    ``CURRENT``, or ``index_dir`` itself for an index saved before versions.
+    """
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE)) as f:
+            return os.path.join(index_dir, f.read().strip())
+    except FileNotFoundError:
+        return index_dir
+
+
+def load_manifest(index_dir):
+    path = os.path.join(current_version_dir(index_dir), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"urls": {}, "contents": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_news_index(index_dir, embeddings, writable=False):
+    """
+    Loads the persisted news index, or returns None if it has not been built yet.
+
+    Article chunks are memory-mapped from the chunk store unless ``writable``
+    is set, in which case they are read into memory so the index can be updated.
+    """
+    while True:
+        directory = current_version_dir(index_dir)
+        if not os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            return None
+        try:
+            if not has_chunk_store(directory):
+                return FAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True)
+            docstore, index_to_docstore_id = load_docstore(directory, writable=writable)
+            index = faiss.read_index(os.path.join(directory, INDEX_FILE))
+            return FAISS(embeddings, index, docstore, index_to_docstore_id)
+        except (OSError, RuntimeError):
+            # Two saves since the pointer was read removed this version; load the current one instead.
+            if current_version_dir(index_dir) == directory:
+                raise
+
+
+def _prune_versions(index_dir, keep):
+    # ``keep`` holds the new version and the one it replaced (``os.curdir`` for the unversioned layout).
+    for name in os.listdir(index_dir):
+        if name.startswith(VERSION_PREFIX) and name not in keep:
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    if os.curdir in keep:
+        return
+    for name in UNVERSIONED_FILES:
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_news_index(index_dir, vectorstore, manifest):
+    """
+    Writes the news index as a new version and makes it current.
+
+    The FAISS vectors, a chunk store keeping the docstore IDs and the manifest
+    referring to them are written into a fresh version directory, which then
+    replaces the current one through a single rename of the ``CURRENT``
+    pointer. The previous version is kept for readers that are still opening
+    it; older ones are removed.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    previous = os.path.relpath(current_version_dir(index_dir), index_dir)
+    version = f"{VERSION_PREFIX}{uuid.uuid4().hex}"
+    directory = os.path.join(index_dir, version)
+    os.makedirs(directory)
+    pointer_tmp = os.path.join(index_dir, f".{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+    try:
+        faiss.write_index(vectorstore.index, os.path.join(directory, INDEX_FILE))
+        save_docstore(directory, vectorstore, keep_ids=True)
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        with open(pointer_tmp, "w") as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(index_dir, CURRENT_FILE))
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        if os.path.exists(pointer_tmp):
+            os.remove(pointer_tmp)
+        raise
+    _prune_versions(index_dir, {version, previous})
+
+
+def sync_news_index(urls, embeddings, index_dir, chunk_size, chunk_overlap, vectorstore=None,
+                    concurrency=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT, backend_id=None, progress_callback=None):
+    """
+    Brings the persisted news index in line with ``urls`` without rebuilding it.
+
+    Every URL is fetched concurrently, but only new or changed articles are split
+    and embedded; articles whose content is already indexed (e.g. the same story
+    syndicated under another URL) are not embedded again, and URLs no longer in
+    the list have their vectors deleted. When the URL an article is attributed to
+    goes away but another URL still carries it, its chunks are kept and moved to
+    that URL. URLs that fail to fetch keep whatever was indexed for them before.
+
+    Args:
+        urls (list): URLs that should be in the index
+        embeddings (Embeddings): Embedding function
+        index_dir (str): Directory holding the FAISS index and its manifest
+        chunk_size (int): Splitter chunk size
+        chunk_overlap (int): Splitter chunk overlap
+        vectorstore (FAISS, optional): Already loaded writable index; loaded from ``index_dir`` if omitted
+        concurrency (int): Maximum simultaneous downloads
+        timeout (float): Per-URL timeout in seconds
+        backend_id (str, optional): Embedding backend identifier; an index built with
+            a different backend is discarded and rebuilt rather than mixed
+        progress_callback (callable, optional): Called as ``progress_callback(fraction, message)``
+            at the start of the fetch, embed and save stages
+
+    Returns:
+        tuple: (FAISS or None, dict report with added/updated/removed/unchanged/failed)
+    """
+    manifest = load_manifest(index_dir)
+    if backend_id and manifest.get("embedding_backend", backend_id) != backend_id:
+        vectorstore = None
+    elif vectorstore is None:
+        vectorstore = load_news_index(index_dir, embeddings, writable=True)
+    if vectorstore is None:
+        manifest = {"urls": {}, "contents": {}}
+
+    known = manifest["urls"]
+    contents = manifest["contents"]
+    report = {"added": [], "updated": [], "removed": [], "unchanged": [], "failed": {}}
+
+    if progress_callback:
+        progress_callback(0.0, f"Fetching {len(urls)} URL(s)")
+    with span("news.fetch", urls=len(urls)):
+        results = asyncio.run(fetch_all(
+            urls, concurrency, timeout,
+            known_raw_hashes={url: entry["raw_hash"] for url, entry in known.items()},
+        ))
+
+    wanted = {}
+    for url in urls:
+        result = results[url]
+        if "error" in result:
+            report["failed"][url] = result["error"]
+            if url in known:
+                wanted[url] = known[url]
+            continue
+        if result["text"] is None or (url in known and known[url]["content_hash"] == _sha256(result["text"])):
+            wanted[url] = {**known[url], "raw_hash": result["raw_hash"]}
+            report["unchanged"].append(url)
+            continue
+        wanted[url] = {"raw_hash": result["raw_hash"], "content_hash": _sha256(result["text"]), "text": result["text"]}
+        report["updated" if url in known else "added"].append(url)
+    report["removed"] = [url for url in known if url not in wanted]
+
+    # Each distinct article is indexed once, attributed to the first URL carrying it.
+    owners = {}
+    for url, entry in wanted.items():
+        owners.setdefault(entry["content_hash"], url)
+
+    stale_ids = []
+    for content_hash, entry in list(contents.items()):
+        owner = owners.get(content_hash)
+        if owner is None:
+            stale_ids.extend(entry["ids"])
+            del contents[content_hash]
+        elif owner != entry["source"]:
+            # Same article under another URL: the chunks stay, only their source changes.
+            entry["source"] = owner
+            for doc_id in entry["ids"]:
+                doc = vectorstore.docstore.search(doc_id)
+                if isinstance(doc, Document):
+                    doc.metadata = {**doc.metadata, "source": owner}
+    if stale_ids and vectorstore is not None:
+        vectorstore.delete(stale_ids)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    new_docs, new_ids = [], []
+    for content_hash, url in owners.items():
+        if content_hash in contents:
+            continue
+        # Every indexed article is still in ``contents``, so the rest were fetched this run.
+        docs = splitter.split_documents([Document(page_content=wanted[url]["text"], metadata={"source": url})])
+        ids = [str(uuid.uuid4()) for _ in docs]
+        contents[content_hash] = {"source": url, "ids": ids}
+        new_docs.extend(docs)
+        new_ids.extend(ids)
+
+    if new_docs:
+        if progress_callback:
+            progress_callback(0.5, f"Embedding {len(new_docs)} new chunk(s)")
+        with span("news.embed", chunks=len(new_docs)):
+            if vectorstore is None:
+                vectorstore = FAISS.from_documents(new_docs, embeddings, ids=new_ids)
+            else:
+                vectorstore.add_documents(new_docs, ids=new_ids)
+
+    manifest = {
+        "urls": {url: {k: v for k, v in entry.items() if k != "text"} for url, entry in wanted.items()},
+        "contents": contents,
+        "embedding_backend": backend_id or manifest.get("embedding_backend"),
+    }
+    if vectorstore is not None:
+        if progress_callback:
+            progress_callback(0.9, "Saving index")
+        with span("news.save"):
+            save_news_index(index_dir, vectorstore, manifest)
+    return vectorstore, report
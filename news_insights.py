@@ -1,13 +1,46 @@
 import streamlit as st
-import os
-from langchain_community.document_loaders import UnstructuredURLLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_groq import ChatGroq
-from langchain.chains import RetrievalQA
+from llm_client import get_llm_client
+from qa import format_timings, stream_answer
+from response_cache import get_response_cache
+from retrieval import MultiIndexRetriever
+from embeddings import get_embeddings
+from jobs import get_job_queue
+from news_index import load_news_index
 
 VECTORSTORE_DIR = "news_vectorstore_index"
+JOB_POLL_SECONDS = 2
+
+def show_news_job_result(job):
+    if job["status"] == "failed":
+        st.error(f"❌ Processing failed: {job['error']}")
+        return
+    report = job["result"]["report"]
+    for url, error in report["failed"].items():
+        st.warning(f"⚠️ Could not fetch {url}: {error}")
+    st.success(
+        f"✅ URLs processed and vectorstore saved: {len(report['added'])} added, "
+        f"{len(report['updated'])} updated, {len(report['removed'])} removed, "
+        f"{len(report['unchanged'])} unchanged."
+    )
+    stats = job["result"]["embedding_cache"]
+    st.caption(f"Embedding cache: {stats['hits']} reused, {stats['misses']} newly embedded chunk(s).")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def news_job_panel():
+    job = get_job_queue().get(st.session_state.news_job_id)
+    if job is None or job["status"] in ("done", "failed"):
+        st.session_state.news_job_id = None
+        st.session_state.news_job = job
+        if job is not None and job["status"] == "done":
+            try:
+                st.session_state.news_vectorstore = load_news_index(VECTORSTORE_DIR, get_embeddings())
+            except Exception as e:
+                st.session_state.news_job = {"status": "failed", "error": str(e)}
+        st.rerun()
+    elif job["status"] == "queued":
+        st.caption("⏳ Waiting for a free worker...")
+    else:
+        st.progress(min(job["progress"], 1.0), text=job["message"] or "Starting...")
 
 def news_insights_page():
     st.markdown("""
@@ -18,7 +51,7 @@ def news_insights_page():
     """, unsafe_allow_html=True)
 
     # Session State Initialization
-    for key in ["news_urls", "news_qa_history", "news_vectorstore", "news_summary"]:
+    for key in ["news_urls", "news_qa_history", "news_vectorstore", "news_summary", "news_job_id", "news_job"]:
         if key not in st.session_state:
             st.session_state[key] = [] if "urls" in key or "history" in key else None
 
@@ -43,34 +76,28 @@ def news_insights_page():
             st.session_state.news_vectorstore = None
             st.success("✅ URLs cleared.")
 
-    # Process URLs
-    if st.session_state.news_urls and st.button("🚀 Process URLs"):
-        try:
-            gemini_key = os.getenv("GEMINI_API_KEY")
-            loader = UnstructuredURLLoader(urls=st.session_state.news_urls)
-            docs = loader.load()
-
-            for i, doc in enumerate(docs):
-                doc.metadata = {"source": st.session_state.news_urls[i]}
-
-            splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            text_chunks = splitter.split_documents(docs)
-
-            embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=gemini_key)
-            vectorstore = FAISS.from_documents(text_chunks, embedding=embeddings)
-            vectorstore.save_local(VECTORSTORE_DIR)
-            st.session_state.news_vectorstore = vectorstore
-            st.success("✅ URLs processed and vectorstore saved.")
-        except Exception as e:
-            st.error(f"❌ Processing failed: {e}")
+    # Process URLs in the background; the page polls the job instead of blocking
+    if st.session_state.news_urls and st.session_state.news_job_id is None and st.button("🚀 Process URLs"):
+        st.session_state.news_job_id = get_job_queue().submit(
+            st.session_state.get("username") or "anonymous",
+            "news",
+            {"urls": list(st.session_state.news_urls), "index_dir": VECTORSTORE_DIR},
+        )
+        st.session_state.news_job = None
+    if st.session_state.news_job_id is not None:
+        st.markdown("#### 🔄 Fetching articles and updating the index")
+        news_job_panel()
+    elif st.session_state.news_job is not None:
+        show_news_job_result(st.session_state.news_job)
+        st.session_state.news_job = None
 
     # Summary Button
     if st.session_state.news_vectorstore:
+        summary_stream = None
         if st.button("🧠 Generate Summary"):
             try:
-                retriever = st.session_state.news_vectorstore.as_retriever(search_kwargs={"k": 6})
-                llm = ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama3-8b-8192")
-                chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+                retriever = MultiIndexRetriever(vectorstores=[st.session_state.news_vectorstore], k=6)
+                llm = get_llm_client("llama3-8b-8192")
 
                 summary_prompt = """
                 As a financial news analyst, provide a structured and concise summary of the uploaded articles.
@@ -82,16 +109,27 @@ def news_insights_page():
                 - (If possible) Latest closing stock prices for mentioned companies
                 Use bullet points and focus on actionable insights.
                 """
-                result = chain.invoke({"query": summary_prompt})
-                st.session_state.news_summary = result.get("result", "Summary not available.")
-                st.success("📌 Summary generated.")
+                summary_stream = stream_answer(
+                    llm, retriever, summary_prompt,
+                    cache=get_response_cache(),
+                    cache_scope="news-summary:" + ",".join(sorted(st.session_state.news_urls)),
+                )
             except Exception as e:
                 st.error(f"❌ Summary generation failed: {e}")
 
-        if st.session_state.news_summary:
+        if summary_stream is not None or st.session_state.news_summary:
             with st.expander("📌 View Summary", expanded=True):
-                st.markdown(st.session_state.news_summary)
-                st.download_button("⬇ Download Summary", st.session_state.news_summary, "news_summary.txt", "text/plain")
+                if summary_stream is not None:
+                    try:
+                        st.session_state.news_summary = st.write_stream(summary_stream) or "Summary not available."
+                        st.caption(format_timings(summary_stream))
+                        st.success("📌 Summary generated.")
+                    except Exception as e:
+                        st.error(f"❌ Summary generation failed: {e}")
+                else:
+                    st.markdown(st.session_state.news_summary)
+                if st.session_state.news_summary:
+                    st.download_button("⬇ Download Summary", st.session_state.news_summary, "news_summary.txt", "text/plain")
 
     # Ask questions
     if st.session_state.news_vectorstore:
@@ -99,25 +137,32 @@ def news_insights_page():
         user_query = st.text_input("Your Question", key="user_query")
         if user_query:
             try:
-                retriever = st.session_state.news_vectorstore.as_retriever(search_kwargs={"k": 5})
-                docs = retriever.get_relevant_documents(user_query)
-
-                sources = set(doc.metadata.get("source") for doc in docs if "source" in doc.metadata)
-
-                llm = ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama3-8b-8192")
-                chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-                result = chain.invoke({"query": user_query})
-                answer = result.get("result", "No answer found.")
-
-                st.markdown(f"**Answer:** {answer}")
+                retriever = MultiIndexRetriever(vectorstores=[st.session_state.news_vectorstore], k=5)
+                llm = get_llm_client("llama3-8b-8192")
+                answer_stream = stream_answer(
+                    llm, retriever, user_query,
+                    cache=get_response_cache(),
+                    cache_scope="news-qa:" + ",".join(sorted(st.session_state.news_urls)),
+                    embeddings=st.session_state.news_vectorstore.embedding_function,
+                )
+
+                sources = list(dict.fromkeys(
+                    doc.metadata.get("source") for doc in answer_stream.docs if "source" in doc.metadata
+                ))
                 if sources:
                     st.markdown("**🔗 Sources Used:**")
                     for src in sources:
                         st.markdown(f"- [{src}]({src})")
 
+                st.markdown("**Answer:**")
+                st.write_stream(answer_stream)
+                st.caption(format_timings(answer_stream))
+                answer = answer_stream.text or "No answer found."
+
                 # Save chat
                 st.session_state.news_qa_history.append({
-                    "question": user_query, "answer": answer, "sources": list(sources)
+                    "question": user_query, "answer": answer, "sources": sources,
+                    "timings": answer_stream.timings(),
                 })
 
             except Exception as e:
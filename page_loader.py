@@ -0,0 +1,82 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Page name -> (module, render function). Modules are imported on first use so the
+# login page renders without loading langchain, FAISS, matplotlib and friends.
+PAGES = {
+    "Home": ("home", "home_page"),
+    "PDF Insights": ("pdf_insights", "pdf_insights_page"),
+    "CSV Analyzer": ("csv_analyzer", "csv_analyzer_page"),
+    "News Insights": ("news_insights", "news_insights_page"),
+    "Metrics": ("metrics_page", "metrics_page"),
+}
+PREWARM_ENABLED = os.getenv("FINSIGHT_PREWARM", "1") != "0"
+
+_import_seconds = {}
+_prewarm_thread = None
+_prewarm_lock = threading.Lock()
+
+
+def _import(module_name):
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    # Only the first import does any work; later calls hit sys.modules.
+    _import_seconds.setdefault(module_name, time.perf_counter() - started)
+    return module
+
+
+def load_page(name):
+    """
+    Imports a page's module if needed and returns its render function.
+
+    Args:
+        name (str): Key of ``PAGES``
+
+    Returns:
+        callable: The page's render function
+    """
+    module_name, function_name = PAGES[name]
+    return getattr(_import(module_name), function_name)
+
+
+def prewarm(names=None):
+    """
+    Imports page modules on a background thread, once per process.
+
+    Called after login so the first visit to each page does not pay its import
+    cost. Failures are logged and otherwise ignored; the page import is retried
+    (and the error shown) when the page is opened.
+
+    Args:
+        names (Iterable[str], optional): Pages to load; defaults to all of ``PAGES``
+    """
+    global _prewarm_thread
+    if not PREWARM_ENABLED:
+        return
+    with _prewarm_lock:
+        if _prewarm_thread is not None:
+            return
+
+        def run():
+            for name in names or PAGES:
+                try:
+                    _import(PAGES[name][0])
+                except Exception:
+                    logger.exception("pre-warming page %s failed", name)
+            logger.info("pages pre-warmed: %s", {m: round(s, 3) for m, s in _import_seconds.items()})
+
+        _prewarm_thread = threading.Thread(target=run, name="finsight-prewarm", daemon=True)
+        _prewarm_thread.start()
+
+
+def import_times():
+    """
+    Returns:
+        dict: Seconds the first import of each page module took in this process
+    """
+    return dict(_import_seconds)
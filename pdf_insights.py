@@ -1,25 +1,168 @@
 import streamlit as st
 import os
 import uuid
-from utils import create_vectorstore_from_pdfs, local_css
-from langchain_groq import ChatGroq
-from langchain.chains import RetrievalQA
+from utils import acquire_pdf_vectorstore, local_css
+from embedding_cache import get_embedding_store
+from jobs import get_job_queue
+from qa import PDF_QUESTION_TEMPLATE, format_timings, stream_answer
+from response_cache import get_response_cache
+from retrieval import COMBINE_AFTER_QUERIES, MultiIndexRetriever, build_combined_vectorstore
+from summarize import MapReduceSummarizer
+from llm_client import get_llm_client
 
 DATA_DIR = "data"
+JOB_POLL_SECONDS = 2
 
 def initialize_session_state():
     for key, default in [
         ("vectorstores", {}),
+        ("index_handles", {}),  # Keep shared indexes loaded while this session uses them
+        ("index_signatures", {}),  # (mtime, size) of each PDF when its index was loaded
         ("pdf_paths", []),
         ("pdf_names", []),
         ("selected_files_sidebar", []),  # To store selected files from sidebar
         ("summary", ""),
         ("chat_sessions", {}),
         ("current_session_id", None),
+        ("pending_chats", []),  # Chats waiting for background indexing jobs
+        ("ingest_notices", []),
     ]:
         if key not in st.session_state:
             st.session_state[key] = default
 
+def current_user():
+    return st.session_state.get("username") or "anonymous"
+
+def get_session_retriever(session, k):
+    vectorstores = [
+        st.session_state.vectorstores[path]
+        for path in session["pdfs"] if path in st.session_state.vectorstores
+    ]
+    if not vectorstores:
+        return None
+
+    # Sessions that keep being queried get their indexes merged once, so later
+    # questions search a single index instead of fanning out.
+    session["query_count"] = session.get("query_count", 0) + 1
+    combined = session.get("combined_vectorstore")
+    if combined is None and len(vectorstores) > 1 and session["query_count"] >= COMBINE_AFTER_QUERIES:
+        combined = build_combined_vectorstore(vectorstores)
+        session["combined_vectorstore"] = combined
+    return MultiIndexRetriever(vectorstores=vectorstores, k=k, combined_vectorstore=combined)
+
+def format_sources(docs):
+    sources = []
+    for doc in docs:
+        name = os.path.basename(doc.metadata.get("source", "unknown"))
+        page = doc.metadata.get("page")
+        label = f"{name} (p. {page + 1})" if isinstance(page, int) else name
+        if label not in sources:
+            sources.append(label)
+    return sources
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def load_session_vectorstore(path, progress_callback=None):
+    if path not in st.session_state.vectorstores:
+        # Taken before indexing, so a change made meanwhile is still noticed on the next run.
+        signature = file_signature(path)
+        handle = acquire_pdf_vectorstore(path, progress_callback=progress_callback)
+        if handle is None:
+            return None
+        st.session_state.index_handles[path] = handle
+        st.session_state.vectorstores[path] = handle.vectorstore
+        st.session_state.index_signatures[path] = signature
+    return st.session_state.vectorstores[path]
+
+def refresh_changed_documents():
+    """
+    Reloads the index of every PDF loaded in this session whose file changed on
+    disk since, e.g. a report overwritten with an amended filing.
+
+    The new version is indexed as an update of the old one, so only its changed
+    pages are embedded. Chat sessions over it drop their combined index, which
+    is rebuilt from the new one when needed.
+    """
+    for path, handle in list(st.session_state.index_handles.items()):
+        signature = file_signature(path)
+        if signature is None or signature == st.session_state.index_signatures.setdefault(path, signature):
+            continue
+        name = os.path.basename(path)
+        progress = st.progress(0.0, text=f"🔄 {name} changed on disk; updating its index...")
+        new_handle = acquire_pdf_vectorstore(
+            path, progress_callback=lambda fraction, message: progress.progress(fraction, text=message)
+        )
+        progress.empty()
+        handle.release()
+        st.session_state.index_signatures[path] = signature
+        if new_handle is None:
+            del st.session_state.index_handles[path]
+            del st.session_state.vectorstores[path]
+            st.warning(f"{name} changed on disk and no longer has any text to search.")
+        else:
+            st.session_state.index_handles[path] = new_handle
+            st.session_state.vectorstores[path] = new_handle.vectorstore
+            st.toast(f"🔄 Updated the index of {name}.")
+        for session in st.session_state.chat_sessions.values():
+            if path in session["pdfs"]:
+                session.pop("combined_vectorstore", None)
+
+def submit_ingest_jobs(pdf_paths):
+    """
+    Queues background indexing of the PDFs not loaded in this session yet; a chat
+    session over all of them is started once every job has finished.
+    """
+    queue = get_job_queue()
+    jobs = {}
+    for path in pdf_paths:
+        if path not in st.session_state.vectorstores:
+            jobs[queue.submit(current_user(), "pdf", {"path": path})] = path
+    st.session_state.pending_chats.append({"pdfs": list(pdf_paths), "jobs": jobs})
+
+def finish_pending_chat(chat, failed):
+    loaded = [path for path in chat["pdfs"] if path not in failed and load_session_vectorstore(path) is not None]
+    notices = st.session_state.ingest_notices
+    for path, error in failed.items():
+        notices.append(("error", f"❌ Error creating vector store for {os.path.basename(path)}: {error}"))
+    if loaded and start_new_chat_session(loaded):
+        stats = get_embedding_store().stats()
+        notices.append((
+            "success",
+            f"🚀 Started a new chat session with {len(loaded)} document(s). "
+            f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses this process.",
+        ))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def ingest_jobs_panel():
+    queue = get_job_queue()
+    finished = []
+    for chat in st.session_state.pending_chats:
+        failed = {}
+        done = True
+        for job_id, path in chat["jobs"].items():
+            job = queue.get(job_id)
+            name = os.path.basename(path)
+            if job is None or job["status"] == "failed":
+                failed[path] = job["error"] if job else "job lost"
+            elif job["status"] == "queued":
+                done = False
+                st.caption(f"⏳ {name}: waiting for a free worker")
+            elif job["status"] == "running":
+                done = False
+                st.progress(min(job["progress"], 1.0), text=job["message"] or f"{name}: starting")
+        if done:
+            finished.append((chat, failed))
+    if finished:
+        for chat, failed in finished:
+            st.session_state.pending_chats.remove(chat)
+            finish_pending_chat(chat, failed)
+        st.rerun()
+
 def start_new_chat_session(pdf_paths_for_session):
     if not pdf_paths_for_session:
         st.sidebar.error("Please select at least one document to start a new chat.")
@@ -81,17 +224,8 @@ def pdf_insights_page():
 
         if newly_uploaded_paths:
             st.success(f"✅ Uploaded {len(newly_uploaded_paths)} new document(s) successfully!")
-            with st.spinner("🔄 Processing and embedding new PDFs..."):
-                for path in newly_uploaded_paths:
-                    if path not in st.session_state.vectorstores:
-                        vs = create_vectorstore_from_pdfs([path])
-                        st.session_state.vectorstores[path] = vs
-            st.success("✅ Vector stores created for newly uploaded documents!")
-            # Automatically start a new chat session with newly uploaded files
-            if newly_uploaded_paths:
-                new_session_id = start_new_chat_session(newly_uploaded_paths)
-                if new_session_id:
-                    st.sidebar.success(f"🚀 Started a new chat session with the uploaded documents.")
+            # Index in the background; a chat session starts automatically when done
+            submit_ingest_jobs(newly_uploaded_paths)
         else:
             st.info("No new documents uploaded.")
 
@@ -113,21 +247,8 @@ def pdf_insights_page():
 
             if st.sidebar.button("➕ New Chat with Selected"):
                 if selected_paths_sidebar:
-                    # Ensure vector stores exist for selected files
-                    with st.spinner("🔄 Creating embeddings for selected documents if they don't exist..."):
-                        for path in selected_paths_sidebar:
-                            if path not in st.session_state.vectorstores:
-                                vs = create_vectorstore_from_pdfs([path])
-                                if vs:
-                                    st.session_state.vectorstores[path] = vs
-                                else:
-                                    st.error(f"❌ Error creating vector store for {os.path.basename(path)}.")
-                                    return
-
-                    # Now start the new chat session
-                    new_session_id = start_new_chat_session(selected_paths_sidebar)
-                    if new_session_id:
-                        st.sidebar.success(f"🚀 Started a new chat session with selected documents.")
+                    # Index missing documents in the background, then start the chat session
+                    submit_ingest_jobs(selected_paths_sidebar)
                 else:
                     st.sidebar.warning("Please select at least one document to start a new chat.")
         else:
@@ -135,6 +256,16 @@ def pdf_insights_page():
     else:
         st.sidebar.info("The 'data' directory does not exist.")
 
+    # --- Background indexing progress ---
+    for level, notice in st.session_state.ingest_notices:
+        getattr(st, level)(notice)
+    st.session_state.ingest_notices = []
+    if st.session_state.pending_chats:
+        st.markdown("#### 🔄 Indexing documents in the background")
+        st.caption("You can keep working elsewhere in the app; the chat session starts when indexing finishes.")
+        ingest_jobs_panel()
+
+    refresh_changed_documents()
     select_chat_session()
 
     # --- Main Area: Show Current Session ---
@@ -144,39 +275,57 @@ def pdf_insights_page():
         st.markdown(f"**Current Session PDFs:** {', '.join([os.path.basename(p) for p in session_pdfs])}")
 
         # --- Generate Summary ---
+        summary_stream = None
+        summarizer = None
         if st.button("🧠 Generate Summary for This Session"):
             groq_api_key = os.getenv("GROQ_API_KEY")
             if not groq_api_key:
                 st.error("GROQ_API_KEY not set in environment.")
                 st.stop()
-            retrievers = [
-                st.session_state.vectorstores[path].as_retriever(search_kwargs={"k": 5})
+            vectorstores = [
+                st.session_state.vectorstores[path]
                 for path in session_pdfs if path in st.session_state.vectorstores
             ]
-            if not retrievers:
+            if not vectorstores:
                 st.error("No vectorstores found for selected PDFs.")
             else:
-                retriever = retrievers[0]
-                llm = ChatGroq(groq_api_key=groq_api_key, model_name=model_name)
-                chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+                llm = get_llm_client(model_name, groq_api_key)
                 prompt = """
                     Provide a comprehensive summary of the uploaded financial document(s) with key metrics, events, risks,
                     insights, and recommendations. Include tone, trends, and future implications.
                 """
                 try:
-                    result = chain.invoke({"query": prompt})
-                    session["summary"] = result.get("result", "")
-                    st.success("📌 Summary generated successfully.")
+                    # Summarize every chunk (map) and merge the partial summaries (reduce)
+                    with st.spinner("🔄 Summarizing every section of the document(s)..."):
+                        summarizer = MapReduceSummarizer(llm, cache=get_response_cache())
+                        summary_stream = summarizer.summarize(vectorstores, prompt)
                 except Exception as e:
                     st.error(f"❌ Error generating summary: {e}")
 
-        if session.get("summary"):
+        if summary_stream is not None or session.get("summary"):
             st.markdown("""
             <div class="main-card">
                 <h3>📌 Summary</h3>
             """, unsafe_allow_html=True)
-            st.markdown(session["summary"])
-            st.download_button("⬇ Download Summary", session["summary"], "summary.txt", "text/plain")
+            if summary_stream is not None:
+                try:
+                    sources = format_sources(summary_stream.docs)
+                    if sources:
+                        st.caption("Sources: " + ", ".join(sources))
+                    session["summary"] = st.write_stream(summary_stream)
+                    st.caption(format_timings(summary_stream))
+                    stats = summarizer.stats
+                    st.caption(
+                        f"Summarized {stats['maps']} section(s) in {stats['rounds'] + 1} merge round(s); "
+                        f"{stats['cached']} partial summaries reused from cache."
+                    )
+                    st.success("📌 Summary generated successfully.")
+                except Exception as e:
+                    st.error(f"❌ Error generating summary: {e}")
+            else:
+                st.markdown(session["summary"])
+            if session.get("summary"):
+                st.download_button("⬇ Download Summary", session["summary"], "summary.txt", "text/plain")
             st.markdown("</div>", unsafe_allow_html=True)
 
         # --- Chat Area ---
@@ -192,34 +341,31 @@ def pdf_insights_page():
             st.chat_message("user").markdown(user_input)
             session["messages"].append({"role": "user", "content": user_input})
 
-            custom_prompt = f"""
-                You are a knowledgeable AI assistant. Answer the following query using *only the content* from the selected document(s).
-
-                📝 Instructions:
-                - Respond strictly based on the uploaded content.
-                - Structure your response using *clear and concise bullet points*.
-                - Each bullet point must convey a *complete, self-contained insight or fact*.
-                - If the content does *not* contain relevant information, reply with:
-                "No content available."
-
-                📌 Query: {user_input}
-            """
+            custom_prompt = PDF_QUESTION_TEMPLATE.format(question=user_input)
             groq_api_key = os.getenv("GROQ_API_KEY")
-            retrievers = [
-                st.session_state.vectorstores[path].as_retriever(search_kwargs={"k": 4})
-                for path in session_pdfs if path in st.session_state.vectorstores
-            ]
-            if not retrievers:
+            retriever = get_session_retriever(session, k=4)
+            if retriever is None:
                 st.error("No vectorstores found for selected PDFs.")
             else:
-                retriever = retrievers[0]
-                llm = ChatGroq(groq_api_key=groq_api_key, model_name=model_name)
-                chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+                llm = get_llm_client(model_name, groq_api_key)
                 try:
-                    result = chain.invoke({"query": custom_prompt})
-                    response = result.get("result", "No answer found.")
-                    st.chat_message("assistant").markdown(response)
-                    session["messages"].append({"role": "assistant", "content": response})
+                    answer = stream_answer(
+                        llm, retriever, custom_prompt,
+                        search_query=user_input,
+                        cache=get_response_cache(),
+                        cache_scope="pdf-chat:" + ",".join(sorted(session_pdfs)),
+                        embeddings=retriever.vectorstores[0].embedding_function,
+                    )
+                    sources = format_sources(answer.docs)
+                    with st.chat_message("assistant"):
+                        if sources:
+                            st.caption("Sources: " + ", ".join(sources))
+                        st.write_stream(answer)
+                        st.caption(format_timings(answer))
+                    response = answer.text or "No answer found."
+                    if sources:
+                        response += "\n\n**Sources:** " + ", ".join(sources)
+                    session["messages"].append({"role": "assistant", "content": response, "timings": answer.timings()})
                 except Exception as e:
                     st.error(f"❌ Chat failed: {e}")
 
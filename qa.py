@@ -0,0 +1,187 @@
+import logging
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from context import estimate_tokens, pack_for_model
+from metrics import STAGE_SECONDS, get_metrics, record_tokens, span
+from response_cache import SEMANTIC_CACHE_ENABLED, model_name_of
+
+logger = logging.getLogger(__name__)
+
+# Same wording as RetrievalQA's default "stuff" prompt for chat models.
+SYSTEM_TEMPLATE = (
+    "Use the following pieces of context to answer the user's question. \n"
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n"
+    "----------------\n"
+    "{context}"
+)
+# Question prompt of the PDF chat, shared by the UI and the command-line tool.
+PDF_QUESTION_TEMPLATE = """
+    You are a knowledgeable AI assistant. Answer the following query using *only the content* from the selected document(s).
+
+    📝 Instructions:
+    - Respond strictly based on the uploaded content.
+    - Structure your response using *clear and concise bullet points*.
+    - Each bullet point must convey a *complete, self-contained insight or fact*.
+    - If the content does *not* contain relevant information, reply with:
+    "No content available."
+
+    📌 Query: {question}
+"""
+
+
+def record_llm_usage(stage, llm, messages, text, usage=None):
+    """
+    Counts the prompt and completion tokens of one LLM call under ``stage``.
+
+    Uses the provider's ``usage_metadata`` when present, otherwise estimates from the text length.
+    """
+    usage = usage or {}
+    prompt_tokens = usage.get("input_tokens") or sum(estimate_tokens(str(message.content)) for message in messages)
+    completion_tokens = usage.get("output_tokens") or estimate_tokens(text)
+    record_tokens(stage, model_name_of(llm), prompt_tokens, completion_tokens)
+
+
+def build_messages(question, docs):
+    """
+    Stuffs the retrieved documents into a system message followed by the question.
+    """
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return [SystemMessage(content=SYSTEM_TEMPLATE.format(context=context)), HumanMessage(content=question)]
+
+
+class StreamingAnswer:
+    """
+    Iterable over the tokens of an LLM answer, suitable for ``st.write_stream``.
+
+    The retrieved documents are available before generation starts. Once the
+    stream has been consumed, ``text`` holds the full answer and the timing
+    attributes are filled in (all in seconds, measured from the request start).
+    When ``cached_text`` is given the LLM is not called at all. Generation time
+    and token counts are recorded in the metrics registry under ``stage``.
+    """
+
+    def __init__(self, llm, question, docs, started_at, retrieval_time, cached_text=None, on_complete=None,
+                 stage="qa"):
+        self.llm = llm
+        self.question = question
+        self.docs = docs
+        self.text = ""
+        self.started_at = started_at
+        self.retrieval_time = retrieval_time
+        self.time_to_first_token = None
+        self.total_latency = None
+        self.cached_text = cached_text
+        self.on_complete = on_complete
+        self.stage = stage
+        self.usage = {}
+
+    @property
+    def from_cache(self):
+        return self.cached_text is not None
+
+    def _tokens(self):
+        if self.from_cache:
+            yield self.cached_text
+            return
+        for chunk in self.llm.stream(build_messages(self.question, self.docs)):
+            for name, count in (getattr(chunk, "usage_metadata", None) or {}).items():
+                if isinstance(count, int):
+                    self.usage[name] = self.usage.get(name, 0) + count
+            if chunk.content:
+                yield chunk.content
+
+    def __iter__(self):
+        for token in self._tokens():
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - self.started_at
+            self.text += token
+            yield token
+        self.total_latency = time.perf_counter() - self.started_at
+        logger.info(
+            "answer streamed: retrieval=%.3fs first_token=%.3fs total=%.3fs docs=%d cached=%s",
+            self.retrieval_time,
+            self.time_to_first_token or self.total_latency,
+            self.total_latency,
+            len(self.docs),
+            self.from_cache,
+        )
+        if not self.from_cache:
+            metrics = get_metrics()
+            if self.time_to_first_token is not None:
+                metrics.observe(STAGE_SECONDS, self.time_to_first_token - self.retrieval_time,
+                                stage=f"{self.stage}.first_token")
+            metrics.observe(STAGE_SECONDS, self.total_latency - self.retrieval_time, stage=f"{self.stage}.generate")
+            record_llm_usage(self.stage, self.llm, build_messages(self.question, self.docs), self.text, self.usage)
+        if self.on_complete and self.text:
+            self.on_complete(self.text)
+
+    def timings(self):
+        """
+        Returns:
+            dict: Retrieval time, time to first token and total latency in seconds
+        """
+        return {
+            "retrieval": self.retrieval_time,
+            "first_token": self.time_to_first_token,
+            "total": self.total_latency,
+            "cached": self.from_cache,
+        }
+
+
+def stream_answer(llm, retriever, question, search_query=None, cache=None, cache_scope=None, embeddings=None):
+    """
+    Retrieves context for a question and prepares a streaming answer.
+
+    Retrieval runs immediately so callers can show sources while the LLM is
+    still generating; the LLM call itself starts when the answer is iterated.
+    The retrieved chunks are packed into the model's context budget first
+    (see ``context.pack_for_model``), so ``docs`` holds what the model sees.
+    With a ``cache``, answers are looked up by (model, prompt, retrieved chunks)
+    and, if semantic caching is enabled, by question similarity within
+    ``cache_scope``; a hit skips the LLM call entirely.
+
+    Args:
+        llm (BaseChatModel): Chat model supporting ``stream``
+        retriever (BaseRetriever): Retriever supplying the context
+        question (str): Prompt sent to the model
+        search_query (str, optional): Text used for retrieval instead of ``question``
+        cache (ResponseCache, optional): Cache consulted before calling the LLM
+        cache_scope (str, optional): Scope for similarity lookups, e.g. the page and document set
+        embeddings (Embeddings, optional): Used to embed the question for similarity lookups
+
+    Returns:
+        StreamingAnswer: Token iterator with the retrieved ``docs``
+    """
+    started_at = time.perf_counter()
+    with span("qa.retrieval"):
+        docs = retriever.invoke(search_query or question)
+    model = model_name_of(llm)
+    docs = pack_for_model(docs, search_query or question, model, question)
+    retrieval_time = time.perf_counter() - started_at
+    if cache is None:
+        return StreamingAnswer(llm, question, docs, started_at, retrieval_time)
+
+    key = cache.make_key(model, question, docs)
+    scope = f"{model}|{cache_scope}" if cache_scope else None
+    query_embedding = None
+    if SEMANTIC_CACHE_ENABLED and scope and embeddings is not None:
+        query_embedding = embeddings.embed_query(search_query or question)
+    cached_text = cache.lookup(key, scope=scope, embedding=query_embedding)
+    if cached_text is not None:
+        return StreamingAnswer(llm, question, docs, started_at, retrieval_time, cached_text=cached_text)
+    return StreamingAnswer(
+        llm, question, docs, started_at, retrieval_time,
+        on_complete=lambda text: cache.put(key, text, scope=scope, embedding=query_embedding),
+    )
+
+
+def format_timings(answer):
+    """
+    Returns a short human-readable latency summary for a consumed StreamingAnswer.
+    """
+    timings = answer.timings()
+    first_token = timings["first_token"] if timings["first_token"] is not None else timings["total"]
+    summary = f"⏱ First token {first_token:.2f}s · total {timings['total']:.2f}s"
+    return f"⚡ Cached answer · {summary}" if answer.from_cache else summary
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing ``rate`` units per ``period`` seconds.
+
+    The bucket starts full, so up to ``rate`` units may be taken at once; after
+    that callers block until enough units have been refilled. ``consume`` takes
+    units without waiting and may leave the bucket in debt, for costs that are
+    only known after the fact (such as completion tokens).
+    """
+
+    def __init__(self, rate, period=60.0):
+        self.rate = float(rate)
+        self.period = float(period)
+        self._tokens = self.rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+        self._updated = now
+
+    def _try_take(self, amount):
+        # Takes ``amount`` and returns 0, or returns the seconds until it will be available.
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) * self.period / self.rate
+
+    def acquire(self, amount=1):
+        """
+        Blocks until ``amount`` units are available and takes them.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.rate)
+        waited = 0.0
+        while True:
+            delay = self._try_take(amount)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, amount=1):
+        """
+        Same as ``acquire`` but waits without blocking the event loop.
+        """
+        amount = min(amount, self.rate)
+        waited = 0.0
+        while True:
+            delay = self._try_take(amount)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def consume(self, amount):
+        """
+        Takes ``amount`` units immediately, going into debt if there are not enough.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name, rate, period=60.0):
+    """
+    Returns the process-wide limiter called ``name``, creating it on first use.
+
+    All sessions calling the same provider share one limiter, since provider
+    quotas apply to the API key rather than to a single user.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(rate, period)
+        return _limiters[name]
@@ -0,0 +1,148 @@
+import logging
+import os
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from embedding_cache import text_hash
+from index_cache import load_cached_vectorstore, load_page_hashes, stored_vectors
+from ingest import iter_chunks, iter_pages, page_fingerprints
+from metrics import get_metrics, span
+
+logger = logging.getLogger(__name__)
+
+
+def _first_index(values):
+    index = {}
+    for i, value in enumerate(values):
+        if value is not None:
+            index.setdefault(value, i)
+    return index
+
+
+def _rows_by_page(vectorstore):
+    # Index rows and chunks of every page, in chunk order.
+    rows = {}
+    for row in range(len(vectorstore.index_to_docstore_id)):
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+        rows.setdefault(doc.metadata.get("page"), []).append((row, doc))
+    for chunks in rows.values():
+        chunks.sort(key=lambda item: item[1].metadata.get("chunk", 0))
+    return rows
+
+
+def update_pdf_vectorstore(path, embeddings, previous_key, settings, chunk_size, chunk_overlap, batch_size=64,
+                           progress_callback=None):
+    """
+    Builds the index of a changed PDF from the cached index of its previous version.
+
+    Pages are matched to the previous version by content-stream fingerprint,
+    so pages that only moved (e.g. after an inserted page) are still found.
+    Only unmatched pages have their text extracted, and only those whose text
+    is new are split and embedded; the chunks and vectors of every other page
+    are copied from the previous index and renumbered, and chunks of removed
+    pages are left out. The previous index is not modified, since it may be
+    memory-mapped or shared with other sessions.
+
+    Args:
+        path (str): Path to the new version of the PDF
+        embeddings (Embeddings): Embedding function the previous index was built with
+        previous_key (str): Cache key of the previous version's index
+        settings (dict): Settings the new index is built with; the previous one must match
+        chunk_size (int): Splitter chunk size
+        chunk_overlap (int): Splitter chunk overlap
+        batch_size (int): Chunks per embedding call
+        progress_callback (callable, optional): Called as ``progress_callback(fraction, message)``
+
+    Returns:
+        tuple or None: (FAISS or None if the PDF has no text, page hashes for
+        ``save_vectorstore_to_cache``, report dict), or None if the previous
+        index is not cached, has no page hashes or was built with other settings
+    """
+    old_pages = load_page_hashes(previous_key)
+    if old_pages is None or old_pages.get("settings") != settings:
+        return None
+    previous = load_cached_vectorstore(previous_key, embeddings)
+    if previous is None:
+        return None
+
+    name = os.path.basename(path)
+    fingerprints = page_fingerprints(path)
+    old_by_fingerprint = _first_index(old_pages["fingerprints"])
+    old_by_text = _first_index(old_pages["text_hashes"])
+    text_hashes = [None] * len(fingerprints)
+    # Page of the previous version whose chunks each new page reuses.
+    source_pages = {}
+    for page, fingerprint in enumerate(fingerprints):
+        old_page = old_by_fingerprint.get(fingerprint)
+        if old_page is not None:
+            source_pages[page] = old_page
+            text_hashes[page] = old_pages["text_hashes"][old_page]
+    changed = [page for page in range(len(fingerprints)) if page not in source_pages]
+
+    new_docs = []
+    with span("index.update.parse", pages=len(changed)):
+        for page, text in iter_pages(path, pages=changed):
+            text_hashes[page] = text_hash(text)
+            old_page = old_by_text.get(text_hashes[page])
+            if old_page is not None:
+                source_pages[page] = old_page
+            else:
+                new_docs.extend(iter_chunks([(page, text)], path, chunk_size, chunk_overlap))
+    embedded_pages = len({doc.metadata["page"] for doc in new_docs})
+
+    rows_by_page = _rows_by_page(previous)
+    reused_rows, reused_docs = [], []
+    for page, old_page in sorted(source_pages.items()):
+        for row, doc in rows_by_page.get(old_page, []):
+            reused_rows.append(row)
+            reused_docs.append(Document(page_content=doc.page_content,
+                                        metadata={**doc.metadata, "source": path, "page": page}))
+    # Only the reused rows are reconstructed, so a large previous index is never copied whole.
+    reused_vectors = stored_vectors(previous, reused_rows, [doc.page_content for doc in reused_docs], embeddings)
+
+    new_vectors = []
+    with span("index.update.embed", chunks=len(new_docs)):
+        for start in range(0, len(new_docs), batch_size):
+            batch = new_docs[start:start + batch_size]
+            new_vectors.extend(embeddings.embed_documents([doc.page_content for doc in batch]))
+            if progress_callback:
+                progress_callback(
+                    (start + len(batch)) / len(new_docs),
+                    f"{name}: {len(changed)}/{len(fingerprints)} pages changed, "
+                    f"{start + len(batch)}/{len(new_docs)} chunks embedded",
+                )
+
+    pages = {"settings": settings, "fingerprints": fingerprints, "text_hashes": text_hashes}
+    report = {
+        "pages": len(fingerprints),
+        "reparsed_pages": len(changed),
+        "embedded_pages": embedded_pages,
+        "removed_pages": len(set(range(len(old_pages["fingerprints"]))) - set(source_pages.values())),
+        "reused_chunks": len(reused_docs),
+        "embedded_chunks": len(new_docs),
+    }
+    metrics = get_metrics()
+    metrics.increment("finsight_reindex_pages_total", len(fingerprints) - len(changed), kind="unchanged")
+    metrics.increment("finsight_reindex_pages_total", len(changed) - embedded_pages, kind="reparsed")
+    metrics.increment("finsight_reindex_pages_total", embedded_pages, kind="embedded")
+    logger.info(
+        "index updated: %s pages=%d reparsed=%d embedded=%d removed=%d chunks reused=%d embedded=%d",
+        name, report["pages"], report["reparsed_pages"], report["embedded_pages"], report["removed_pages"],
+        report["reused_chunks"], report["embedded_chunks"],
+    )
+
+    docs = reused_docs + new_docs
+    if not docs:
+        return None, pages, report
+    vectors = np.vstack([reused_vectors,
+                         np.asarray(new_vectors, dtype=np.float32).reshape(len(new_docs), previous.index.d)])
+    # Page order, as a full build would produce.
+    order = sorted(range(len(docs)), key=lambda i: (docs[i].metadata["page"], docs[i].metadata.get("chunk", 0)))
+    vectorstore = FAISS.from_embeddings(
+        [(docs[i].page_content, vectors[i].tolist()) for i in order],
+        embeddings,
+        metadatas=[docs[i].metadata for i in order],
+    )
+    return vectorstore, pages, report
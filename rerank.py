@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from langchain_core.documents import Document
+
+from metrics import get_metrics, record_cache, span
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("FINSIGHT_RERANK", "1") != "0"
+RERANK_MODEL = os.getenv("FINSIGHT_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Candidates fetched from dense/hybrid search and scored by the cross-encoder per query.
+RERANK_CANDIDATES = int(os.getenv("FINSIGHT_RERANK_CANDIDATES", "50"))
+# Longest a query waits for scores before falling back to the retrieval order (0 waits indefinitely).
+RERANK_BUDGET_SECONDS = float(os.getenv("FINSIGHT_RERANK_BUDGET_MS", "500")) / 1000
+RERANK_BATCH_SIZE = int(os.getenv("FINSIGHT_RERANK_BATCH_SIZE", "64"))
+RERANK_CACHE_SIZE = int(os.getenv("FINSIGHT_RERANK_CACHE_SIZE", "50000"))
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieval candidates by cross-encoder relevance to the query.
+
+    All uncached (query, chunk) pairs of a query are scored in one batched pass
+    on the CPU, one pass at a time. Scores are kept in an LRU cache, so asking
+    again, or rephrasing over the same candidates, costs no model time. A query
+    that would wait longer than ``budget`` seconds, including while the model
+    is still loading on first use, keeps the retrieval order instead; the pass
+    still finishes in the background and fills the cache.
+
+    Args:
+        model_name (str): sentence-transformers cross-encoder model
+        budget (float): Seconds to wait for scores (0 waits indefinitely)
+        batch_size (int): Pairs per forward pass
+        cache_size (int): (query, chunk) scores kept
+        scorer (callable, optional): Scores a list of (query, text) pairs instead of the model
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, budget=RERANK_BUDGET_SECONDS, batch_size=RERANK_BATCH_SIZE,
+                 cache_size=RERANK_CACHE_SIZE, scorer=None):
+        self.model_name = model_name
+        self.budget = budget
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._scorer = scorer
+        self._model = None
+        self._load_error = None
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        # The model already uses every core, so passes are queued rather than run side by side.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+    def _key(self, query, text):
+        return hashlib.sha1(f"{self.model_name}\0{query}\0{text}".encode("utf-8")).hexdigest()
+
+    def _score(self, pairs):
+        if self._scorer is not None:
+            return [float(score) for score in self._scorer(pairs)]
+        if self._model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self.model_name, device="cpu")
+            except Exception as e:
+                self._load_error = str(e) or type(e).__name__
+                logger.warning("Reranking disabled: could not load %s: %s", self.model_name, self._load_error)
+                raise
+        scores = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return [float(score) for score in scores]
+
+    def _score_and_cache(self, query, keys, texts):
+        scores = self._score([(query, text) for text in texts])
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+        return scores
+
+    def _fallback(self, docs, top_n, reason):
+        get_metrics().increment("finsight_rerank_fallbacks_total", reason=reason)
+        return docs[:top_n]
+
+    def rerank(self, query, docs, top_n, budget=None):
+        """
+        Returns the ``top_n`` most relevant candidates.
+
+        Args:
+            query (str): Search query
+            docs (list): Candidate Documents in retrieval order
+            top_n (int): Number of Documents to keep
+            budget (float, optional): Seconds to wait for scores in this call instead of ``self.budget``
+
+        Returns:
+            list: Documents with ``rerank_score`` in metadata, or the first ``top_n`` candidates on fallback
+        """
+        if not docs:
+            return []
+        budget = self.budget if budget is None else budget
+        keys = [self._key(query, doc.page_content) for doc in docs]
+        scores = {}
+        with self._lock:
+            for key in keys:
+                if key in self._scores:
+                    scores[key] = self._scores[key]
+                    self._scores.move_to_end(key)
+        missing = {key: doc.page_content for key, doc in zip(keys, docs) if key not in scores}
+        if len(missing) < len(docs):
+            record_cache("rerank", True, len(docs) - len(missing))
+        if missing:
+            record_cache("rerank", False, len(missing))
+        with span("retrieval.rerank", candidates=len(docs), scored=len(missing)):
+            if missing:
+                if self._load_error:
+                    return self._fallback(docs, top_n, "unavailable")
+                future = self._executor.submit(self._score_and_cache, query, list(missing), list(missing.values()))
+                try:
+                    scores.update(zip(missing, future.result(timeout=budget or None)))
+                except TimeoutError:
+                    return self._fallback(docs, top_n, "timeout")
+                except Exception:
+                    return self._fallback(docs, top_n, "error")
+        order = sorted(range(len(docs)), key=lambda i: -scores[keys[i]])[:top_n]
+        return [
+            Document(page_content=docs[i].page_content, metadata={**docs[i].metadata, "rerank_score": scores[keys[i]]})
+            for i in order
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """
+    Returns the process-wide cross-encoder reranker, creating it on first use.
+    """
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from metrics import record_cache
+
+RESPONSE_CACHE_PATH = os.getenv("FINSIGHT_RESPONSE_CACHE_PATH", os.path.join("index_cache", "responses.sqlite3"))
+RESPONSE_CACHE_TTL = int(os.getenv("FINSIGHT_RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("FINSIGHT_RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_ENABLED = os.getenv("FINSIGHT_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("FINSIGHT_SEMANTIC_CACHE_THRESHOLD", "0.97"))
+
+
+def chunk_id(doc):
+    """
+    Returns a stable identifier for a retrieved chunk from its source, page and text.
+    """
+    payload = json.dumps(
+        [doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_name_of(llm):
+    """
+    Returns the model identifier of a LangChain chat model.
+    """
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses with TTL expiry and LRU eviction.
+
+    Entries are keyed by (model, prompt, retrieved chunk IDs). Entries may also
+    carry a scope and a query embedding, which allows an optional lookup of
+    paraphrased questions by cosine similarity within the same scope.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " scope TEXT,"
+            " response TEXT NOT NULL,"
+            " embedding BLOB,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model, prompt, docs):
+        """
+        Builds the cache key for a prompt answered over the given retrieved documents.
+        """
+        payload = json.dumps([model, prompt, sorted(chunk_id(doc) for doc in docs)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns:
+            str or None: The cached response, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return row[0] if row else None
+
+    def get_similar(self, scope, embedding, threshold=SEMANTIC_CACHE_THRESHOLD):
+        """
+        Returns the cached response whose query embedding in ``scope`` is most similar
+        to ``embedding``, if its cosine similarity is at least ``threshold``.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response, embedding FROM responses"
+                " WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ?",
+                (scope, now - self.ttl),
+            ).fetchall()
+        if not rows:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarities = matrix @ query / np.where(norms == 0, 1.0, norms)
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+
+        key, response, _ = rows[best]
+        with self._lock:
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return response
+
+    def lookup(self, key, scope=None, embedding=None):
+        """
+        Looks up a response by exact key, then by similarity within ``scope`` when
+        semantic caching is enabled and a query embedding is given.
+
+        Returns:
+            str or None: The cached response, or None on a miss
+        """
+        response = self.get(key)
+        if response is None and SEMANTIC_CACHE_ENABLED and scope and embedding is not None:
+            response = self.get_similar(scope, embedding)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache("response", response is not None)
+        return response
+
+    def put(self, key, response, scope=None, embedding=None):
+        """
+        Stores a response and evicts expired and least recently used entries.
+        """
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, response, embedding, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, response, blob, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN"
+                " (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters accumulated by this process
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=RESPONSE_CACHE_PATH):
+    """
+    Returns the process-wide ResponseCache for ``path``, opening it on first use.
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
@@ -0,0 +1,159 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from index_cache import check_same_backend, copy_vectorstore, copy_vectorstore_into, optimize_vectorstore
+from keyword_index import get_keyword_index
+from metrics import span
+from rerank import RERANK_CANDIDATES, RERANK_ENABLED, get_reranker
+
+# Number of questions asked in a multi-document session before its indexes are
+# merged into a single combined index.
+COMBINE_AFTER_QUERIES = int(os.getenv("FINSIGHT_COMBINE_AFTER_QUERIES", "3"))
+HYBRID_SEARCH = os.getenv("FINSIGHT_HYBRID_SEARCH", "1") != "0"
+RRF_K = int(os.getenv("FINSIGHT_RRF_K", "60"))
+# Each ranking contributes this many candidates per requested document to the fusion.
+HYBRID_CANDIDATES_PER_K = 4
+
+
+def _with_score(doc, score, field="score"):
+    metadata = dict(doc.metadata)
+    metadata[field] = float(score)
+    return Document(page_content=doc.page_content, metadata=metadata)
+
+
+def _doc_key(doc):
+    return doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content
+
+
+def search_vectorstores(vectorstores, query, k):
+    """
+    Searches several FAISS vectorstores in parallel and merges their hits.
+
+    Args:
+        vectorstores (list): FAISS vectorstores sharing one embedding model
+        query (str): Query text
+        k (int): Number of documents to return
+
+    Returns:
+        list: The ``k`` closest Documents across all stores, with ``score`` in metadata
+    """
+    if not vectorstores:
+        return []
+    check_same_backend(*vectorstores)
+    # Embed once and reuse the vector for every index.
+    embedding = vectorstores[0].embedding_function.embed_query(query)
+    with span("retrieval.faiss", indexes=len(vectorstores), k=k):
+        if len(vectorstores) == 1:
+            hits = vectorstores[0].similarity_search_with_score_by_vector(embedding, k=k)
+        else:
+            with ThreadPoolExecutor(max_workers=len(vectorstores)) as executor:
+                results = executor.map(
+                    lambda vs: vs.similarity_search_with_score_by_vector(embedding, k=k),
+                    vectorstores,
+                )
+                hits = [hit for result in results for hit in result]
+    # FAISS returns L2 distances, so smaller scores are closer.
+    hits.sort(key=lambda hit: hit[1])
+    return [_with_score(doc, score) for doc, score in hits[:k]]
+
+
+def build_combined_vectorstore(vectorstores):
+    """
+    Copies several vectorstores into one in-memory FAISS index.
+
+    The source stores are left untouched and nothing is re-embedded. Large
+    combined indexes are rebuilt with the configured index type.
+
+    Returns:
+        FAISS: Combined vectorstore
+    """
+    with span("index.combine", indexes=len(vectorstores)):
+        combined = copy_vectorstore(vectorstores[0])
+        for vectorstore in vectorstores[1:]:
+            copy_vectorstore_into(combined, vectorstore)
+        return optimize_vectorstore(combined)
+
+
+def keyword_search(vectorstores, query, k):
+    """
+    BM25 search over the keyword index kept alongside each FAISS vectorstore.
+
+    Returns:
+        list: The ``k`` best-scoring Documents across all stores, with ``bm25_score`` in metadata
+    """
+    hits = []
+    with span("retrieval.keyword", indexes=len(vectorstores), k=k):
+        for vectorstore in vectorstores:
+            for doc_id, score in get_keyword_index(vectorstore).search(query, k):
+                hits.append((vectorstore.docstore.search(doc_id), score))
+    hits.sort(key=lambda hit: -hit[1])
+    return [_with_score(doc, score, "bm25_score") for doc, score in hits[:k]]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=RRF_K):
+    """
+    Fuses ranked Document lists by reciprocal rank: each list adds ``1 / (rrf_k + rank)``.
+
+    Returns:
+        list: The ``k`` best fused Documents, with ``rrf_score`` and the per-list scores in metadata
+    """
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            if key in docs:
+                docs[key] = Document(page_content=doc.page_content, metadata={**docs[key].metadata, **doc.metadata})
+            else:
+                docs[key] = doc
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [_with_score(docs[key], scores[key], "rrf_score") for key in best]
+
+
+def hybrid_search(vectorstores, query, k):
+    """
+    Combines dense (FAISS) and keyword (BM25) retrieval with reciprocal-rank fusion.
+
+    Dense search finds paraphrases; BM25 catches exact tickers, line items and
+    figures that embeddings blur.
+    """
+    depth = k * HYBRID_CANDIDATES_PER_K
+    dense = search_vectorstores(vectorstores, query, depth)
+    keyword = keyword_search(vectorstores, query, depth)
+    return reciprocal_rank_fusion([dense, keyword], k)
+
+
+class MultiIndexRetriever(BaseRetriever):
+    """
+    Retriever over all of a session's per-document FAISS indexes.
+
+    Uses ``combined_vectorstore`` when one has been built, otherwise searches
+    each index in parallel. With ``hybrid`` enabled, dense and BM25 hits are
+    fused by reciprocal rank; otherwise the top ``k`` are merged by distance.
+    With ``rerank`` enabled, ``candidates`` hits are fetched and the
+    cross-encoder keeps the ``k`` most relevant, waiting up to ``rerank_budget``
+    seconds (0 waits indefinitely) or the reranker's own budget when unset.
+    """
+
+    vectorstores: List[Any]
+    k: int = 4
+    combined_vectorstore: Optional[Any] = None
+    hybrid: bool = HYBRID_SEARCH
+    rerank: bool = RERANK_ENABLED
+    candidates: int = RERANK_CANDIDATES
+    rerank_budget: Optional[float] = None
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        vectorstores = [self.combined_vectorstore] if self.combined_vectorstore is not None else self.vectorstores
+        depth = max(self.k, self.candidates) if self.rerank else self.k
+        if self.hybrid:
+            docs = hybrid_search(vectorstores, query, depth)
+        else:
+            docs = search_vectorstores(vectorstores, query, depth)
+        if self.rerank:
+            return get_reranker().rerank(query, docs, self.k, budget=self.rerank_budget)
+        return docs
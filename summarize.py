@@ -0,0 +1,179 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from context import estimate_tokens
+from metrics import span
+from qa import StreamingAnswer, build_messages, record_llm_usage
+from response_cache import model_name_of
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CONCURRENCY = int(os.getenv("FINSIGHT_SUMMARY_CONCURRENCY", "4"))
+# Context tokens per map or reduce call; leaves room for the answer in an 8k window.
+SUMMARY_BATCH_TOKENS = int(os.getenv("FINSIGHT_SUMMARY_BATCH_TOKENS", "4000"))
+
+MAP_PROMPT = (
+    "Summarize these excerpts of a financial document as concise bullet points covering key metrics, "
+    "events, risks and outlook. Keep every figure exactly as written and do not add outside information."
+)
+REDUCE_PROMPT = (
+    "These are partial summaries of consecutive parts of financial documents. Merge them into one set of "
+    "concise bullet points, removing repetition and keeping every figure exactly as written."
+)
+
+
+def ordered_chunks(vectorstore):
+    """
+    Returns every chunk of a vectorstore in document order.
+
+    Chunks are embedded concurrently, so index order is only roughly page order,
+    even within a page; sorting by source, page and position on the page restores it.
+    """
+    docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(len(vectorstore.index_to_docstore_id))]
+    return sorted(docs, key=lambda doc: (
+        str(doc.metadata.get("source", "")), doc.metadata.get("page", 0), doc.metadata.get("chunk", 0)
+    ))
+
+
+def group_by_budget(docs, budget=SUMMARY_BATCH_TOKENS):
+    """
+    Splits consecutive documents into groups of at most ``budget`` estimated tokens.
+
+    A new group also starts whenever the source changes, so each group belongs
+    to one document and adding a document leaves the other groups unchanged.
+    """
+    groups, current, used = [], [], 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if current and (used + tokens > budget or doc.metadata.get("source") != current[0].metadata.get("source")):
+            groups.append(current)
+            current, used = [], 0
+        current.append(doc)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _pack(partials, budget):
+    # Reduce groups ignore source boundaries, but a group always takes at least two
+    # partials so every round shrinks the list.
+    groups, current, used = [], [], 0
+    for doc in partials:
+        tokens = estimate_tokens(doc.page_content)
+        if len(current) >= 2 and used + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(doc)
+        used += tokens
+    if len(current) == 1 and groups:
+        groups[-1].extend(current)
+    elif current:
+        groups.append(current)
+    return groups
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes whole documents by summarizing token-budgeted chunk groups in
+    parallel (map) and merging the partial summaries hierarchically (reduce).
+
+    Map and reduce calls run ``concurrency`` at a time and the shared LLM
+    client (``llm_client``) keeps them within the model's rate limits, so
+    wall-clock time grows with the number of rounds rather than with document
+    length. Every partial summary is cached by (model, prompt, chunks), so
+    re-summarizing after adding a document only runs the maps for the new
+    document.
+    """
+
+    def __init__(self, llm, cache=None, concurrency=SUMMARY_CONCURRENCY, budget=SUMMARY_BATCH_TOKENS):
+        self.llm = llm
+        self.cache = cache
+        self.concurrency = concurrency
+        self.budget = budget
+        self.model = model_name_of(llm)
+        self.stats = {"maps": 0, "reduces": 0, "cached": 0, "rounds": 0}
+        self._lock = threading.Lock()
+
+    def _complete(self, prompt, docs, stage):
+        key = self.cache.make_key(self.model, prompt, docs) if self.cache else None
+        if key:
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                with self._lock:
+                    self.stats["cached"] += 1
+                return cached
+        messages = build_messages(prompt, docs)
+        with span(stage, chunks=len(docs)):
+            message = self.llm.invoke(messages)
+        text = message.content
+        record_llm_usage(stage, self.llm, messages, text, getattr(message, "usage_metadata", None))
+        if key and text:
+            self.cache.put(key, text)
+        return text
+
+    def _run(self, prompt, groups, counter):
+        self.stats[counter] += len(groups)
+        stage = "summary.map" if counter == "maps" else "summary.reduce"
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # Each call runs in a copy of the caller's context so its span joins the caller's trace.
+            futures = [executor.submit(contextvars.copy_context().run, self._complete, prompt, group, stage)
+                       for group in groups]
+            texts = [future.result() for future in futures]
+        return [
+            Document(page_content=text, metadata={"source": group[0].metadata.get("source")}
+                     if len({doc.metadata.get("source") for doc in group}) == 1 else {})
+            for text, group in zip(texts, groups)
+        ]
+
+    def prepare(self, docs):
+        """
+        Runs the map phase and every reduce round except the last.
+
+        Returns:
+            list: Partial summaries (Documents) that fit in one final call
+        """
+        partials = self._run(MAP_PROMPT, group_by_budget(docs, self.budget), "maps")
+        while sum(estimate_tokens(doc.page_content) for doc in partials) > self.budget and len(partials) > 1:
+            self.stats["rounds"] += 1
+            groups = _pack(partials, self.budget)
+            partials = self._run(REDUCE_PROMPT, groups, "reduces")
+        return partials
+
+    def summarize(self, vectorstores, question):
+        """
+        Summarizes every chunk of the given vectorstores.
+
+        Args:
+            vectorstores (list): FAISS vectorstores holding the documents
+            question (str): Instructions for the final summary
+
+        Returns:
+            StreamingAnswer: Streams the final reduce step; its ``docs`` are the partial summaries
+        """
+        started_at = time.perf_counter()
+        docs = [doc for vectorstore in vectorstores for doc in ordered_chunks(vectorstore)]
+        with span("summary.prepare", chunks=len(docs)):
+            partials = self.prepare(docs)
+        prepare_time = time.perf_counter() - started_at
+        logger.info(
+            "map-reduce prepared: chunks=%d maps=%d reduces=%d cached=%d time=%.3fs",
+            len(docs), self.stats["maps"], self.stats["reduces"], self.stats["cached"], prepare_time,
+        )
+
+        key = self.cache.make_key(self.model, question, partials) if self.cache else None
+        cached_text = self.cache.lookup(key) if key else None
+        if cached_text is not None or key is None:
+            return StreamingAnswer(self.llm, question, partials, started_at, prepare_time,
+                                   cached_text=cached_text, stage="summary.final")
+        return StreamingAnswer(
+            self.llm, question, partials, started_at, prepare_time,
+            on_complete=lambda text: self.cache.put(key, text), stage="summary.final",
+        )
@@ -0,0 +1,116 @@
+"""
+LLMClient coalescing, retries and per-loop HTTP clients against the local fake Groq endpoint.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import asyncio
+import gc
+import itertools
+import unittest
+import warnings
+from unittest import mock
+
+import groq
+from langchain_core.messages import HumanMessage
+
+import llm_client
+from benchmarks.fake_groq import ANSWER, FakeGroqServer
+from llm_client import LLMClient
+
+_models = itertools.count()
+
+
+def prompt(text):
+    return [HumanMessage(content=text)]
+
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self):
+        # Retries wait for Retry-After plus up to this much jitter.
+        patcher = mock.patch.object(llm_client, "RETRY_BASE_SECONDS", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_server(self, **options):
+        server = FakeGroqServer(**options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_client(self, server, **options):
+        # Rate limiters are shared per model name, so every client gets its own.
+        options.setdefault("requests_per_minute", 10_000)
+        options.setdefault("tokens_per_minute", 10_000_000)
+        return LLMClient(f"test-{next(_models)}", api_key="fake", base_url=server.url, **options)
+
+    def test_identical_calls_share_one_request(self):
+        server = self.start_server(latency=0.2)
+        client = self.make_client(server)
+
+        async def run():
+            return await asyncio.gather(*[client.ainvoke(prompt("same question")) for _ in range(5)])
+
+        responses = asyncio.run(run())
+        self.assertEqual([response.content for response in responses], [ANSWER] * 5)
+        self.assertEqual(server.stats["requests"], 1)
+
+    def test_rate_limited_requests_are_retried(self):
+        server = self.start_server(latency=0.01, rate=2, period=0.5)
+        client = self.make_client(server)
+        responses = asyncio.run(client.abatch([prompt(f"question {i}") for i in range(5)], concurrency=5))
+        self.assertEqual([response.content for response in responses], [ANSWER] * 5)
+        self.assertGreater(server.stats["rate_limited"], 0)
+        self.assertEqual(server.stats["ok"], 5)
+
+    def test_failures_are_raised_to_every_waiter(self):
+        server = self.start_server(latency=0.1, failure_rate=1.0)
+        client = self.make_client(server, max_retries=1)
+
+        async def run():
+            return await asyncio.gather(*[client.ainvoke(prompt("same question")) for _ in range(3)],
+                                        return_exceptions=True)
+
+        errors = asyncio.run(asyncio.wait_for(run(), 10))
+        self.assertTrue(all(isinstance(error, groq.InternalServerError) for error in errors))
+        self.assertEqual(server.stats["requests"], 2)
+        self.assertEqual(client._inflight, {})
+
+    def test_failure_before_the_request_does_not_block_later_calls(self):
+        server = self.start_server()
+        client = self.make_client(server)
+        with mock.patch.object(LLMClient, "_async_model", side_effect=RuntimeError("no client")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(client.ainvoke(prompt("same question")))
+        response = asyncio.run(asyncio.wait_for(client.ainvoke(prompt("same question")), 10))
+        self.assertEqual(response.content, ANSWER)
+
+    def test_loop_clients_are_closed_or_dropped(self):
+        server = self.start_server()
+        client = self.make_client(server)
+        asyncio.run(client.ainvoke(prompt("first")))
+        # asyncio.run shuts down async generators, which closes the loop's client.
+        self.assertEqual(len(client._async_models), 0)
+
+        # Code that owns its loop closes the client itself.
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(client.ainvoke(prompt("second")))
+        loop.run_until_complete(client.aclose())
+        loop.close()
+        self.assertEqual(len(client._async_models), 0)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(client.ainvoke(prompt("second")))
+        loop.close()
+        self.assertEqual(len(client._async_models), 1)
+        # The client of a loop closed without shutting down its generators goes on the next
+        # call; its connection could not be closed and is reclaimed with a ResourceWarning.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ResourceWarning)
+            asyncio.run(client.ainvoke(prompt("third")))
+            gc.collect()
+        self.assertEqual(len(client._async_models), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
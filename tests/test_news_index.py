@@ -0,0 +1,143 @@
+"""
+Incremental news index sync against a local HTTP stand-in for the article sites.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+import news_index
+
+SHARED = "Rates held steady as the central bank signalled patience."
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+class ArticleServer:
+    """
+    Serves ``pages`` (path -> body); a body of None answers 404 and paths in
+    ``slow`` answer only after ``delay`` seconds.
+    """
+
+    def __init__(self, delay=2.0):
+        self.pages = {}
+        self.slow = set()
+        self.delay = delay
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in server.slow:
+                    time.sleep(server.delay)
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self._server.server_address[1]}{path}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SyncNewsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ArticleServer()
+        self.addCleanup(self.server.stop)
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, ignore_errors=True)
+        self.embeddings = RecordingEmbeddings(size=16, embedded=[])
+        # unstructured is not needed to test the sync; pages are served as plain text.
+        patcher = mock.patch.object(news_index, "html_to_text", lambda html: html)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, paths):
+        self.embeddings.embedded.clear()
+        return news_index.sync_news_index(
+            [self.server.url(path) for path in paths], self.embeddings, self.index_dir,
+            chunk_size=1000, chunk_overlap=0, timeout=0.5,
+        )
+
+    def indexed(self):
+        vectorstore = news_index.load_news_index(self.index_dir, self.embeddings)
+        docs = [vectorstore.docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()]
+        self.assertEqual(vectorstore.index.ntotal, len(docs))
+        return sorted((os.path.basename(doc.metadata["source"]), doc.page_content) for doc in docs)
+
+    def test_sync(self):
+        pages = self.server.pages
+        pages.update({"/a": SHARED, "/b": SHARED, "/c": "Earnings beat estimates.", "/d": "Oil prices fell."})
+        pages["/gone"] = None
+        self.server.slow.add("/slow")
+        pages["/slow"] = "Never arrives in time."
+
+        _, report = self.sync(["/a", "/b", "/c"])
+        self.assertEqual(len(report["added"]), 3)
+        # The syndicated copy under /b is not embedded a second time.
+        self.assertEqual(sorted(self.embeddings.embedded), sorted([SHARED, "Earnings beat estimates."]))
+        self.assertEqual(self.indexed(), [("a", SHARED), ("c", "Earnings beat estimates.")])
+
+        pages["/c"] = "Earnings missed estimates."
+        _, report = self.sync(["/b", "/c", "/d", "/gone", "/slow"])
+        self.assertEqual(report["removed"], [self.server.url("/a")])
+        self.assertEqual(report["updated"], [self.server.url("/c")])
+        self.assertEqual(report["added"], [self.server.url("/d")])
+        self.assertEqual(report["unchanged"], [self.server.url("/b")])
+        self.assertEqual(sorted(report["failed"]), [self.server.url("/gone"), self.server.url("/slow")])
+        self.assertIn("timed out", report["failed"][self.server.url("/slow")])
+        # /a's article moves to /b without being embedded again; only changed and new articles are.
+        self.assertEqual(sorted(self.embeddings.embedded), ["Earnings missed estimates.", "Oil prices fell."])
+        self.assertEqual(self.indexed(), [
+            ("b", SHARED), ("c", "Earnings missed estimates."), ("d", "Oil prices fell."),
+        ])
+
+        # A URL that fails to fetch keeps what was indexed for it.
+        pages["/d"] = None
+        _, report = self.sync(["/b", "/c", "/d"])
+        self.assertEqual(list(report["failed"]), [self.server.url("/d")])
+        self.assertEqual(sorted(report["unchanged"]), [self.server.url("/b"), self.server.url("/c")])
+        self.assertEqual(self.embeddings.embedded, [])
+        self.assertEqual(self.indexed(), [
+            ("b", SHARED), ("c", "Earnings missed estimates."), ("d", "Oil prices fell."),
+        ])
+
+        # Removing every URL carrying the shared article deletes its chunks.
+        _, report = self.sync(["/c", "/d"])
+        self.assertEqual(report["removed"], [self.server.url("/b")])
+        self.assertEqual(self.indexed(), [("c", "Earnings missed estimates."), ("d", "Oil prices fell.")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,65 +1,232 @@
 import os
 import streamlit as st
-from langchain_community.document_loaders import PyPDFLoader 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from embedding_cache import EMBEDDING_BATCH_SIZE, text_hash
+from embeddings import embedding_backend_id, get_embeddings
+from index_cache import (
+    copy_vectorstore_into,
+    ensure_writable,
+    file_content_hash,
+    load_cached_vectorstore,
+    make_cache_key,
+    mark_read_only,
+    optimize_vectorstore,
+    previous_source_key,
+    record_source_key,
+    save_vectorstore_to_cache,
+    set_index_backend,
+)
+from index_registry import get_index_registry
+from index_types import INDEX_TRAIN_THRESHOLD, INDEX_TYPE
+from ingest import build_vectorstore_for_pdf, page_fingerprints
+from keyword_index import get_keyword_index
+from metrics import span
+from reindex import update_pdf_vectorstore
 
-def create_vectorstore_from_pdfs(pdf_paths, existing_vectorstore=None):
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+# Bump when the layout of indexed chunks changes so stale cache entries are not reused.
+INDEX_FORMAT_VERSION = 2
+
+
+def pdf_index_settings():
+    """
+    Returns every setting that shapes a PDF's index.
+    """
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_backend": embedding_backend_id(),
+        "index_type": INDEX_TYPE,
+        "index_train_threshold": INDEX_TRAIN_THRESHOLD,
+        "format_version": INDEX_FORMAT_VERSION,
+    }
+
+
+def pdf_index_key(path):
+    """
+    Returns the cache key of a PDF's index: its content hash plus every setting that shapes the index.
+    """
+    return make_cache_key(file_content_hash(path), **pdf_index_settings())
+
+
+def load_or_build_pdf_vectorstore(path, embeddings, key, progress_callback=None):
+    """
+    Loads a PDF's index from the on-disk cache, building and caching it on a miss.
+
+    When the file at ``path`` was indexed before and has since changed, the new
+    index is built from the previous one and only changed pages are embedded
+    (see ``reindex.update_pdf_vectorstore``); otherwise the whole PDF is indexed.
+
+    Args:
+        path (str): Path to the PDF
+        embeddings (Embeddings): Embedding function of the configured backend
+        key (str): Cache key from ``pdf_index_key``
+        progress_callback (callable, optional): Called as ``progress_callback(fraction, message)`` while indexing
+
+    Returns:
+        FAISS or None: The index, or None if the PDF has no text
+    """
+    name = os.path.basename(path)
+    with span("index.load", source=name) as attrs:
+        vectorstore = load_cached_vectorstore(key, embeddings)
+        attrs["hit"] = vectorstore is not None
+    if vectorstore is not None:
+        record_source_key(path, key)
+        return vectorstore
+    settings = pdf_index_settings()
+    with span("ingest.pdf", source=name):
+        update = None
+        previous_key = previous_source_key(path)
+        if previous_key and previous_key != key:
+            with span("index.update", source=name) as attrs:
+                update = update_pdf_vectorstore(
+                    path,
+                    embeddings,
+                    previous_key,
+                    settings,
+                    chunk_size=CHUNK_SIZE,
+                    chunk_overlap=CHUNK_OVERLAP,
+                    batch_size=EMBEDDING_BATCH_SIZE,
+                    progress_callback=progress_callback,
+                )
+                attrs["incremental"] = update is not None
+        if update is not None:
+            vectorstore, pages, _ = update
+        else:
+            text_hashes = {}
+
+            def record_page(page, text):
+                text_hashes[page] = text_hash(text)
+
+            vectorstore = build_vectorstore_for_pdf(
+                path,
+                embeddings,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                progress_callback=progress_callback,
+                on_page=record_page,
+            )
+            fingerprints = page_fingerprints(path)
+            pages = {
+                "settings": settings,
+                "fingerprints": fingerprints,
+                "text_hashes": [text_hashes.get(i) for i in range(len(fingerprints))],
+            }
+        if vectorstore is None:
+            return None
+        backend = embedding_backend_id()
+        set_index_backend(vectorstore, backend)
+        with span("index.optimize"):
+            vectorstore = optimize_vectorstore(vectorstore)
+        # Build the BM25 index now so it is cached next to the FAISS index.
+        with span("index.keyword_build"):
+            get_keyword_index(vectorstore)
+        with span("index.save"):
+            save_vectorstore_to_cache(key, vectorstore, meta={"source": name, "embedding_backend": backend}, pages=pages)
+        record_source_key(path, key)
+    return vectorstore
+
+
+def acquire_pdf_vectorstore(path, progress_callback=None):
+    """
+    Returns a handle to the process-wide shared index of a PDF.
+
+    Every session asking for the same document (by content) gets the same
+    read-only index; concurrent first requests wait for a single build. Keep the
+    handle for as long as the index is used and call ``release()`` when done.
+
+    Args:
+        path (str): Path to the PDF
+        progress_callback (callable, optional): Called while indexing if this call performs the build
+
+    Returns:
+        IndexHandle or None: Handle whose ``vectorstore`` is the shared index, or None if the PDF has no text
+    """
+    if not os.path.exists(path):
+        st.warning(f"File not found: {path}")
+        return None
+    try:
+        embeddings = get_embeddings()
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    return load_shared_pdf_vectorstore(path, embeddings, progress_callback)
+
+
+def load_shared_pdf_vectorstore(path, embeddings, progress_callback=None):
     """
-    Loads one or more PDFs, splits text into chunks, generates embeddings using Gemini,
-    and creates or updates a FAISS vector store.
+    Same as ``acquire_pdf_vectorstore`` but without any Streamlit calls, for use
+    from background workers.
+    """
+    key = pdf_index_key(path)
+
+    def load():
+        vectorstore = load_or_build_pdf_vectorstore(path, embeddings, key, progress_callback)
+        return mark_read_only(vectorstore) if vectorstore is not None else None
+
+    return get_index_registry().acquire(key, load)
+
+
+def create_vectorstore_from_pdfs(pdf_paths, existing_vectorstore=None, progress_callback=None):
+    """
+    Loads one or more PDFs, splits text into chunks, generates embeddings with the
+    configured backend (Gemini or a local model), and creates or updates a FAISS vector store.
+
+    Each PDF is indexed on its own and cached on disk under a key derived from the
+    file's content hash and the splitter/embedding parameters, so a document that
+    has been seen before is loaded from the cache instead of being re-embedded.
+    Uncached PDFs go through the staged pipeline in ``ingest``. Every index records
+    the embedding backend that built it and indexes from different backends are
+    never merged. Indexes past ``INDEX_TRAIN_THRESHOLD`` vectors are rebuilt with the
+    configured approximate index type (IVF, PQ, HNSW or scalar quantization).
 
     Args:
         pdf_paths (list): List of file paths to PDF documents
         existing_vectorstore (FAISS, optional): Existing FAISS vectorstore to merge new embeddings into
+        progress_callback (callable, optional): Called as ``progress_callback(fraction, message)`` while indexing
 
     Returns:
         FAISS: Vector store containing the embedded chunks (new or merged)
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        st.error("GEMINI_API_KEY not set in environment.")
+    # Generate embeddings with the configured backend, reusing vectors for chunks embedded before
+    try:
+        embeddings = get_embeddings()
+    except ValueError as e:
+        st.error(str(e))
         st.stop()
 
-    all_docs = []
-    # Load all PDFs and extract text
+    vectorstores = []
     for path in pdf_paths:
         if not os.path.exists(path):
             st.warning(f"File not found: {path}")
             continue
-        loader = PyPDFLoader(path)
-        docs = loader.load()
-        all_docs.extend(docs)
+        vectorstore = load_or_build_pdf_vectorstore(path, embeddings, pdf_index_key(path), progress_callback)
+        if vectorstore is not None:
+            vectorstores.append(vectorstore)
 
-    if not all_docs:
+    if not vectorstores:
         st.error("No valid PDF content found.")
         st.stop()
 
-    # Split text into chunks for embedding
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = []
-    for doc in all_docs:
-        chunks.extend(splitter.split_text(doc.page_content))
-
-    if not chunks:
-        st.error("No text chunks created from PDFs.")
-        st.stop()
-
-    # Generate embeddings using Gemini
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=api_key
-    )
-
     if existing_vectorstore:
         # Add new documents to existing vectorstore
-        existing_vectorstore.add_texts(chunks)
-        return existing_vectorstore
-    else:
-        # Create vector store from text chunks
-        vectorstore = FAISS.from_texts(chunks, embedding=embeddings)
-        return vectorstore
+        existing_vectorstore = ensure_writable(existing_vectorstore)
+        try:
+            for vectorstore in vectorstores:
+                copy_vectorstore_into(existing_vectorstore, vectorstore)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        return optimize_vectorstore(existing_vectorstore)
+
+    if len(vectorstores) == 1:
+        return vectorstores[0]
+
+    merged = ensure_writable(vectorstores[0])
+    for vectorstore in vectorstores[1:]:
+        copy_vectorstore_into(merged, vectorstore)
+    return optimize_vectorstore(merged)
 
 def local_css(file_name):
     """